@@ -10,7 +10,7 @@ import {
   Button
 } from '@mui/material';
 import { Link } from 'react-router-dom';
-import { scheduleAPI, roomAPI } from '../services/api';
+import { scheduleAPI } from '../services/api';
 import { format } from 'date-fns';
 
 const HomePage = () => {
@@ -25,18 +25,13 @@ const HomePage = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [schedulesRes, roomsRes] = await Promise.all([
-          scheduleAPI.getTodaySchedule(),
-          roomAPI.getAll()
-        ]);
+        const response = await scheduleAPI.getDashboard();
 
-        setTodaySchedules(schedulesRes.data.schedules || []);
-        const rooms = roomsRes.data || [];
-        
+        setTodaySchedules(response.data.schedules || []);
         setStats({
-          totalRooms: rooms.length,
-          activeSchedules: schedulesRes.data.schedules?.length || 0,
-          availableRooms: rooms.filter(room => !room.current_schedule).length
+          totalRooms: response.data.rooms.active,
+          activeSchedules: response.data.schedules.length,
+          availableRooms: response.data.rooms.available
         });
       } catch (error) {
         console.error('Error fetching data:', error);
@@ -129,7 +129,18 @@ const SchedulePage = () => {
       fetchSchedules();
     } catch (error) {
       console.error('Error saving schedule:', error);
-      alert('Error saving schedule. Please check for overlapping schedules.');
+      const data = error.response?.data || {};
+      const lines = [data.non_field_errors?.[0] || 'Error saving schedule. Please check for overlapping schedules.'];
+      const alternatives = data.alternatives;
+      if (alternatives?.slots?.length) {
+        lines.push('', 'Free times in this room:');
+        alternatives.slots.forEach(slot => lines.push(`  ${slot.start_time.slice(0, 5)} - ${slot.end_time.slice(0, 5)}`));
+      }
+      if (alternatives?.rooms?.length) {
+        lines.push('', 'Free rooms at this time:');
+        alternatives.rooms.forEach(room => lines.push(`  ${room.name} (${room.number}), ${room.building}, ${room.capacity} seats`));
+      }
+      alert(lines.join('\n'));
     }
   };
 
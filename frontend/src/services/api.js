@@ -3,6 +3,9 @@ import axios from 'axios';
 // Use environment variable for production or localhost for development
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
 
+// Optional base URL of the snapshots written by export_static_schedules
+const SNAPSHOT_BASE_URL = process.env.REACT_APP_SNAPSHOT_URL;
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -38,8 +41,15 @@ export const scheduleAPI = {
   update: (id, data) => api.put(`/schedules/${id}/`, data),
   delete: (id) => api.delete(`/schedules/${id}/`),
   getTodaySchedule: () => api.get('/schedules/today/'),
+  // Today's schedules with room counts and busy rooms, in one cached request
+  getDashboard: () => api.get('/dashboard/'),
   updateStatus: (id, status) => api.post(`/schedules/${id}/status/`, { status }),
-  getRoomSchedule: (roomId, params) => api.get(`/rooms/${roomId}/schedule/`, { params }),
+  // Week views come from the static snapshot when one is published, and
+  // fall back to the API for weeks outside the snapshot window
+  getRoomSchedule: (roomId, params) => (SNAPSHOT_BASE_URL && params?.start_date
+    ? axios.get(`${SNAPSHOT_BASE_URL}/rooms/${roomId}/week-${params.start_date}.json`)
+        .catch(() => api.get(`/rooms/${roomId}/schedule/`, { params }))
+    : api.get(`/rooms/${roomId}/schedule/`, { params })),
 };
 
 export default api;
@@ -0,0 +1,26 @@
+from django.contrib import admin
+from django.utils import timezone
+from rooms.admin import EstimatedCountPaginator
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'run_after', 'started_at', 'finished_at', 'worker']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'last_error']
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = [
+        'task', 'kwargs', 'attempts', 'worker', 'last_error', 'created_at', 'started_at', 'finished_at'
+    ]
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        retried = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_after=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f'{retried} failed jobs queued again.')
+
+    retry_jobs.short_description = "Retry selected failed jobs"
@@ -0,0 +1,83 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from jobs.queue import claim, purge_finished, queue_metrics, run_job
+
+
+def work(name, stop, poll, burst):
+    """Worker process loop: claim and run jobs until told to stop"""
+    # The supervisor handles Ctrl-C and tells workers to stop after their current job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        while not stop.is_set():
+            job = claim(name)
+            if job is not None:
+                run_job(job)
+            elif burst:
+                return
+            else:
+                stop.wait(poll)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers that claim jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds an idle worker waits before polling again')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--metrics-interval', type=int, default=60, help='Seconds between queue metrics reports')
+
+    def handle(self, *args, **options):
+        # Workers are forked; they must not share the supervisor's connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        host = socket.gethostname()
+
+        def start(index):
+            name = f'{host}:{os.getpid()}:{index}'
+            process = context.Process(
+                target=work, args=(name, stop, options['poll'], options['burst']), name=name, daemon=True
+            )
+            process.start()
+            return process
+
+        def shutdown(signum, frame):
+            self.stdout.write('Stopping workers after their current jobs...')
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        processes = [start(index) for index in range(options['processes'])]
+        self.stdout.write(self.style.SUCCESS(f"=== Started {len(processes)} job workers ==="))
+
+        next_report = time.monotonic() + options['metrics_interval']
+        while any(process.is_alive() for process in processes):
+            for index, process in enumerate(processes):
+                process.join(timeout=1 / len(processes))
+                # Replace workers that crashed; burst workers exit when done
+                if not process.is_alive() and process.exitcode != 0 and not stop.is_set():
+                    self.stderr.write(f'Worker {process.name} exited with {process.exitcode}, restarting')
+                    processes[index] = start(index)
+            if time.monotonic() >= next_report:
+                purge_finished()
+                self.report()
+                connections.close_all()
+                next_report = time.monotonic() + options['metrics_interval']
+
+        self.report()
+        self.stdout.write(self.style.SUCCESS('=== Job workers stopped ==='))
+
+    def report(self):
+        self.stdout.write(json.dumps(queue_metrics()))
@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Lower numbers run first
+    priority = models.SmallIntegerField(default=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+    @property
+    def wait_seconds(self):
+        """Time from becoming runnable to being picked up by a worker"""
+        if self.started_at:
+            return (self.started_at - self.run_after).total_seconds()
+        return None
+
+    class Meta:
+        ordering = ['priority', 'run_after', 'id']
+        indexes = [
+            # Matches the claim query: runnable jobs in priority order
+            models.Index(fields=['status', 'priority', 'run_after', 'id'], name='job_claim_idx'),
+            models.Index(fields=['status', 'finished_at'], name='job_finished_idx'),
+        ]
@@ -0,0 +1,176 @@
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITY = 100
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 10
+# A running job whose worker died is handed out again after this long
+JOB_TIMEOUT = timedelta(minutes=15)
+JOB_RETENTION = timedelta(days=7)
+
+registry = {}
+
+
+def task(func=None, *, priority=DEFAULT_PRIORITY, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Register a function as a job task; queue it with `func.delay(**kwargs)`"""
+    if func is None:
+        return partial(task, priority=priority, max_attempts=max_attempts)
+
+    func.task_name = f'{func.__module__}.{func.__name__}'
+    func.priority = priority
+    func.max_attempts = max_attempts
+    func.delay = partial(enqueue, func)
+    registry[func.task_name] = func
+    return func
+
+
+def enqueue(func, priority=None, delay=None, **kwargs):
+    """Queue a task to run after the current transaction commits.
+
+    Keyword arguments must be JSON serializable. With JOB_QUEUE_ASYNC off
+    (local development) the task runs inline instead, once the
+    transaction commits, so no worker is needed.
+    """
+    if not getattr(settings, 'JOB_QUEUE_ASYNC', True):
+        transaction.on_commit(partial(func, **kwargs))
+        return None
+    return Job.objects.create(
+        task=func.task_name,
+        kwargs=kwargs,
+        priority=func.priority if priority is None else priority,
+        max_attempts=func.max_attempts,
+        run_after=timezone.now() + (delay or timedelta()),
+    )
+
+
+def has_unfinished(func, **kwargs):
+    """Whether a queued or running job of the task was given `kwargs`, checked in the database.
+
+    Where JSON containment is supported (PostgreSQL) list arguments match
+    any job whose list holds their items, e.g. room_ids=[1] a job for
+    rooms [1, 2]; elsewhere (SQLite) arguments must match exactly.
+    """
+    jobs = Job.objects.filter(task=func.task_name, status__in=['queued', 'running'])
+    if connections[jobs.db].features.supports_json_field_contains:
+        return jobs.filter(kwargs__contains=kwargs).exists()
+    return jobs.filter(**{f'kwargs__{key}': value for key, value in kwargs.items()}).exists()
+
+
+def runnable_jobs(now):
+    return Job.objects.filter(
+        Q(status='queued', run_after__lte=now) |
+        Q(status='running', started_at__lt=now - JOB_TIMEOUT)
+    ).order_by('priority', 'run_after', 'id')
+
+
+def claim(worker):
+    """Take the next runnable job for `worker`, or return None.
+
+    PostgreSQL claims with SELECT ... FOR UPDATE SKIP LOCKED, so workers
+    never wait on each other's rows. SQLite has no row locks but runs
+    one writer at a time, so a compare-and-set UPDATE claims there.
+    """
+    now = timezone.now()
+    using = router.db_for_write(Job)
+    if connections[using].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=using):
+            job = runnable_jobs(now).using(using).select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = 'running'
+            job.started_at = now
+            job.attempts += 1
+            job.worker = worker
+            job.save(update_fields=['status', 'started_at', 'attempts', 'worker'])
+            return job
+
+    while True:
+        candidate = runnable_jobs(now).using(using).values_list('pk', 'status', 'started_at').first()
+        if candidate is None:
+            return None
+        pk, status, started_at = candidate
+        claimed = Job.objects.using(using).filter(pk=pk, status=status, started_at=started_at).update(
+            status='running', started_at=now, attempts=F('attempts') + 1, worker=worker
+        )
+        if claimed:
+            return Job.objects.using(using).get(pk=pk)
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome, retrying with backoff on failure"""
+    func = registry.get(job.task)
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Worker lost while running the last attempt')
+        if func is None:
+            raise LookupError(f'Unknown task {job.task}')
+        func(**job.kwargs)
+    except Exception:
+        logger.exception('Job %s failed (attempt %s of %s)', job, job.attempts, job.max_attempts)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+        job.last_error = ''
+    job.save(update_fields=['status', 'run_after', 'finished_at', 'last_error'])
+    return job
+
+
+def purge_finished(now=None):
+    """Delete jobs that finished successfully more than JOB_RETENTION ago"""
+    now = now or timezone.now()
+    deleted, _ = Job.objects.filter(status='done', finished_at__lt=now - JOB_RETENTION).delete()
+    return deleted
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    return {
+        'p50': round(values[len(values) // 2], 3),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        'max': round(values[-1], 3),
+    }
+
+
+def queue_metrics(window=timedelta(hours=1)):
+    """Queue depth and job latency: wait before a worker picks a job up, and run time"""
+    now = timezone.now()
+    counts = dict(Job.objects.values_list('status').annotate(count=Count('id')).order_by())
+    oldest = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after').values_list(
+        'run_after', flat=True
+    ).first()
+    recent = Job.objects.filter(started_at__gte=now - window).values_list('run_after', 'started_at', 'finished_at')
+    waits = []
+    runs = []
+    for run_after, started_at, finished_at in recent:
+        waits.append((started_at - run_after).total_seconds())
+        if finished_at:
+            runs.append((finished_at - started_at).total_seconds())
+    return {
+        'queued': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'failed': counts.get('failed', 0),
+        'done': counts.get('done', 0),
+        'oldest_queued_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0,
+        'window_minutes': int(window.total_seconds() // 60),
+        'wait_seconds': percentiles(waits),
+        'run_seconds': percentiles(runs),
+    }
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rooms.models import Department, Room
+from .models import Job
+from .queue import JOB_TIMEOUT, RETRY_BACKOFF_SECONDS, claim, purge_finished, run_job, task
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise ValueError('boom')
+
+
+@override_settings(JOB_QUEUE_ASYNC=True)
+class JobQueueTests(TestCase):
+    """Workers claim runnable jobs in order, retry failures with backoff and recover lost jobs"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claims_in_priority_order(self):
+        later = record.delay(value='later', delay=timedelta(minutes=5))
+        low = record.delay(value='low', priority=200)
+        high = record.delay(value='high', priority=10)
+
+        self.assertEqual(claim('w1').pk, high.pk)
+        job = claim('w2')
+        self.assertEqual((job.pk, job.status, job.attempts, job.worker), (low.pk, 'running', 1, 'w2'))
+        # Not yet runnable, and the claimed ones are taken
+        self.assertIsNone(claim('w3'))
+        later.refresh_from_db()
+        self.assertEqual(later.status, 'queued')
+
+    def test_runs_a_job(self):
+        record.delay(value=1)
+        job = run_job(claim('w1'))
+        self.assertEqual(calls, [1])
+        self.assertEqual(job.status, 'done')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retries_with_backoff_then_fails(self):
+        explode.delay()
+        before = timezone.now()
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            job = run_job(claim('w1'))
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('boom', job.last_error)
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=RETRY_BACKOFF_SECONDS))
+        # Backing off: not runnable until run_after
+        self.assertIsNone(claim('w1'))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            job = run_job(claim('w1'))
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNone(claim('w1'))
+
+    def test_unknown_task_fails(self):
+        Job.objects.create(task='jobs.tests.missing', max_attempts=1)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            job = run_job(claim('w1'))
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Unknown task', job.last_error)
+
+    def test_timed_out_job_is_claimed_again(self):
+        job = record.delay(value='lost')
+        claim('dead')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - JOB_TIMEOUT - timedelta(seconds=1))
+        job = claim('w2')
+        self.assertEqual((job.worker, job.attempts), ('w2', 2))
+        self.assertEqual(run_job(job).status, 'done')
+
+        # A worker lost during the last attempt fails the job instead of running it again
+        lost = record.delay(value='lost again')
+        Job.objects.filter(pk=lost.pk).update(
+            status='running', attempts=lost.max_attempts,
+            started_at=timezone.now() - JOB_TIMEOUT - timedelta(seconds=1)
+        )
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            job = run_job(claim('w3'))
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(calls, ['lost'])
+
+    def test_purge_finished(self):
+        record.delay(value=1)
+        run_job(claim('w1'))
+        self.assertEqual(purge_finished(), 0)
+        self.assertEqual(purge_finished(timezone.now() + timedelta(days=8)), 1)
+
+    def test_room_saves_queue_one_qr_job(self):
+        room = Room.objects.create(
+            name='Lab', number='PHY-1', capacity=20,
+            department=Department.objects.create(name='Physics', code='PHY')
+        )
+        room.capacity = 25
+        room.save()
+        self.assertEqual(Job.objects.filter(task='rooms.tasks.generate_qr_codes').count(), 1)
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('jobs/metrics/', views.job_metrics, name='job-metrics'),
+]
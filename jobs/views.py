@@ -0,0 +1,9 @@
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from .queue import queue_metrics
+
+
+@api_view(['GET'])
+def job_metrics(request):
+    """Job queue depth and latency over the last hour"""
+    return Response(queue_metrics())
@@ -3,6 +3,7 @@ Production settings for Room Scheduler
 """
 import os
 from .settings import *
+from .sqlite import sqlite_database
 
 # Override settings for production
 DEBUG = False
@@ -32,14 +33,15 @@ if DATABASE_URL:
     }
     print(f"Using PostgreSQL database: {DATABASES['default']['NAME']}")
 else:
-    # Fallback to SQLite for development
+    # Single-node SQLite: WAL, BEGIN IMMEDIATE and persistent connections
+    # (see room_scheduler/sqlite.py). Point SQLITE_PATH at a persistent volume.
     DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
-        }
+        'default': sqlite_database(
+            os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            tuned=os.environ.get('SQLITE_TUNED', 'True') == 'True'
+        )
     }
-    print("WARNING: Using SQLite fallback - data will not persist on Railway!")
+    print("Using SQLite database - mount SQLITE_PATH on a volume so data persists on Railway")
 
 # Ensure database connections don't timeout and set proper options
 if 'postgresql' in DATABASES['default']['ENGINE']:
@@ -49,11 +51,6 @@ if 'postgresql' in DATABASES['default']['ENGINE']:
             'connect_timeout': 10,
         }
     })
-else:
-    # For SQLite
-    DATABASES['default'].update({
-        'CONN_MAX_AGE': 0,  # Don't reuse connections for SQLite
-    })
 
 # CORS settings for production
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', 'https://room-scheduler-gray.vercel.app,http://localhost:3000').split(',')
@@ -62,6 +59,53 @@ CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', 'https://room-sche
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = False  # Set to True only for debugging
 
+# Slow work (QR rendering, bulk admin actions) goes to the database job
+# queue only when a worker runs it: set JOB_QUEUE_ASYNC=True on the web
+# service once a `run_workers` process is deployed. Otherwise jobs run
+# inline after the request commits, as in development.
+JOB_QUEUE_ASYNC = os.environ.get('JOB_QUEUE_ASYNC', 'False') == 'True'
+
+# Redis shares the cache between workers and hosts; without it, a file
+# cache still shares it between the workers of one host
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    # Room availability alone keeps an entry per room, so the default 300
+    # entries would cull at random and drop locks and counters with them.
+    # Every set() lists the whole directory to count entries, so each
+    # write costs a scan of up to MAX_ENTRIES files: keep it in the low
+    # thousands, and use Redis for larger campuses.
+    # Its add and incr are not atomic: single-flight locks, the data
+    # version, throttle counters and the occupancy sequence are only
+    # best-effort here. Set REDIS_URL when running more than one worker.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', '/tmp/room-scheduler-cache'),
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '3000')),
+                'CULL_FREQUENCY': 4,
+            },
+        }
+    }
+    if int(os.environ.get('WEB_CONCURRENCY', '1')) > 1:
+        print("WARNING: several workers share a file cache; set REDIS_URL for atomic cache locks and counters")
+
+# Workers number booking changes with cache.incr, which only Redis makes
+# atomic; on the file cache two changes can share a number and one is
+# lost until the next day's reload, so the index stays off there
+OCCUPANCY_INDEX_ENABLED = os.environ.get('OCCUPANCY_INDEX_ENABLED', str(bool(REDIS_URL))) == 'True'
+
+# Railway's proxy appends the client address to X-Forwarded-For
+THROTTLE_NUM_PROXIES = int(os.environ.get('THROTTLE_NUM_PROXIES', '1'))
+THROTTLE_BACKEND = os.environ.get('THROTTLE_BACKEND', 'local')
+
 # Static files configuration for Railway
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -77,6 +121,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'rooms.throttling.ThrottleMiddleware',
+    'rooms.telemetry.ScanTelemetryMiddleware',
+    'rooms.response_cache.CompressedResponseCacheMiddleware',
+    'rooms.query_budget.QueryBudgetMiddleware',
 ]
 
 # WhiteNoise configuration
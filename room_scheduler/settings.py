@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .sqlite import sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'corsheaders',
+    'jobs',
     'rooms',
     'schedules',
 ]
@@ -52,6 +56,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'rooms.throttling.ThrottleMiddleware',
+    'rooms.telemetry.ScanTelemetryMiddleware',
+    'rooms.response_cache.CompressedResponseCacheMiddleware',
+    'rooms.query_budget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'room_scheduler.urls'
@@ -77,11 +85,10 @@ WSGI_APPLICATION = 'room_scheduler.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLITE_TUNED=False restores SQLite's defaults (rollback journal, a new
+# connection per request)
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3', tuned=os.environ.get('SQLITE_TUNED', 'True') == 'True')
 }
 
 
@@ -142,6 +149,51 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Background jobs run inline during development; production runs them in
+# `manage.py run_workers` processes
+JOB_QUEUE_ASYNC = False
+
+# Query budgets per URL name ('rooms:room-list'), overriding @query_budget on
+# the view. Checked by QueryBudgetMiddleware when DEBUG is on; tests set
+# QUERY_BUDGET_ENFORCE to turn overruns and N+1 patterns into failures.
+QUERY_BUDGETS = {}
+QUERY_BUDGET_ENFORCE = False
+
+# Shared cache behind rooms.tiered_cache (which keeps a per-process LRU in
+# front of it), the response cache, kiosk boards and throttling
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'room-scheduler',
+    }
+}
+TIERED_CACHE_ALIAS = 'default'
+
+# Per-client rate limits by endpoint class ('scan', 'kiosk', 'feed', 'read',
+# 'write'), overriding rooms.throttling.DEFAULT_THROTTLE_RATES. Writes are
+# unthrottled unless given a rate, e.g. {'write': '120/min'}. The 'cache'
+# backend shares budgets across workers through CACHES.
+THROTTLE_ENABLED = True
+THROTTLE_BACKEND = 'local'
+THROTTLE_RATES = {}
+THROTTLE_NUM_PROXIES = 0
+
+# Past any of these, public reads are served from the last cached snapshot
+# (or refused with 503) so staff writes keep their workers. The in-flight
+# limit counts one process's concurrent requests, so it is off by default:
+# gunicorn's sync workers run one request each. Set it with --threads.
+LOAD_SHED_ENABLED = True
+LOAD_SHED_MAX_IN_FLIGHT = None
+LOAD_SHED_LATENCY = 2.0
+LOAD_SHED_QUEUE_WAIT = 1.0
+LOAD_SHED_WINDOW = 10
+
+# Answer availability and free-slot lookups from schedules.occupancy, an
+# in-memory index of the coming two weeks' bookings. Workers stay in step
+# through a change sequence in CACHES, so a per-process cache (LocMem)
+# only suits a single worker.
+OCCUPANCY_INDEX_ENABLED = True
+
 # Media files for QR codes
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
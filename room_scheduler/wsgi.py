@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'room_scheduler.settings')
 
 application = get_wsgi_application()
+
+# Load the occupancy index before the first request rather than during it
+from datetime import date  # noqa: E402
+
+from schedules.occupancy import index  # noqa: E402
+
+index.ready(date.today())
@@ -1,5 +1,50 @@
 from django.contrib import admin
-from .models import Department, Room
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import Department, Room, RoomScanHourly
+from .tasks import generate_qr_codes
+
+
+# Admin bulk actions touch rows in primary-key chunks of this size, so no
+# single statement holds locks on more than this many rows
+ACTION_CHUNK_SIZE = 1000
+
+# Unfiltered changelists above this many rows show the planner's estimate
+# instead of running an exact COUNT(*) over the whole table
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses PostgreSQL's table statistics for unfiltered lists"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+def pk_chunks(queryset, chunk_size=ACTION_CHUNK_SIZE):
+    """Yield lists of primary keys from a queryset, walking the pk index in order"""
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        page = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
 
 
 @admin.register(Department)
@@ -14,7 +59,10 @@ class DepartmentAdmin(admin.ModelAdmin):
 class RoomAdmin(admin.ModelAdmin):
     list_display = ['name', 'number', 'department', 'room_type', 'capacity', 'is_active']
     list_filter = ['department', 'room_type', 'is_active', 'floor']
+    list_select_related = ['department']
     search_fields = ['name', 'number', 'equipment']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ['qr_code', 'created_at', 'updated_at']
     fieldsets = (
         ('Basic Information', {
@@ -39,10 +87,26 @@ class RoomAdmin(admin.ModelAdmin):
     actions = ['regenerate_qr_codes']
     
     def regenerate_qr_codes(self, request, queryset):
-        for room in queryset:
-            if room.qr_code:
-                room.qr_code.delete()
-            room.generate_qr_code()
-        self.message_user(request, f'QR codes regenerated for {queryset.count()} rooms.')
+        queued = 0
+        for chunk in pk_chunks(queryset):
+            generate_qr_codes.delay(room_ids=chunk, regenerate=True)
+            queued += len(chunk)
+        self.message_user(request, f'QR code regeneration queued for {queued} rooms.')
     
     regenerate_qr_codes.short_description = "Regenerate QR codes for selected rooms"
+
+
+@admin.register(RoomScanHourly)
+class RoomScanHourlyAdmin(admin.ModelAdmin):
+    list_display = ['room', 'hour', 'count']
+    list_filter = ['room__building', 'room__department']
+    date_hierarchy = 'hour'
+    list_select_related = ['room']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using='default', **kwargs):
+    from .search import install_search_index
+    install_search_index(using)
 
 
 class RoomsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rooms'
+
+    def ready(self):
+        post_migrate.connect(install_search_index, sender=self)
@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from schedules.kiosk import invalidate_boards
+from .models import Department, Room
+from .response_cache import bump_data_version
+from .tasks import generate_qr_codes
+
+# Columns a room row may carry; `department` is the department's code, and
+# `department_name` creates or renames the department
+ROOM_FIELDS = ['name', 'number', 'room_type', 'capacity', 'equipment', 'floor', 'building', 'is_active']
+TEXT_FIELDS = ['name', 'number', 'equipment', 'floor', 'building']
+REQUIRED_FIELDS = ['name', 'number', 'department', 'capacity']
+IMPORT_FORMATS = ['csv', 'json']
+CHUNK_SIZE = 1000
+# Rooms per QR rendering job
+QR_JOB_SIZE = 200
+MAX_ERRORS = 50
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off'}
+
+
+class RoomImportError(Exception):
+    """The rows did not validate; nothing was imported"""
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} invalid rows')
+        self.errors = errors
+
+
+def read_rows(source, import_format):
+    """Rows as dicts from CSV or JSON text (a list of objects)"""
+    if import_format == 'csv':
+        return list(csv.DictReader(io.StringIO(source)))
+    try:
+        rows = json.loads(source)
+    except ValueError as e:
+        raise RoomImportError([f'Invalid JSON: {e}'])
+    return check_rows(rows)
+
+
+def check_rows(rows):
+    """`rows` if it is a list of objects, as parsed JSON must be"""
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise RoomImportError(['JSON must be a list of room objects'])
+    return rows
+
+
+def clean_row(row):
+    """(department code, department name, room field values) of one row, or raise ValueError"""
+    # Lists and objects from JSON are not cell values
+    nested = [
+        field for field in [*ROOM_FIELDS, 'department', 'department_name'] if isinstance(row.get(field), (list, dict))
+    ]
+    if nested:
+        raise ValueError(f"{', '.join(nested)} must be a single value")
+    missing = [field for field in REQUIRED_FIELDS if str(row.get(field) or '').strip() == '']
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    values = {}
+    for field in ROOM_FIELDS:
+        value = str(row[field]) if field in TEXT_FIELDS and row.get(field) is not None else row.get(field)
+        value = value.strip() if isinstance(value, str) else value
+        # An empty CSV cell leaves a choice or flag at its default
+        if value is not None and (value != '' or field in TEXT_FIELDS):
+            values[field] = value
+
+    try:
+        values['capacity'] = int(values['capacity'])
+    except (TypeError, ValueError):
+        raise ValueError(f"capacity '{values['capacity']}' is not a number")
+    if values['capacity'] < 0:
+        raise ValueError('capacity must not be negative')
+    if 'room_type' in values and values['room_type'] not in dict(Room.ROOM_TYPES):
+        raise ValueError(f"unknown room_type '{values['room_type']}'")
+    if isinstance(values.get('is_active'), str):
+        flag = values['is_active'].lower()
+        if flag not in TRUE_VALUES | FALSE_VALUES:
+            raise ValueError(f"is_active '{values['is_active']}' is not true or false")
+        values['is_active'] = flag in TRUE_VALUES
+    for field in TEXT_FIELDS:
+        max_length = Room._meta.get_field(field).max_length
+        if max_length and len(values.get(field, '')) > max_length:
+            raise ValueError(f'{field} is longer than {max_length} characters')
+    code, department_name = str(row['department']).strip(), str(row.get('department_name') or '').strip()
+    for column, field, value in [('department', 'code', code), ('department_name', 'name', department_name)]:
+        max_length = Department._meta.get_field(field).max_length
+        if len(value) > max_length:
+            raise ValueError(f'{column} is longer than {max_length} characters')
+    return code, department_name, values
+
+
+def import_rooms(rows, chunk_size=CHUNK_SIZE, dry_run=False, qr_codes=True):
+    """Create or update rooms (matched on department and number) in bulk.
+
+    Every row is checked first and all problems are reported together in
+    RoomImportError. Departments are looked up by code in one query
+    (created when the row names them), rooms are upserted in chunks with
+    one INSERT ... ON CONFLICT each, and QR codes for new rooms are
+    queued as jobs instead of rendered inline (skipped without
+    `qr_codes`; pages render missing codes on the fly). Returns counts.
+    """
+    errors = []
+    cleaned = []
+    seen = {}
+    for line, row in enumerate(rows, start=1):
+        try:
+            code, department_name, values = clean_row(row)
+        except ValueError as e:
+            errors.append(f'Row {line}: {e}')
+            continue
+        key = (code, values['number'])
+        if key in seen:
+            errors.append(f'Row {line}: room {values["number"]} of {code} repeats row {seen[key]}')
+            continue
+        seen[key] = line
+        cleaned.append((code, department_name, values))
+
+    codes = {code for code, _, _ in cleaned}
+    departments = Department.objects.in_bulk(codes, field_name='code')
+    names = {code: name for code, name, _ in cleaned if name}
+    unknown = sorted(codes - set(departments) - set(names))
+    errors.extend(f"Unknown department '{code}' (add a department_name column to create it)" for code in unknown)
+    if errors:
+        raise RoomImportError(errors[:MAX_ERRORS] + (
+            [f'... and {len(errors) - MAX_ERRORS} more'] if len(errors) > MAX_ERRORS else []
+        ))
+
+    new_departments = sorted(set(names) - set(departments))
+    existing = set(
+        Room.objects.filter(department__code__in=codes).values_list('department__code', 'number')
+    ) if departments else set()
+    result = {
+        'rooms_created': sum(1 for code, _, values in cleaned if (code, values['number']) not in existing),
+        'rooms_updated': sum(1 for code, _, values in cleaned if (code, values['number']) in existing),
+        'departments_created': len(new_departments),
+        'qr_codes_queued': 0,
+    }
+    if dry_run or not cleaned:
+        return result
+
+    with transaction.atomic():
+        if names:
+            Department.objects.bulk_create(
+                [Department(code=code, name=name) for code, name in names.items()],
+                update_conflicts=True, unique_fields=['code'], update_fields=['name']
+            )
+            departments = Department.objects.in_bulk(codes, field_name='code')
+
+        # Existing rooms get the columns their row has; the rest keep their values
+        groups = defaultdict(list)
+        for code, _, values in cleaned:
+            groups[tuple(sorted(values))].append(Room(department=departments[code], **values))
+        for fields, rooms in groups.items():
+            Room.objects.bulk_create(
+                rooms, batch_size=chunk_size, update_conflicts=True, unique_fields=['department', 'number'],
+                update_fields=[field for field in fields if field != 'number'] + ['updated_at']
+            )
+
+        # bulk_create skips Room.save(), which queues QR codes, and the signals that drop cached responses
+        missing_qr = list(Room.objects.filter(
+            department_id__in=[department.pk for department in departments.values()], qr_code=''
+        ).values_list('pk', flat=True)) if qr_codes else []
+        for start in range(0, len(missing_qr), QR_JOB_SIZE):
+            generate_qr_codes.delay(room_ids=missing_qr[start:start + QR_JOB_SIZE])
+        result['qr_codes_queued'] = len(missing_qr)
+        transaction.on_commit(bump_data_version)
+        transaction.on_commit(invalidate_boards)
+    return result
@@ -0,0 +1,52 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from rooms.importer import CHUNK_SIZE, IMPORT_FORMATS, RoomImportError, import_rooms, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Create or update rooms (and departments) from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, or a JSON list of room objects')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='File format (default: from the extension)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rooms per INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Check the file and count changes only')
+        parser.add_argument('--skip-qr-codes', action='store_true', help='Do not queue QR code rendering')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== IMPORT ROOMS ==='))
+        path = Path(options['path'])
+        import_format = options['format'] or path.suffix.lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(f"Cannot tell the format of {path.name}; pass --format {' or '.join(IMPORT_FORMATS)}")
+        try:
+            # utf-8-sig drops the byte order mark spreadsheets put in CSV exports
+            source = path.read_text(encoding='utf-8-sig')
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        started = time.monotonic()
+        try:
+            result = import_rooms(
+                read_rows(source, import_format), chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'], qr_codes=not options['skip_qr_codes']
+            )
+        except RoomImportError as e:
+            for error in e.errors:
+                self.stderr.write(error)
+            raise CommandError(f'Nothing imported: {e}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run: {result['rooms_created']} rooms to create, {result['rooms_updated']} to update, "
+                f"{result['departments_created']} departments to create"
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['rooms_created']} rooms created, {result['rooms_updated']} updated, "
+            f"{result['departments_created']} departments created in {time.monotonic() - started:.2f}s"
+        ))
+        if result['qr_codes_queued']:
+            self.stdout.write(f"Queued QR codes for {result['qr_codes_queued']} rooms")
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rooms.telemetry import rollup_scans
+
+
+class Command(BaseCommand):
+    help = 'Recount hourly QR scan totals from the raw scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='How many past hours to recount')
+
+    def handle(self, *args, **options):
+        rows = rollup_scans(timezone.now() - timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {rows} room-hours of scans'))
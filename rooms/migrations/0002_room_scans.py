@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scanned_at', models.DateTimeField(db_index=True)),
+                ('agent', models.CharField(choices=[('ios', 'iOS'), ('android', 'Android'), ('mobile', 'Other mobile'), ('desktop', 'Desktop'), ('bot', 'Bot'), ('other', 'Other')], default='other', max_length=10)),
+                ('room', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='scans', to='rooms.room')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RoomScanHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_scans', to='rooms.room')),
+            ],
+            options={
+                'ordering': ['-hour', 'room'],
+                'unique_together': {('room', 'hour')},
+            },
+        ),
+    ]
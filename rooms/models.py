@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.urls import reverse
 import qrcode
@@ -7,6 +8,29 @@ from PIL import Image
 import os
 
 
+def qr_code_png(room_id):
+    """PNG bytes of the QR code linking to a room's schedule page"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    
+    # Create URL for room schedule (will work when frontend is deployed)
+    room_url = f"http://localhost:3000/room/{room_id}/schedule"
+    qr.add_data(room_url)
+    qr.make(fit=True)
+
+    # Create QR code image
+    qr_image = qr.make_image(fill_color="black", back_color="white")
+    
+    # Save to BytesIO
+    buffer = BytesIO()
+    qr_image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
 class Department(models.Model):
     name = models.CharField(max_length=100)
     code = models.CharField(max_length=10, unique=True)
@@ -51,36 +75,59 @@ class Room(models.Model):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        self.generate_qr_code()
+        if not self.qr_code:
+            # Rendering the image is slow; a job worker does it off the request
+            from jobs.queue import has_unfinished
+            from .tasks import generate_qr_codes
+            # Saving again before the worker gets to it must not queue another render
+            if getattr(settings, 'JOB_QUEUE_ASYNC', True) and has_unfinished(generate_qr_codes, room_ids=[self.pk]):
+                return
+            generate_qr_codes.delay(room_ids=[self.pk])
 
     def generate_qr_code(self):
         """Generate QR code for room schedule access"""
         if not self.qr_code:
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            
-            # Create URL for room schedule (will work when frontend is deployed)
-            room_url = f"http://localhost:3000/room/{self.id}/schedule"
-            qr.add_data(room_url)
-            qr.make(fit=True)
-
-            # Create QR code image
-            qr_image = qr.make_image(fill_color="black", back_color="white")
-            
-            # Save to BytesIO
-            buffer = BytesIO()
-            qr_image.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            # Save to model
-            filename = f'room_{self.id}_qr.png'
-            self.qr_code.save(filename, File(buffer), save=False)
+            self.render_qr_code()
             super().save(update_fields=['qr_code'])
 
+    def render_qr_code(self):
+        """Render the QR code image into storage without saving the row"""
+        filename = f'room_{self.id}_qr.png'
+        self.qr_code.save(filename, File(BytesIO(qr_code_png(self.id))), save=False)
+
     class Meta:
         ordering = ['department', 'name']
         unique_together = ['department', 'number']
+
+
+class RoomScan(models.Model):
+    """One hit on a room's public schedule or availability, kept briefly for rollups"""
+    AGENT_TYPES = [
+        ('ios', 'iOS'),
+        ('android', 'Android'),
+        ('mobile', 'Other mobile'),
+        ('desktop', 'Desktop'),
+        ('bot', 'Bot'),
+        ('other', 'Other'),
+    ]
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='scans', db_constraint=False)
+    scanned_at = models.DateTimeField(db_index=True)
+    agent = models.CharField(max_length=10, choices=AGENT_TYPES, default='other')
+
+    def __str__(self):
+        return f"{self.room_id} at {self.scanned_at}"
+
+
+class RoomScanHourly(models.Model):
+    """Scans per room and hour, rolled up from RoomScan"""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='hourly_scans')
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.room} {self.hour:%Y-%m-%d %H:00}: {self.count}"
+
+    class Meta:
+        ordering = ['-hour', 'room']
+        unique_together = ['room', 'hour']
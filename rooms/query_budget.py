@@ -0,0 +1,145 @@
+import logging
+import re
+import sys
+import traceback
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# An identical SQL shape running this many times in one request is an N+1
+N_PLUS_ONE_THRESHOLD = 3
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its budget, or repeated one query shape per row"""
+
+
+def query_budget(max_queries, allow_repeats=False):
+    """Declare the most queries a view may run; enforced by QueryBudgetMiddleware.
+
+    Works on function views and view classes. `allow_repeats` exempts a
+    view that repeats a query shape by design from the N+1 check.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        view.query_budget_allow_repeats = allow_repeats
+        return view
+    return decorator
+
+
+def view_attribute(view, name):
+    """Read a @query_budget attribute from a function view or a class view's as_view()"""
+    value = getattr(view, name, None)
+    if value is None:
+        value = getattr(getattr(view, 'view_class', None), name, None)
+    return value
+
+
+def budget_for(resolver_match):
+    """The budget of a resolved view: QUERY_BUDGETS setting first, then the decorator"""
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    if resolver_match.view_name in budgets:
+        return budgets[resolver_match.view_name]
+    return view_attribute(resolver_match.func, 'query_budget')
+
+
+def sql_shape(sql):
+    """The SQL with parameter lists of any length folded together"""
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def serializer_field_origin(frame):
+    """Name the innermost serializer field being rendered when a query ran"""
+    from rest_framework.fields import Field
+
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if isinstance(owner, Field) and getattr(owner, 'field_name', None):
+            return f'{type(owner.parent).__name__}.{owner.field_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    """execute_wrapper that remembers each query's shape and where it came from"""
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = defaultdict(int)
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        shape = sql_shape(sql)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == N_PLUS_ONE_THRESHOLD:
+            frame = sys._getframe(1)
+            self.origins[shape] = (
+                serializer_field_origin(frame),
+                ''.join(traceback.format_list([
+                    entry for entry in traceback.extract_stack(frame)
+                    if str(settings.BASE_DIR) in entry.filename and 'site-packages' not in entry.filename
+                ])),
+            )
+        return execute(sql, params, many, context)
+
+    def repeated(self):
+        return [
+            (shape, self.shapes[shape], *self.origins[shape])
+            for shape in self.origins
+        ]
+
+
+class QueryBudgetMiddleware:
+    """Count each view's queries against its budget and look for N+1 patterns.
+
+    Active when DEBUG is on or QUERY_BUDGET_ENFORCE is set. Problems are
+    logged and reported in X-Query-* headers; with QUERY_BUDGET_ENFORCE
+    (the test suite sets it) they raise QueryBudgetExceeded instead.
+    Keep this last in MIDDLEWARE so only the view's own queries count.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        enforce = getattr(settings, 'QUERY_BUDGET_ENFORCE', False)
+        if not (settings.DEBUG or enforce):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return response
+
+        problems = []
+        budget = budget_for(resolver_match)
+        if budget is not None and recorder.count > budget:
+            problems.append(f'{resolver_match.view_name} ran {recorder.count} queries, budget is {budget}')
+        repeated = [] if view_attribute(resolver_match.func, 'query_budget_allow_repeats') else recorder.repeated()
+        for shape, count, origin, stack_trace in repeated:
+            problems.append(
+                f'{resolver_match.view_name} repeated a query {count} times'
+                f"{f' from {origin}' if origin else ''}: {shape}\n{stack_trace}"
+            )
+
+        response['X-Query-Count'] = str(recorder.count)
+        if budget is not None:
+            response['X-Query-Budget'] = str(budget)
+        if problems:
+            if enforce:
+                raise QueryBudgetExceeded('\n'.join(problems))
+            for problem in problems:
+                logger.warning(problem)
+        return response
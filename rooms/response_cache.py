@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is only installed in production
+    brotli = None
+
+# Hot read-only endpoints whose responses are cached, already compressed
+DEFAULT_CACHED_PATHS = [
+    r'^/api/rooms/$',
+    r'^/api/schedules/$',
+    r'^/api/rooms/\d+/schedule/$',
+]
+
+# Responses include time-dependent fields (current_schedule, is_current),
+# so entries are also bounded in age; writes invalidate them at once
+RESPONSE_CACHE_TIMEOUT = 60
+# The last entry per URL outlives its data version, for serving under load
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = 'response-cache:version'
+MIN_COMPRESS_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def data_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Never reuse a version an evicted counter may already have handed out
+        version = int(time.time() * 1000)
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_data_version():
+    """Invalidate every cached response; called whenever rooms or schedules change"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts, from an Accept-Encoding header"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = re.search(r'q=([0-9.]+)', params)
+        if coding and (quality is None or float(quality.group(1) or 0) > 0):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress_entry(response):
+    body = response.content
+    entry = {
+        'content_type': response['Content-Type'],
+        'etag': '"%s"' % hashlib.md5(body).hexdigest(),
+        'identity': body,
+        'stored_at': time.time(),
+    }
+    if len(body) >= MIN_COMPRESS_SIZE:
+        entry['gzip'] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if brotli is not None:
+            entry['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return entry
+
+
+def request_digest(request):
+    query = sorted((key, value) for key, values in request.GET.lists() for value in values)
+    return hashlib.md5(f'{request.path}?{query}'.encode('utf-8')).hexdigest()
+
+
+def cache_key(request):
+    return f'response-cache:{data_version()}:{request_digest(request)}'
+
+
+def snapshot_key(request):
+    return f'response-cache:last:{request_digest(request)}'
+
+
+def entry_response(request, entry):
+    """Answer a request from a cache entry, in the best encoding the client accepts"""
+    if entry['etag'] in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    else:
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = next((coding for coding in ('br', 'gzip') if coding in entry and coding in accepted), None)
+        response = HttpResponse(entry[encoding or 'identity'], content_type=entry['content_type'])
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = entry['etag']
+    patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+    return response
+
+
+class CompressedResponseCacheMiddleware:
+    """Serve hot GET endpoints from a cache of their body and its encodings.
+
+    A miss serializes the response once and stores the body with its gzip
+    and brotli encodings, keyed by URL and the data version. Hits pick an
+    encoding from Accept-Encoding, so neither serialization nor
+    compression runs per request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = [
+            re.compile(pattern)
+            for pattern in getattr(settings, 'RESPONSE_CACHE_PATHS', DEFAULT_CACHED_PATHS)
+        ]
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not any(path.match(request.path) for path in self.paths):
+            return self.get_response(request)
+
+        key = cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            response = self.get_response(request)
+            if (
+                response.status_code != 200 or response.streaming
+                or response.has_header('Content-Encoding') or response.cookies
+            ):
+                return response
+            entry = compress_entry(response)
+            cache.set(key, entry, RESPONSE_CACHE_TIMEOUT)
+            cache.set(snapshot_key(request), entry, SNAPSHOT_TIMEOUT)
+
+        return entry_response(request, entry)
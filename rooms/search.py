@@ -0,0 +1,103 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# Columns that make up a room's search document. Equipment is free text
+# ("Projector, Sound System"); both index flavours tokenize it into words
+# so each piece of equipment matches on its own.
+SEARCH_COLUMNS = ['name', 'number', 'equipment', 'building']
+
+FTS_TABLE = 'rooms_room_fts'
+
+# PostgreSQL: the expression must match the indexed one exactly for the
+# planner to use the GIN index
+PG_DOCUMENT = "to_tsvector('simple', {})".format(
+    " || ' ' || ".join(f'coalesce("rooms_room"."{column}", \'\')' for column in SEARCH_COLUMNS)
+)
+
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {', '.join(SEARCH_COLUMNS)},
+        content='rooms_room', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON rooms_room BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join(f'new.{column}' for column in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON rooms_room BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join(f'old.{column}' for column in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON rooms_room BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join(f'old.{column}' for column in SEARCH_COLUMNS)});
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join(f'new.{column}' for column in SEARCH_COLUMNS)});
+    END""",
+]
+
+
+def install_search_index(using='default'):
+    """Create the room search index for the database's backend.
+
+    Idempotent, and run after every migrate: SQLite drops triggers when a
+    migration rebuilds the rooms table, so they are put back and the FTS
+    table is rebuilt whenever one was missing.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS room_search_idx ON rooms_room USING GIN (({PG_DOCUMENT}))")
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{FTS_TABLE}_a_']
+            )
+            complete = cursor.fetchone()[0] == 3
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+            if not complete:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search_tokens(search):
+    return re.findall(r'\w+', search.lower())
+
+
+def search_rooms(queryset, search):
+    """Filter rooms by prefix match on every search token, best matches first"""
+    tokens = search_tokens(search)
+    if not tokens:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        return queryset.filter(
+            RawSQL(f"{PG_DOCUMENT} @@ to_tsquery('simple', %s)", [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f"ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s))", [query], output_field=FloatField())
+        ).order_by('-search_rank', 'name')
+
+    if vendor == 'sqlite':
+        query = ' '.join(f'"{token}"*' for token in tokens)
+        # Join the FTS table so the MATCH drives the query and its bm25
+        # rank comes along per row; lower rank means more relevant
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = "rooms_room"."id"', f'{FTS_TABLE} MATCH %s'],
+            params=[query],
+            select={'search_rank': f'{FTS_TABLE}.rank'},
+        ).order_by('search_rank', 'name')
+
+    # No search index on other backends: substring match on each token
+    for token in tokens:
+        queryset = queryset.filter(
+            Q(name__icontains=token) |
+            Q(number__icontains=token) |
+            Q(equipment__icontains=token) |
+            Q(building__icontains=token)
+        )
+    return queryset
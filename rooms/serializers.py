@@ -1,7 +1,44 @@
+from datetime import date
+
+from django.db.models import Count, Prefetch, Q
 from rest_framework import serializers
 from .models import Department, Room
 
 
+def occupied_now(room):
+    """The room's current and next booking today from the occupancy index, or None if it cannot say"""
+    from datetime import datetime
+    from schedules.models import Schedule
+    from schedules.occupancy import index
+
+    occupancy = index.room_status(room.id, datetime.now())
+    if occupancy is None:
+        return None
+    schedule_ids = [schedule_id for schedule_id in occupancy if schedule_id is not None]
+    if not schedule_ids:
+        return []
+    return list(Schedule.objects.select_related('room__department').filter(pk__in=schedule_ids).order_by('start_time'))
+
+
+def with_rooms_count(queryset):
+    """Annotate departments with the active room count DepartmentSerializer shows"""
+    return queryset.annotate(active_rooms_count=Count('rooms', filter=Q(rooms__is_active=True)))
+
+
+def with_todays_schedules(queryset):
+    """Load what RoomSerializer needs for a list of rooms in a fixed number of queries"""
+    from schedules.models import Schedule
+
+    return queryset.select_related('department').prefetch_related(Prefetch(
+        'schedules',
+        queryset=Schedule.objects.filter(
+            date=date.today(),
+            status__in=['scheduled', 'in_progress']
+        ).order_by('start_time'),
+        to_attr='todays_schedules'
+    ))
+
+
 class DepartmentSerializer(serializers.ModelSerializer):
     rooms_count = serializers.SerializerMethodField()
 
@@ -10,6 +47,9 @@ class DepartmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'code', 'description', 'created_at', 'rooms_count']
 
     def get_rooms_count(self, obj):
+        # Views annotate the count (with_rooms_count); single objects fall back to a query
+        if hasattr(obj, 'active_rooms_count'):
+            return obj.active_rooms_count
         return obj.rooms.filter(is_active=True).count()
 
 
@@ -67,10 +107,16 @@ class RoomSerializer(serializers.ModelSerializer):
         from schedules.serializers import ScheduleSerializer
         from datetime import date, datetime
         
-        current_schedules = obj.schedules.filter(
-            date=date.today(),
-            status__in=['scheduled', 'in_progress']
-        ).order_by('start_time')
+        # Views prefetch today's schedules (with_todays_schedules); single
+        # objects ask the occupancy index which ones matter, or the database
+        current_schedules = getattr(obj, 'todays_schedules', None)
+        if current_schedules is None:
+            current_schedules = occupied_now(obj)
+        if current_schedules is None:
+            current_schedules = list(obj.schedules.filter(
+                date=date.today(),
+                status__in=['scheduled', 'in_progress']
+            ).order_by('start_time'))
         
         # Find the currently active schedule
         now = datetime.now().time()
@@ -79,7 +125,7 @@ class RoomSerializer(serializers.ModelSerializer):
                 return ScheduleSerializer(schedule).data
         
         # If no current schedule, return the next one today
-        next_schedule = current_schedules.filter(start_time__gt=now).first()
+        next_schedule = next((schedule for schedule in current_schedules if schedule.start_time > now), None)
         if next_schedule:
             return ScheduleSerializer(next_schedule).data
         
@@ -0,0 +1,17 @@
+from jobs.queue import task
+from .models import Room
+
+
+@task(priority=200)
+def generate_qr_codes(room_ids, regenerate=False):
+    """Render QR code images for rooms, replacing existing ones if `regenerate`"""
+    rooms = list(Room.objects.filter(pk__in=room_ids))
+    rendered = []
+    for room in rooms:
+        if room.qr_code and not regenerate:
+            continue
+        if room.qr_code:
+            room.qr_code.delete(save=False)
+        room.render_qr_code()
+        rendered.append(room)
+    Room.objects.bulk_update(rendered, ['qr_code'])
@@ -0,0 +1,179 @@
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from .models import Room, RoomScan, RoomScanHourly
+
+logger = logging.getLogger(__name__)
+
+# Scans wait in memory and are written in batches; when the buffer is full
+# new scans are dropped rather than slowing requests down
+BUFFER_SIZE = 10000
+FLUSH_BATCH = 500
+FLUSH_INTERVAL = 5
+ROLLUP_INTERVAL = 300
+# Raw scans are only needed until their hour has been rolled up
+RAW_RETENTION = timedelta(days=2)
+
+# Hits on these paths count as scans of the room in the first group
+SCAN_PATH = re.compile(r'^/api/rooms/(\d+)/(?:schedule|availability)/$')
+
+AGENT_PATTERNS = [
+    ('bot', re.compile(r'bot|crawl|spider|slurp|curl|wget|python', re.I)),
+    ('ios', re.compile(r'iphone|ipad|ipod', re.I)),
+    ('android', re.compile(r'android', re.I)),
+    ('mobile', re.compile(r'mobile', re.I)),
+    ('desktop', re.compile(r'windows|macintosh|x11|linux', re.I)),
+]
+
+
+def classify_agent(user_agent):
+    """Reduce a User-Agent header to one of RoomScan.AGENT_TYPES"""
+    for agent, pattern in AGENT_PATTERNS:
+        if pattern.search(user_agent):
+            return agent
+    return 'other'
+
+
+def rollup_scans(since, until=None):
+    """Recount scans per room and hour from `since`, and drop expired raw scans.
+
+    Counts are recomputed rather than incremented, so rolling up an hour
+    again, from any process, is harmless.
+    """
+    until = until or timezone.now()
+    start = since.replace(minute=0, second=0, microsecond=0)
+    counts = RoomScan.objects.filter(
+        scanned_at__gte=start,
+        scanned_at__lt=until
+    ).filter(
+        # Raw scans have no foreign key constraint; skip rooms deleted since
+        Exists(Room.objects.filter(pk=OuterRef('room_id')))
+    ).annotate(hour=TruncHour('scanned_at')).values('room_id', 'hour').annotate(count=Count('id')).order_by()
+    rows = [RoomScanHourly(room_id=row['room_id'], hour=row['hour'], count=row['count']) for row in counts]
+    RoomScanHourly.objects.bulk_create(
+        rows, batch_size=500, update_conflicts=True, unique_fields=['room', 'hour'], update_fields=['count']
+    )
+    RoomScan.objects.filter(scanned_at__lt=until - RAW_RETENTION).delete()
+    return len(rows)
+
+
+class ScanRecorder:
+    """Per-process buffer of scans, written by a background flusher thread"""
+
+    def __init__(self, size=BUFFER_SIZE, batch=FLUSH_BATCH, interval=FLUSH_INTERVAL):
+        self.buffer = deque()
+        self.size = size
+        self.batch = batch
+        self.interval = interval
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+        self.last_rollup = 0
+        self.stats = {
+            'recorded': 0,
+            'dropped': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'last_flush_at': None,
+            'last_flush_seconds': None,
+            'last_batch_size': 0,
+        }
+
+    def record(self, room_id, user_agent=''):
+        """Buffer a scan; never blocks and never touches the database"""
+        self.ensure_flusher()
+        if len(self.buffer) >= self.size:
+            self.stats['dropped'] += 1
+            return
+        self.buffer.append((room_id, timezone.now(), classify_agent(user_agent)))
+        self.stats['recorded'] += 1
+        if len(self.buffer) >= self.batch:
+            self.wakeup.set()
+
+    def ensure_flusher(self):
+        # Forked workers inherit the buffer but not the thread
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.buffer.clear()
+                self.thread = threading.Thread(target=self.run, name='scan-telemetry', daemon=True)
+                self.thread.start()
+                self.pid = os.getpid()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+            if time.monotonic() - self.last_rollup >= ROLLUP_INTERVAL:
+                self.last_rollup = time.monotonic()
+                try:
+                    rollup_scans(timezone.now() - timedelta(hours=1))
+                except Exception:
+                    logger.exception('Scan rollup failed')
+            connection.close()
+
+    def flush(self):
+        """Write everything buffered so far, one bulk_create per batch"""
+        # Scans arriving during the flush wait for the next one, so batches stay large
+        pending = len(self.buffer)
+        while pending > 0:
+            started = time.monotonic()
+            batch = [self.buffer.popleft() for _ in range(min(pending, self.batch))]
+            pending -= len(batch)
+            try:
+                RoomScan.objects.bulk_create([
+                    RoomScan(room_id=room_id, scanned_at=scanned_at, agent=agent)
+                    for room_id, scanned_at, agent in batch
+                ])
+            except Exception:
+                # Telemetry is best effort: a failed batch is counted and dropped
+                logger.exception('Writing %s room scans failed', len(batch))
+                self.stats['failed_flushes'] += 1
+                self.stats['dropped'] += len(batch)
+                return
+            self.stats['flushed'] += len(batch)
+            self.stats['flushes'] += 1
+            self.stats['last_flush_at'] = timezone.now().isoformat()
+            self.stats['last_flush_seconds'] = round(time.monotonic() - started, 4)
+            self.stats['last_batch_size'] = len(batch)
+
+    def metrics(self):
+        return dict(self.stats, backlog=len(self.buffer), capacity=self.size, pid=os.getpid())
+
+
+recorder = ScanRecorder()
+atexit.register(recorder.flush)
+
+
+class ScanTelemetryMiddleware:
+    """Record successful hits on room schedule and availability endpoints.
+
+    Sits outside the response cache so cached hits are counted too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SCAN_TELEMETRY_ENABLED', True)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if self.enabled and request.method == 'GET' and response.status_code in (200, 304):
+            match = SCAN_PATH.match(request.path)
+            if match:
+                recorder.record(int(match.group(1)), request.META.get('HTTP_USER_AGENT', ''))
+        return response
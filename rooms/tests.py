@@ -1,3 +1,346 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import time as timer
+from datetime import date, time
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from schedules.models import Schedule
+from . import urls, views
+from .importer import RoomImportError, import_rooms
+from .models import Department, Room
+from .query_budget import QueryRecorder, QueryBudgetExceeded, query_budget, view_attribute
+from .response_cache import bump_data_version
+from .serializers import DepartmentSerializer, RoomSerializer
+from .throttling import local_buckets, monitor
+from .tiered_cache import TieredCache, cache_statistics
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# Budgets only hold if the response cache and scan buffer stay out of the way
+BUDGET_SETTINGS = dict(
+    QUERY_BUDGET_ENFORCE=True,
+    RESPONSE_CACHE_PATHS=[],
+    SCAN_TELEMETRY_ENABLED=False,
+    THROTTLE_ENABLED=False,
+    # Budgets are checked against the database path; OccupancyIndexTests cover the index
+    OCCUPANCY_INDEX_ENABLED=False,
+    MEDIA_ROOT=MEDIA_ROOT,
+)
+
+
+def create_rooms(department, count, schedules_per_room):
+    """Rooms in one building, each booked for `schedules_per_room` slots today"""
+    rooms = []
+    for i in range(count):
+        room = Room.objects.create(
+            name=f'{department.code} Room {i}', number=f'{department.code}-{i}',
+            department=department, capacity=30, building='Main Hall'
+        )
+        for hour in range(schedules_per_room):
+            Schedule.objects.create(
+                room=room, title='Lecture', instructor=f'Instructor {room.id}-{hour}',
+                date=date.today(), start_time=time(7 + hour), end_time=time(7 + hour, 50)
+            )
+        rooms.append(room)
+    return rooms
+
+
+@override_settings(**BUDGET_SETTINGS)
+class RoomEndpointBudgetTests(TestCase):
+    """Every rooms endpoint stays within its query budget without N+1 queries.
+
+    The middleware raises QueryBudgetExceeded under QUERY_BUDGET_ENFORCE,
+    so a regression fails the request itself.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Physics', code='PHY')
+        Department.objects.create(name='Chemistry', code='CHEM')
+        Department.objects.create(name='Biology', code='BIO')
+        cls.rooms = create_rooms(cls.department, 4, 3)
+        cls.room = cls.rooms[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def room_data(self, **extra):
+        return dict({'name': 'Lab', 'number': 'PHY-NEW', 'capacity': 20, 'department': self.department.id}, **extra)
+
+    def test_department_list(self):
+        response = self.client.get(reverse('rooms:department-list'))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('rooms:department-list'), {'name': 'Maths', 'code': 'MATH'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_department_detail(self):
+        url = reverse('rooms:department-detail', args=[self.department.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.put(url, {'name': 'Applied Physics', 'code': 'PHY'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+
+    def test_room_list(self):
+        response = self.client.get(reverse('rooms:room-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), len(self.rooms))
+        response = self.client.post(reverse('rooms:room-list'), self.room_data(), format='json')
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(JOB_QUEUE_ASYNC=True)
+    def test_room_import(self):
+        rooms = [
+            {'department': 'GEO', 'department_name': 'Geology', 'name': f'Room {i}', 'number': f'G{i}', 'capacity': 20}
+            for i in range(views.MAX_API_IMPORT_ROWS)
+        ]
+        response = self.client.post(reverse('rooms:room-import'), rooms, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rooms_created'], len(rooms))
+
+    def test_room_detail(self):
+        url = reverse('rooms:room-detail', args=[self.room.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.put(url, self.room_data(number=self.room.number), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+
+    def test_room_availability(self):
+        response = self.client.get(reverse('rooms:room-availability', args=[self.room.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_regenerate_qr(self):
+        response = self.client.post(reverse('rooms:regenerate-qr', args=[self.room.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_room_scans(self):
+        response = self.client.get(reverse('rooms:room-scans', args=[self.room.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_scan_telemetry(self):
+        response = self.client.get(reverse('rooms:scan-telemetry'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_metrics(self):
+        self.client.get(reverse('rooms:room-availability', args=[self.room.id]))
+        response = self.client.get(reverse('rooms:cache-metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('availability', response.data)
+
+    def test_occupancy_metrics(self):
+        response = self.client.get(reverse('rooms:occupancy-metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('bytes_per_1000_rooms', response.data)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        url = reverse('rooms:room-list')
+        before = self.client.get(url)['X-Query-Count']
+        create_rooms(Department.objects.create(name='Geology', code='GEO'), 5, 4)
+        self.assertEqual(self.client.get(url)['X-Query-Count'], before)
+
+        url = reverse('rooms:department-list')
+        before = self.client.get(url)['X-Query-Count']
+        Department.objects.create(name='History', code='HIST')
+        self.assertEqual(self.client.get(url)['X-Query-Count'], before)
+
+    def test_every_endpoint_has_a_budget(self):
+        for pattern in urls.urlpatterns:
+            with self.subTest(pattern.name):
+                self.assertIsNotNone(view_attribute(pattern.callback, 'query_budget'))
+
+    @override_settings(QUERY_BUDGETS={'rooms:room-availability': 1})
+    def test_settings_budget_overrides_decorator(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('rooms:room-availability', args=[self.room.id]))
+
+
+class ImportRoomsTests(TestCase):
+    """Bulk imports upsert on department and number and reject bad files as a whole"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Physics', code='PHY')
+        cls.room = Room.objects.create(
+            name='Old Lab', number='P1', department=cls.department, capacity=10, equipment='Oscilloscopes',
+            qr_code='qr_codes/room_p1_qr.png'
+        )
+
+    def test_upserts_rooms_and_creates_departments(self):
+        result = import_rooms([
+            {'department': 'PHY', 'name': 'Optics Lab', 'number': 'P1', 'capacity': '24'},
+            {'department': 'GEO', 'department_name': 'Geology', 'name': 'Core Store', 'number': 'G1',
+             'capacity': 8, 'room_type': 'laboratory', 'is_active': 'no'},
+        ])
+        self.assertEqual(result, {
+            'rooms_created': 1, 'rooms_updated': 1, 'departments_created': 1, 'qr_codes_queued': 1,
+        })
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.name, self.room.capacity), ('Optics Lab', 24))
+        # Columns the file does not have are left alone
+        self.assertEqual(self.room.equipment, 'Oscilloscopes')
+        geology = Room.objects.get(number='G1')
+        self.assertEqual((geology.department.name, geology.room_type, geology.is_active), ('Geology', 'laboratory', False))
+
+    def test_reports_every_problem_and_imports_nothing(self):
+        with self.assertRaises(RoomImportError) as raised:
+            import_rooms([
+                {'department': 'PHY', 'name': 'Lab', 'number': 'P2', 'capacity': 'many'},
+                {'department': 'PHY', 'name': 'Lab', 'number': 'P3', 'capacity': 5, 'room_type': 'pool'},
+                {'department': 'PHY', 'name': 'Lab', 'number': 'P4', 'capacity': 5},
+                {'department': 'PHY', 'name': 'Lab again', 'number': 'P4', 'capacity': 5},
+                {'department': 'ART', 'name': 'Studio', 'number': 'A1', 'capacity': 5},
+            ])
+        self.assertEqual(len(raised.exception.errors), 4)
+        self.assertEqual(Room.objects.count(), 1)
+
+    def test_csv_upload(self):
+        body = 'department,name,number,capacity,is_active\nPHY,Seminar Room,P9,30,\n'
+        response = APIClient().post(reverse('rooms:room-import'), body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Room.objects.get(number='P9').is_active)
+
+    def test_malformed_json_rows(self):
+        client = APIClient()
+        for rows in [[1, 2], {'department': 'PHY'}, [{
+            'department': 'PHY', 'name': 'Lab', 'number': 'P5', 'capacity': 5, 'room_type': ['a'],
+        }], [{'department': 'P' * 11, 'name': 'Lab', 'number': 'P6', 'capacity': 5}]]:
+            with self.subTest(rows=rows):
+                response = client.post(reverse('rooms:room-import'), rows, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(len(response.data['errors']), 1)
+        self.assertEqual(Room.objects.count(), 1)
+
+
+class NPlusOneDetectorTests(TestCase):
+    """The recorder names the serializer field that repeats a query per row"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Physics', code='PHY')
+        Department.objects.create(name='Chemistry', code='CHEM')
+        Department.objects.create(name='Biology', code='BIO')
+        create_rooms(department, 3, 1)
+
+    def repeated_origins(self, serializer):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            serializer.data
+        return [origin for shape, count, origin, stack in recorder.repeated()]
+
+    def test_unannotated_departments(self):
+        serializer = DepartmentSerializer(Department.objects.all(), many=True)
+        self.assertEqual(self.repeated_origins(serializer), ['DepartmentSerializer.rooms_count'])
+
+    @override_settings(OCCUPANCY_INDEX_ENABLED=False)
+    def test_unprefetched_rooms(self):
+        serializer = RoomSerializer(Room.objects.all(), many=True)
+        self.assertIn('RoomSerializer.current_schedule', self.repeated_origins(serializer))
+
+    def test_decorator_marks_view(self):
+        @query_budget(2, allow_repeats=True)
+        def view(request):
+            pass
+
+        self.assertEqual(view.query_budget, 2)
+        self.assertTrue(view.query_budget_allow_repeats)
+
+
+@override_settings(SCAN_TELEMETRY_ENABLED=False, THROTTLE_RATES={'kiosk': '2/min'}, LOAD_SHED_QUEUE_WAIT=1.0)
+class ThrottleTests(TestCase):
+    """Per-client buckets per endpoint class, and shedding reads before writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Physics', code='PHY')
+        cls.room = create_rooms(cls.department, 1, 1)[0]
+
+    def setUp(self):
+        local_buckets.buckets.clear()
+        monitor.latencies.clear()
+        self.client = APIClient()
+
+    def test_kiosk_bucket(self):
+        url = reverse('schedules:kiosk-board', args=['Main Hall'])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Other endpoint classes and other clients have their own buckets
+        self.assertEqual(self.client.get(reverse('rooms:room-list')).status_code, 200)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_writes_throttled_only_when_opted_in(self):
+        def create(code):
+            return self.client.post(reverse('rooms:department-list'), {'name': code, 'code': code}, format='json')
+
+        self.assertEqual([create(f'D{i}').status_code for i in range(3)], [201] * 3)
+        with self.settings(THROTTLE_RATES={'write': '1/min'}):
+            self.assertEqual([create(f'E{i}').status_code for i in range(2)], [201, 429])
+
+    def test_overload_sheds_reads_only(self):
+        self.assertEqual(self.client.get(reverse('rooms:room-list')).status_code, 200)
+        bump_data_version()
+        queued = {'HTTP_X_REQUEST_START': f't={timer.time() - 5:.3f}'}
+
+        response = self.client.get(reverse('rooms:room-list'), **queued)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Stale'], 'queue-wait')
+        response = self.client.get(reverse('rooms:room-availability', args=[self.room.id]), **queued)
+        self.assertEqual(response.status_code, 503)
+        response = self.client.post(
+            reverse('rooms:department-list'), {'name': 'Maths', 'code': 'MATH'}, format='json', **queued
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class TieredCacheTests(TestCase):
+    """One recompute per key however many callers miss together"""
+
+    def test_concurrent_misses_compute_once(self):
+        tiered = TieredCache('test-single-flight', 60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            timer.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(tiered.get_or_set('key', compute)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 10)
+        self.assertEqual(cache_statistics()['test-single-flight']['recomputes'], 1)
+
+    def test_expired_value_served_while_recomputing(self):
+        tiered = TieredCache('test-stale', 60)
+        tiered.get_or_set('key', lambda: 'old', timeout=1)
+        timer.sleep(1.1)
+        started = threading.Event()
+
+        def compute():
+            started.set()
+            timer.sleep(0.2)
+            return 'new'
+
+        leader = threading.Thread(target=lambda: tiered.get_or_set('key', compute))
+        leader.start()
+        started.wait()
+        self.assertEqual(tiered.get_or_set('key', compute), 'old')
+        leader.join()
+        self.assertEqual(tiered.get_or_set('key', compute), 'new')
@@ -0,0 +1,241 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from .query_budget import view_attribute
+from .response_cache import cache_key, entry_response, snapshot_key
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Requests per client and endpoint class, in DRF's rate format. Campus NAT
+# puts many phones behind one address, so scan rates are generous. Writes
+# are only throttled with a 'write' rate in THROTTLE_RATES: staff behind
+# one office NAT would share a single budget.
+DEFAULT_THROTTLE_RATES = {
+    'scan': '300/min',
+    'kiosk': '20/min',
+    'feed': '60/min',
+    'read': '300/min',
+}
+# Public reads that load shedding may answer from a snapshot, or refuse;
+# writes are never shed
+SHEDDABLE_SCOPES = {'scan', 'kiosk', 'feed', 'read'}
+SHED_RETRY_AFTER = 5
+MAX_LOCAL_BUCKETS = 10000
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def throttle_scope(scope):
+    """Put a view in an endpoint class of DEFAULT_THROTTLE_RATES; GETs default to 'read'"""
+    def decorator(view):
+        view.throttle_scope = scope
+        return view
+    return decorator
+
+
+def parse_rate(rate):
+    """'100/min' -> (100, 60)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def client_id(request):
+    """The authenticated user, else the client address behind THROTTLE_NUM_PROXIES proxies"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    num_proxies = getattr(settings, 'THROTTLE_NUM_PROXIES', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    if num_proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return f'ip:{addresses[-min(num_proxies, len(addresses))]}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def request_scope(request):
+    if request.method not in SAFE_METHODS:
+        return 'write'
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return 'read'
+    return view_attribute(match.func, 'throttle_scope') or 'read'
+
+
+class LocalBuckets:
+    """In-process token buckets: `capacity` tokens, refilled over `period` seconds"""
+
+    def __init__(self, max_keys=MAX_LOCAL_BUCKETS):
+        self.buckets = OrderedDict()
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, period):
+        """Spend a token; returns 0, or the seconds until one is available"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * capacity / period)
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) * period / capacity
+            self.buckets[key] = (tokens, now)
+            # Forget the least recently seen clients first
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+class CacheBuckets:
+    """Counters in the shared cache, so every worker spends one budget per client.
+
+    Cache backends have no compare-and-set, so the bucket is approximated
+    by a counter per fixed window; incr is atomic on Redis and Memcached.
+    """
+
+    def take(self, key, capacity, period):
+        now = time.time()
+        window_key = f'throttle:{key}:{int(now // period)}'
+        cache.add(window_key, 0, period + 1)
+        try:
+            count = cache.incr(window_key)
+        except ValueError:
+            # Evicted between add and incr
+            cache.set(window_key, 1, period + 1)
+            count = 1
+        return 0 if count <= capacity else period - now % period
+
+
+def request_start(request):
+    """When the proxy received the request, from X-Request-Start, in epoch seconds"""
+    value = request.META.get('HTTP_X_REQUEST_START', '').removeprefix('t=')
+    try:
+        start = float(value)
+    except ValueError:
+        return None
+    # Routers send seconds, milliseconds or microseconds
+    while start > 1e11:
+        start /= 1000
+    return start
+
+
+class LoadMonitor:
+    """Per-process view of load: requests in flight, recent latency and queue wait"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.latencies = deque()
+        self.lock = threading.Lock()
+
+    def started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def finished(self, seconds):
+        now = time.monotonic()
+        with self.lock:
+            self.in_flight -= 1
+            if seconds is not None:
+                self.latencies.append((now, seconds))
+
+    def mean_latency(self, window):
+        """Mean latency of requests that ran their view in the last `window` seconds.
+
+        While reads are shed only the requests still served count, and with
+        none in the window the estimate resets, so shedding stops by itself.
+        """
+        cutoff = time.monotonic() - window
+        with self.lock:
+            while self.latencies and self.latencies[0][0] < cutoff:
+                self.latencies.popleft()
+            if not self.latencies:
+                return 0
+            return sum(seconds for _, seconds in self.latencies) / len(self.latencies)
+
+    def overloaded(self, request):
+        """The first threshold exceeded, or None"""
+        # Counts this process's concurrent requests, so it only means
+        # something on threaded workers; a sync worker always has one
+        in_flight_limit = getattr(settings, 'LOAD_SHED_MAX_IN_FLIGHT', None)
+        # This request is already counted
+        if in_flight_limit is not None and self.in_flight - 1 >= in_flight_limit:
+            return 'in-flight'
+        start = request_start(request)
+        if start is not None and time.time() - start > getattr(settings, 'LOAD_SHED_QUEUE_WAIT', 1.0):
+            return 'queue-wait'
+        if self.mean_latency(getattr(settings, 'LOAD_SHED_WINDOW', 10)) > getattr(settings, 'LOAD_SHED_LATENCY', 2.0):
+            return 'latency'
+        return None
+
+
+monitor = LoadMonitor()
+local_buckets = LocalBuckets()
+cache_buckets = CacheBuckets()
+
+
+class ThrottleMiddleware:
+    """Throttle API clients per endpoint class, and shed public reads under load.
+
+    Each client gets a token bucket per endpoint class (see throttle_scope)
+    that has a rate.
+    When this process is overloaded, public reads are answered from the
+    response cache's last snapshot with a Stale header, or refused with
+    503 when there is none; writes always run. Sits outside the response
+    cache so throttled clients cannot read it either.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'THROTTLE_ENABLED', True) or not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        scope = request_scope(request)
+        rate = {**DEFAULT_THROTTLE_RATES, **getattr(settings, 'THROTTLE_RATES', {})}.get(scope)
+        wait = 0
+        if rate:
+            capacity, period = parse_rate(rate)
+            buckets = cache_buckets if getattr(settings, 'THROTTLE_BACKEND', 'local') == 'cache' else local_buckets
+            wait = buckets.take(f'{scope}:{client_id(request)}', capacity, period)
+        if wait:
+            response = JsonResponse({'error': 'Too many requests, slow down'}, status=429)
+            response['Retry-After'] = str(math.ceil(wait))
+            return response
+
+        monitor.started()
+        ran_view = False
+        try:
+            reason = monitor.overloaded(request) if getattr(settings, 'LOAD_SHED_ENABLED', True) else None
+            if reason and scope in SHEDDABLE_SCOPES and request.method != 'OPTIONS':
+                return self.shed(request, reason)
+            started = time.monotonic()
+            response = self.get_response(request)
+            ran_view = True
+            return response
+        finally:
+            monitor.finished(time.monotonic() - started if ran_view else None)
+
+    def shed(self, request, reason):
+        """Answer a public read without running its view"""
+        entry = cache.get(cache_key(request))
+        if entry is not None:
+            return entry_response(request, entry)
+        # The last copy stored for the URL, from before the latest change
+        entry = cache.get(snapshot_key(request))
+        if entry is None:
+            response = JsonResponse({'error': 'Server busy, try again shortly'}, status=503)
+            response['Retry-After'] = str(SHED_RETRY_AFTER)
+            return response
+        response = entry_response(request, entry)
+        response['Stale'] = reason
+        response['Age'] = str(max(0, int(time.time() - entry.get('stored_at', time.time()))))
+        return response
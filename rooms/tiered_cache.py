@@ -0,0 +1,223 @@
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+LOCAL_SIZE = 2048
+# Entries are re-read from the shared cache at least this often, so other
+# workers' writes and deletes reach this process within seconds
+LOCAL_TIMEOUT = 5
+# Expired entries stay in the shared cache this long and are served while
+# one worker recomputes them
+STALE_GRACE = 30
+LOCK_TIMEOUT = 30
+WAIT_INTERVAL = 0.05
+# Higher refreshes earlier; 1.0 is the usual choice for XFetch
+EARLY_REFRESH_BETA = 1.0
+
+COUNTERS = [
+    'local_hits', 'shared_hits', 'misses', 'early_refreshes', 'stale_hits',
+    'coalesced', 'recomputes', 'errors',
+]
+
+
+class LocalLRU:
+    """Bounded per-process map of key -> (entry, expires at)"""
+
+    def __init__(self, size=LOCAL_SIZE):
+        self.entries = OrderedDict()
+        self.size = size
+        self.lock = threading.Lock()
+
+    def get(self, key, now):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            if item[1] <= now:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return item[0]
+
+    def set(self, key, entry, expires):
+        with self.lock:
+            self.entries[key] = (entry, expires)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local = LocalLRU()
+statistics = defaultdict(lambda: dict.fromkeys(COUNTERS + ['compute_seconds'], 0))
+statistics_lock = threading.Lock()
+
+
+def cache_statistics():
+    """This process's counters per namespace, with the share of lookups served from cache"""
+    with statistics_lock:
+        report = {namespace: dict(counts) for namespace, counts in statistics.items()}
+    for counts in report.values():
+        lookups = counts['local_hits'] + counts['shared_hits'] + counts['misses'] + counts['early_refreshes']
+        counts['hit_ratio'] = round((counts['local_hits'] + counts['shared_hits']) / lookups, 4) if lookups else None
+        counts['compute_seconds'] = round(counts['compute_seconds'], 4)
+    return report
+
+
+class TieredCache:
+    """A namespace of computed values, cached per process and in CACHES.
+
+    get_or_set looks in a per-process LRU, then the configured backend
+    (TIERED_CACHE_ALIAS, Redis in production, local memory or files
+    elsewhere). Values are recomputed by one caller at a time: threads of
+    a process wait for the one computing, and across processes a lock
+    key in the backend picks the worker, while the others serve the
+    expired value if there is one or wait for the new one. Each lookup
+    may also recompute early, with a probability that rises as expiry
+    nears and with how long the value took to compute (XFetch), so hot
+    keys are usually refreshed before they expire at all.
+    """
+
+    def __init__(self, namespace, timeout, local_timeout=LOCAL_TIMEOUT, beta=EARLY_REFRESH_BETA):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self.beta = beta
+        self.flights = {}
+        self.flights_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[getattr(settings, 'TIERED_CACHE_ALIAS', 'default')]
+
+    def full_key(self, key):
+        return f'tiered:{self.namespace}:{key}'
+
+    def count(self, counter, amount=1):
+        with statistics_lock:
+            statistics[self.namespace][counter] += amount
+
+    def refresh_early(self, entry, now):
+        return now - entry['delta'] * self.beta * math.log(1 - random.random()) >= entry['expires']
+
+    def remember(self, full_key, entry, now):
+        local.set(full_key, entry, min(now + self.local_timeout, entry['expires']))
+
+    def get_or_set(self, key, compute, timeout=None):
+        """The cached value of `key`, computing and storing it when needed.
+
+        `timeout` (seconds, or a function of the computed value returning
+        seconds) overrides the namespace's.
+        """
+        full_key = self.full_key(key)
+        now = time.time()
+        entry = local.get(full_key, now)
+        if entry is not None and not self.refresh_early(entry, now):
+            self.count('local_hits')
+            return entry['value']
+
+        if entry is None:
+            entry = self.backend.get(full_key)
+            if entry is not None and entry['expires'] > now and not self.refresh_early(entry, now):
+                self.count('shared_hits')
+                self.remember(full_key, entry, now)
+                return entry['value']
+
+        if entry is None or entry['expires'] <= now:
+            self.count('misses')
+        else:
+            self.count('early_refreshes')
+        # Usable while someone else recomputes: not yet expired, or within the grace period
+        stale = entry['value'] if entry is not None else None
+        return self.recompute(full_key, compute, timeout, entry is not None, stale)
+
+    def recompute(self, full_key, compute, timeout, have_stale, stale):
+        with self.flights_lock:
+            flight = self.flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[full_key] = threading.Event()
+
+        if not leader:
+            # Another thread of this process is computing the key
+            self.count('coalesced')
+            if have_stale:
+                self.count('stale_hits')
+                return stale
+            flight.wait(LOCK_TIMEOUT)
+            entry = local.get(full_key, time.time())
+            if entry is not None:
+                return entry['value']
+            return self.store(full_key, compute, timeout)
+
+        try:
+            lock_key = f'{full_key}:lock'
+            if self.backend.add(lock_key, True, LOCK_TIMEOUT):
+                try:
+                    return self.store(full_key, compute, timeout)
+                finally:
+                    self.backend.delete(lock_key)
+
+            # Another process is computing the key
+            self.count('coalesced')
+            if have_stale:
+                self.count('stale_hits')
+                return stale
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(WAIT_INTERVAL)
+                entry = self.backend.get(full_key)
+                if entry is not None:
+                    self.remember(full_key, entry, time.time())
+                    return entry['value']
+                if self.backend.get(lock_key) is None:
+                    break
+            return self.store(full_key, compute, timeout)
+        finally:
+            with self.flights_lock:
+                self.flights.pop(full_key, None)
+            flight.set()
+
+    def store(self, full_key, compute, timeout):
+        started = time.monotonic()
+        try:
+            value = compute()
+        except Exception:
+            self.count('errors')
+            raise
+        delta = time.monotonic() - started
+        self.count('recomputes')
+        self.count('compute_seconds', delta)
+
+        timeout = timeout if timeout is not None else self.timeout
+        if callable(timeout):
+            timeout = max(1, timeout(value))
+        now = time.time()
+        entry = {'value': value, 'expires': now + timeout, 'delta': delta}
+        try:
+            self.backend.set(full_key, entry, timeout + STALE_GRACE)
+        except Exception:
+            # The value is still good for this caller
+            logger.exception('Storing %s in the shared cache failed', full_key)
+        self.remember(full_key, entry, now)
+        return value
+
+    def delete(self, key):
+        full_key = self.full_key(key)
+        local.delete(full_key)
+        self.backend.delete(full_key)
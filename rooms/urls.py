@@ -11,6 +11,13 @@ urlpatterns = [
     # Room URLs
     path('rooms/', views.RoomListCreateView.as_view(), name='room-list'),
     path('rooms/<int:pk>/', views.RoomDetailView.as_view(), name='room-detail'),
+    path('rooms/import/', views.room_import, name='room-import'),
     path('rooms/<int:room_id>/availability/', views.room_availability, name='room-availability'),
     path('rooms/<int:room_id>/qr-code/regenerate/', views.regenerate_qr_code, name='regenerate-qr'),
+    path('rooms/<int:room_id>/scans/', views.room_scans, name='room-scans'),
+    
+    # Telemetry URLs
+    path('telemetry/scans/', views.scan_telemetry_metrics, name='scan-telemetry'),
+    path('telemetry/cache/', views.cache_metrics, name='cache-metrics'),
+    path('telemetry/occupancy/', views.occupancy_metrics, name='occupancy-metrics'),
 ]
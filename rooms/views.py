@@ -3,26 +3,45 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from .models import Department, Room
-from .serializers import DepartmentSerializer, RoomSerializer, RoomDetailSerializer
-from datetime import date, datetime
+from django.utils import timezone
+from .models import Department, Room, RoomScanHourly
+from .serializers import (
+    DepartmentSerializer, RoomSerializer, RoomDetailSerializer, with_rooms_count, with_todays_schedules
+)
+from .importer import RoomImportError, check_rows, import_rooms, read_rows
+from .query_budget import query_budget
+from .response_cache import data_version
+from .throttling import throttle_scope
+from .tiered_cache import TieredCache, cache_statistics
+from .search import search_rooms
+from .telemetry import recorder
+from datetime import date, datetime, timedelta
+from schedules.models import Schedule
+from schedules.occupancy import index
 
+AVAILABILITY_CACHE_TIMEOUT = 60
+# Larger imports go through `manage.py import_rooms`
+MAX_API_IMPORT_ROWS = 500
 
+
+@query_budget(3)
 class DepartmentListCreateView(generics.ListCreateAPIView):
-    queryset = Department.objects.all()
+    queryset = with_rooms_count(Department.objects.all())
     serializer_class = DepartmentSerializer
 
 
+@query_budget(9)
 class DepartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Department.objects.all()
+    queryset = with_rooms_count(Department.objects.all())
     serializer_class = DepartmentSerializer
 
 
+@query_budget(4)
 class RoomListCreateView(generics.ListCreateAPIView):
     serializer_class = RoomSerializer
 
     def get_queryset(self):
-        queryset = Room.objects.filter(is_active=True)
+        queryset = with_todays_schedules(Room.objects.filter(is_active=True))
         department = self.request.query_params.get('department', None)
         room_type = self.request.query_params.get('type', None)
         search = self.request.query_params.get('search', None)
@@ -32,43 +51,57 @@ class RoomListCreateView(generics.ListCreateAPIView):
         if room_type:
             queryset = queryset.filter(room_type=room_type)
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(number__icontains=search) | 
-                Q(equipment__icontains=search)
-            )
+            queryset = search_rooms(queryset, search)
 
         return queryset
 
 
+@query_budget(7)
 class RoomDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Room.objects.all()
+    queryset = Room.objects.select_related('department')
     serializer_class = RoomDetailSerializer
 
 
-@api_view(['GET'])
-def room_availability(request, room_id):
-    """Get current availability status of a room"""
-    room = get_object_or_404(Room, id=room_id, is_active=True)
-    
-    now = datetime.now()
+# Availability is cached until the room's next booking starts or ends, so
+# every room's entry expires together at the top of the hour
+availability_cache = TieredCache('availability', AVAILABILITY_CACHE_TIMEOUT)
+
+
+def seconds_until(moment, now):
+    return (datetime.combine(now.date(), moment) - now).total_seconds()
+
+
+def load_availability(room_id, now):
+    """A room's availability at `now`, and for how many seconds it holds"""
+    room = get_object_or_404(Room.objects.select_related('department'), id=room_id, is_active=True)
     current_date = now.date()
     current_time = now.time()
-    
-    # Get current schedule
-    current_schedule = room.schedules.filter(
-        date=current_date,
-        start_time__lte=current_time,
-        end_time__gt=current_time,
-        status__in=['scheduled', 'in_progress']
-    ).first()
-    
-    # Get next schedule today
-    next_schedule = room.schedules.filter(
-        date=current_date,
-        start_time__gt=current_time,
-        status__in=['scheduled', 'in_progress']
-    ).order_by('start_time').first()
+
+    occupancy = index.room_status(room.id, now)
+    if occupancy is not None:
+        # The occupancy index knows which bookings; only their details are loaded
+        schedule_ids = [schedule_id for schedule_id in occupancy if schedule_id is not None]
+        schedules = Schedule.objects.in_bulk(schedule_ids) if schedule_ids else {}
+        for schedule in schedules.values():
+            schedule.room = room
+        current_schedule, next_schedule = (schedules.get(schedule_id) for schedule_id in occupancy)
+    else:
+        # Get current schedule
+        current_schedule = room.schedules.filter(
+            date=current_date,
+            start_time__lte=current_time,
+            end_time__gt=current_time,
+            status__in=['scheduled', 'in_progress']
+        ).first()
+
+        # Get next schedule today
+        next_schedule = room.schedules.filter(
+            date=current_date,
+            start_time__gt=current_time,
+            status__in=['scheduled', 'in_progress']
+        ).order_by('start_time').first()
+    # What RoomSerializer would otherwise query for again
+    room.todays_schedules = [schedule for schedule in (current_schedule, next_schedule) if schedule]
     
     # Determine availability status
     is_available = current_schedule is None
@@ -78,7 +111,6 @@ def room_availability(request, room_id):
         'is_available': is_available,
         'current_schedule': None,
         'next_schedule': None,
-        'checked_at': now.isoformat()
     }
     
     if current_schedule:
@@ -89,9 +121,56 @@ def room_availability(request, room_id):
         from schedules.serializers import ScheduleSerializer
         data['next_schedule'] = ScheduleSerializer(next_schedule).data
     
-    return Response(data)
+    valid_for = AVAILABILITY_CACHE_TIMEOUT
+    for change in [current_schedule and current_schedule.end_time, next_schedule and next_schedule.start_time]:
+        if change:
+            valid_for = min(valid_for, seconds_until(change, now))
+    return data, valid_for
+
+
+@throttle_scope('scan')
+@query_budget(4)
+@api_view(['GET'])
+def room_availability(request, room_id):
+    """Get current availability status of a room"""
+    now = datetime.now()
+    data, _ = availability_cache.get_or_set(
+        f'{room_id}:{data_version()}',
+        lambda: load_availability(room_id, now),
+        timeout=lambda result: result[1]
+    )
+    return Response(dict(data, checked_at=now.isoformat()))
 
 
+# SQLite inserts about 80 rooms per statement, PostgreSQL a whole chunk
+@query_budget(20, allow_repeats=True)
+@api_view(['POST'])
+def room_import(request):
+    """Create or update rooms from a JSON list or a CSV file (body or `file` upload)"""
+    dry_run = request.query_params.get('dry_run') in ('1', 'true')
+    try:
+        if request.content_type.startswith('text/csv'):
+            rows = read_rows(request.body.decode('utf-8-sig'), 'csv')
+        elif 'file' in request.FILES:
+            upload = request.FILES['file']
+            import_format = 'json' if upload.name.lower().endswith('.json') else 'csv'
+            rows = read_rows(upload.read().decode('utf-8-sig'), import_format)
+        else:
+            rows = check_rows(request.data)
+        if len(rows) > MAX_API_IMPORT_ROWS:
+            return Response(
+                {'error': f'At most {MAX_API_IMPORT_ROWS} rooms per request; use manage.py import_rooms'},
+                status=400
+            )
+        result = import_rooms(rows, dry_run=dry_run)
+    except UnicodeDecodeError:
+        return Response({'error': 'Files must be UTF-8'}, status=400)
+    except RoomImportError as e:
+        return Response({'error': 'Nothing imported', 'errors': e.errors}, status=400)
+    return Response(result)
+
+
+@query_budget(2)
 @api_view(['POST'])
 def regenerate_qr_code(request, room_id):
     """Regenerate QR code for a room"""
@@ -108,3 +187,46 @@ def regenerate_qr_code(request, room_id):
         'message': 'QR code regenerated successfully',
         'qr_code_url': room.qr_code.url if room.qr_code else None
     })
+
+
+@query_budget(2)
+@api_view(['GET'])
+def room_scans(request, room_id):
+    """Hourly QR scan counts for a room over the last `days` days"""
+    room = get_object_or_404(Room, id=room_id)
+    try:
+        days = min(max(int(request.query_params.get('days', 7)), 1), 90)
+    except ValueError:
+        return Response({'error': 'days must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    hours = RoomScanHourly.objects.filter(
+        room=room,
+        hour__gte=timezone.now() - timedelta(days=days)
+    ).order_by('hour').values_list('hour', 'count')
+    return Response({
+        'room': room.id,
+        'days': days,
+        'total': sum(count for _, count in hours),
+        'hours': [{'hour': hour.isoformat(), 'count': count} for hour, count in hours],
+    })
+
+
+@query_budget(0)
+@api_view(['GET'])
+def scan_telemetry_metrics(request):
+    """Backlog and flush statistics of this process's scan buffer"""
+    return Response(recorder.metrics())
+
+
+@query_budget(0)
+@api_view(['GET'])
+def cache_metrics(request):
+    """Hit, miss and recompute counts per cache namespace, for this process"""
+    return Response(cache_statistics())
+
+
+@query_budget(0)
+@api_view(['GET'])
+def occupancy_metrics(request):
+    """Size of this process's occupancy index, projected per 1,000 rooms"""
+    return Response(index.memory_report())
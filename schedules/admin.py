@@ -1,14 +1,85 @@
 from django.contrib import admin
-from .models import Schedule
+from datetime import date, timedelta
+from rooms.admin import EstimatedCountPaginator, pk_chunks
+from rooms.models import Department, Room
+from .models import ArchivedSchedule, Schedule
+from .tasks import set_schedule_status
+
+
+class DateWindowFilter(admin.SimpleListFilter):
+    """Bound the changelist to recent dates unless all dates are asked for"""
+    title = 'date window'
+    parameter_name = 'window'
+    default_value = 'recent'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('recent', 'Last 30 days onwards'),
+            ('today', 'Today'),
+            ('upcoming', 'Upcoming'),
+            ('all', 'All dates'),
+        ]
+
+    def value(self):
+        return super().value() or self.default_value
+
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        today = date.today()
+        if self.value() == 'recent':
+            return queryset.filter(date__gte=today - timedelta(days=30))
+        if self.value() == 'today':
+            return queryset.filter(date=today)
+        if self.value() == 'upcoming':
+            return queryset.filter(date__gte=today)
+        return queryset
+
+
+class RoomDepartmentFilter(admin.SimpleListFilter):
+    """Filter by department id without scanning schedules for distinct values"""
+    title = 'department'
+    parameter_name = 'department'
+
+    def lookups(self, request, model_admin):
+        return Department.objects.values_list('id', 'code')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(room__department_id=self.value())
+        return queryset
+
+
+class RoomTypeFilter(admin.SimpleListFilter):
+    title = 'room type'
+    parameter_name = 'room_type'
+
+    def lookups(self, request, model_admin):
+        return Room.ROOM_TYPES
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(room__room_type=self.value())
+        return queryset
 
 
 @admin.register(Schedule)
 class ScheduleAdmin(admin.ModelAdmin):
     list_display = ['title', 'room', 'date', 'start_time', 'end_time', 'status', 'instructor']
-    list_filter = ['status', 'date', 'room__department', 'room__room_type']
+    list_filter = ['status', DateWindowFilter, RoomDepartmentFilter, RoomTypeFilter]
+    list_select_related = ['room']
     search_fields = ['title', 'instructor', 'course_code', 'room__name']
+    autocomplete_fields = ['room']
     date_hierarchy = 'date'
     ordering = ['-date', 'start_time']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Schedule Information', {
@@ -30,13 +101,21 @@ class ScheduleAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_completed', 'mark_as_cancelled']
     
+    def update_status_in_chunks(self, queryset, new_status):
+        """Queue one status update job per chunk of primary keys and return the row count"""
+        queued = 0
+        for chunk in pk_chunks(queryset):
+            set_schedule_status.delay(schedule_ids=chunk, status=new_status)
+            queued += len(chunk)
+        return queued
+    
     def mark_as_completed(self, request, queryset):
-        queryset.update(status='completed')
-        self.message_user(request, f'{queryset.count()} schedules marked as completed.')
+        queued = self.update_status_in_chunks(queryset, 'completed')
+        self.message_user(request, f'{queued} schedules queued to be marked as completed.')
     
     def mark_as_cancelled(self, request, queryset):
-        queryset.update(status='cancelled')
-        self.message_user(request, f'{queryset.count()} schedules marked as cancelled.')
+        queued = self.update_status_in_chunks(queryset, 'cancelled')
+        self.message_user(request, f'{queued} schedules queued to be marked as cancelled.')
     
     mark_as_completed.short_description = "Mark selected schedules as completed"
     mark_as_cancelled.short_description = "Mark selected schedules as cancelled"
@@ -45,3 +124,20 @@ class ScheduleAdmin(admin.ModelAdmin):
         if not change:  # Only set created_by when creating new schedule
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(ArchivedSchedule)
+class ArchivedScheduleAdmin(admin.ModelAdmin):
+    list_display = ['title', 'room', 'date', 'start_time', 'end_time', 'status', 'archived_at']
+    list_filter = ['status', RoomDepartmentFilter]
+    list_select_related = ['room']
+    search_fields = ['title', 'instructor', 'course_code']
+    ordering = ['-date', 'start_time']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,87 @@
+from datetime import time
+
+from django.db.models import Case, Exists, IntegerField, OuterRef, Value, When
+from rooms.models import Room
+from .models import Schedule
+from .occupancy import index, to_minutes
+
+# Free slots are only suggested within the bookable day
+DAY_START = time(7, 0)
+DAY_END = time(22, 0)
+SUGGESTION_LIMIT = 3
+ACTIVE_STATUSES = ['scheduled', 'in_progress']
+
+
+def to_time(minutes):
+    return time(minutes // 60, minutes % 60).strftime('%H:%M:%S')
+
+
+def free_slots(room_id, day, start_time, end_time, exclude_pk=None, limit=SUGGESTION_LIMIT):
+    """Same-length slots in the room that day, nearest to the requested start first.
+
+    The day's bookings come back sorted from the occupancy index, or one
+    query when the day is outside it; walking them once yields the gaps,
+    and each long-enough gap offers the slot in it closest to the
+    requested start.
+    """
+    bookings = index.day_bookings(room_id, day)
+    if bookings is not None:
+        intervals = [(start, end) for start, end, schedule_id in bookings if schedule_id != exclude_pk]
+    else:
+        intervals = Schedule.objects.filter(
+            room_id=room_id,
+            date=day,
+            status__in=ACTIVE_STATUSES
+        )
+        if exclude_pk is not None:
+            intervals = intervals.exclude(pk=exclude_pk)
+        intervals = [
+            (to_minutes(busy_start), to_minutes(busy_end))
+            for busy_start, busy_end in intervals.order_by('start_time').values_list('start_time', 'end_time')
+        ]
+
+    requested = to_minutes(start_time)
+    duration = to_minutes(end_time) - requested
+    slots = []
+    cursor = to_minutes(DAY_START)
+    for busy_start, busy_end in [*intervals, (to_minutes(DAY_END), to_minutes(DAY_END))]:
+        gap_end = min(busy_start, to_minutes(DAY_END))
+        if gap_end - cursor >= duration:
+            start = min(max(requested, cursor), gap_end - duration)
+            slots.append((abs(start - requested), start))
+        cursor = max(cursor, busy_end)
+
+    return [
+        {'date': day.isoformat(), 'start_time': to_time(start), 'end_time': to_time(start + duration)}
+        for _, start in sorted(slots)[:limit]
+    ]
+
+
+def free_rooms(room, day, start_time, end_time, limit=SUGGESTION_LIMIT):
+    """Rooms of the same type and at least the same capacity that are free for the slot"""
+    busy = Schedule.objects.filter(
+        room=OuterRef('pk'),
+        date=day,
+        status__in=ACTIVE_STATUSES,
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    )
+    rooms = Room.objects.filter(
+        is_active=True,
+        room_type=room.room_type,
+        capacity__gte=room.capacity
+    ).exclude(pk=room.pk).filter(~Exists(busy)).annotate(
+        other_department=Case(
+            When(department_id=room.department_id, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField()
+        )
+    ).order_by('other_department', 'capacity', 'id')
+    return list(rooms.values('id', 'name', 'number', 'capacity', 'building')[:limit])
+
+
+def suggest_alternatives(room, day, start_time, end_time, exclude_pk=None, limit=SUGGESTION_LIMIT):
+    return {
+        'slots': free_slots(room.pk, day, start_time, end_time, exclude_pk=exclude_pk, limit=limit),
+        'rooms': free_rooms(room, day, start_time, end_time, limit=limit),
+    }
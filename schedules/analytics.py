@@ -0,0 +1,211 @@
+import zlib
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import F
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, ExtractMinute
+from rooms.models import Room
+from rooms.tiered_cache import TieredCache
+from .archive import live_and_archived
+
+# Utilization is measured over the teaching day, in fixed-size slots
+DAY_START_HOUR = 7
+DAY_END_HOUR = 22
+SLOT_MINUTES = 15
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+HOURS = DAY_END_HOUR - DAY_START_HOUR
+SLOTS_PER_DAY = HOURS * SLOTS_PER_HOUR
+
+# Cancelled bookings never used the room
+COUNTED_STATUSES = ['scheduled', 'in_progress', 'completed']
+
+WEEK_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+# 2: counts include archived bookings; v1 entries of archived weeks read as empty
+WEEK_CACHE_VERSION = 2
+
+
+week_cache = TieredCache('utilization', WEEK_CACHE_TIMEOUT)
+
+
+def week_cache_key(monday):
+    return f'week:{monday.isoformat()}:v{WEEK_CACHE_VERSION}'
+
+
+def invalidate_week(day):
+    """Drop the cached counts of the week containing `day`"""
+    week_cache.delete(week_cache_key(day - timedelta(days=day.weekday())))
+
+
+def load_slot_counts(room_ids, first_day, last_day):
+    """Count occupied slots per room, weekday and hour for days within one week, archive included.
+
+    Returns a uint8 array of shape (rooms, 7, HOURS) aligned with the
+    sorted `room_ids`. Overlapping bookings in one room count once.
+    """
+    rows = live_and_archived(lambda schedules: schedules.filter(
+        date__range=[first_day, last_day],
+        status__in=COUNTED_STATUSES,
+    ).annotate(
+        weekday=ExtractIsoWeekDay('date') - 1,
+        start_minute=ExtractHour('start_time') * 60 + ExtractMinute('start_time'),
+        end_minute=ExtractHour('end_time') * 60 + ExtractMinute('end_time'),
+    ).values_list('room_id', 'weekday', 'start_minute', 'end_minute'))
+    data = np.array(list(rows), dtype=np.int64).reshape(-1, 4)
+
+    diff = np.zeros((len(room_ids), 7, SLOTS_PER_DAY + 1), dtype=np.int32)
+    if len(data) and len(room_ids):
+        positions = np.searchsorted(room_ids, data[:, 0]).clip(0, len(room_ids) - 1)
+        known = room_ids[positions] == data[:, 0]
+        offset = DAY_START_HOUR * 60
+        start = np.clip((data[:, 2] - offset) // SLOT_MINUTES, 0, SLOTS_PER_DAY)
+        end = np.clip(-((offset - data[:, 3]) // SLOT_MINUTES), 0, SLOTS_PER_DAY)
+        keep = known & (end > start)
+        # Difference array: +1 where a booking starts, -1 where it ends
+        np.add.at(diff, (positions[keep], data[keep, 1], start[keep]), 1)
+        np.add.at(diff, (positions[keep], data[keep, 1], end[keep]), -1)
+
+    occupied = np.cumsum(diff[:, :, :SLOTS_PER_DAY], axis=2) > 0
+    return occupied.reshape(len(room_ids), 7, HOURS, SLOTS_PER_HOUR).sum(axis=3, dtype=np.uint8)
+
+
+def week_slot_counts(room_ids, monday, today):
+    """Slot counts for a whole week, served from the cache once the week is over"""
+    sunday = monday + timedelta(days=6)
+    if sunday >= today:
+        return load_slot_counts(room_ids, monday, sunday)
+
+    def compute():
+        return {
+            'room_ids': zlib.compress(room_ids.tobytes()),
+            'counts': zlib.compress(load_slot_counts(room_ids, monday, sunday).tobytes()),
+        }
+
+    cached = week_cache.get_or_set(week_cache_key(monday), compute)
+    cached_ids = np.frombuffer(zlib.decompress(cached['room_ids']), dtype=np.int64)
+    cached_counts = np.frombuffer(zlib.decompress(cached['counts']), dtype=np.uint8).reshape(-1, 7, HOURS)
+    # Rooms created since the week was cached have no bookings in it
+    counts = np.zeros((len(room_ids), 7, HOURS), dtype=np.uint8)
+    positions = np.searchsorted(room_ids, cached_ids).clip(0, max(len(room_ids) - 1, 0))
+    known = (room_ids[positions] == cached_ids) if len(room_ids) else np.zeros(len(cached_ids), dtype=bool)
+    counts[positions[known]] = cached_counts[known]
+    return counts
+
+
+def range_slot_counts(room_ids, start_date, end_date, today):
+    """Sum slot counts over a date range, one week-sized chunk at a time"""
+    total = np.zeros((len(room_ids), 7, HOURS), dtype=np.int64)
+    monday = start_date - timedelta(days=start_date.weekday())
+    while monday <= end_date:
+        sunday = monday + timedelta(days=6)
+        if monday >= start_date and sunday <= end_date:
+            total += week_slot_counts(room_ids, monday, today)
+        else:
+            total += load_slot_counts(room_ids, max(monday, start_date), min(sunday, end_date))
+        monday += timedelta(days=7)
+    return total
+
+
+def group_rates(keys, occupied, available, capacity):
+    """Occupancy and capacity-weighted utilization per distinct key"""
+    labels, inverse = np.unique(keys, return_inverse=True)
+    occupied_sum = np.bincount(inverse, weights=occupied, minlength=len(labels))
+    available_sum = np.bincount(inverse, weights=available, minlength=len(labels))
+    weighted_occupied = np.bincount(inverse, weights=occupied * capacity, minlength=len(labels))
+    weighted_available = np.bincount(inverse, weights=available * capacity, minlength=len(labels))
+    return labels, safe_ratio(occupied_sum, available_sum), safe_ratio(weighted_occupied, weighted_available), occupied_sum
+
+
+def safe_ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def utilization_report(start_date, end_date, department=None, building=None, today=None):
+    """Occupancy of active rooms between two dates, grouped every way facilities asks for"""
+    today = today or date.today()
+    all_ids = np.array(Room.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    counts = range_slot_counts(all_ids, start_date, end_date, today)
+
+    # Rooms created after all_ids was read have no row in counts
+    rooms = Room.objects.filter(is_active=True, id__lte=all_ids[-1] if len(all_ids) else 0).order_by('id')
+    if department:
+        rooms = rooms.filter(department_id=department)
+    if building:
+        rooms = rooms.filter(building=building)
+    rooms = list(rooms.values('id', 'name', 'number', 'capacity', 'building', 'department_id', department_name=F('department__name')))
+
+    ids = np.array([room['id'] for room in rooms], dtype=np.int64)
+    counts = counts[np.searchsorted(all_ids, ids)] if len(ids) else counts[:0]
+    capacity = np.array([room['capacity'] for room in rooms], dtype=np.float64)
+
+    # Number of each weekday within the range, to turn counts into rates
+    days = (end_date - start_date).days + 1
+    weekday_days = np.bincount([(start_date + timedelta(days=i)).weekday() for i in range(days)], minlength=7)
+    slots_per_room = weekday_days.sum() * SLOTS_PER_DAY
+
+    occupied = counts.sum(axis=(1, 2)).astype(np.float64)
+    available = np.full(len(rooms), slots_per_room, dtype=np.float64)
+    room_rates = safe_ratio(occupied, available)
+
+    # Heatmap: share of room-hours in use, per weekday and hour
+    heatmap_available = weekday_days[:, None] * SLOTS_PER_HOUR * len(rooms)
+    heatmap = safe_ratio(counts.sum(axis=0), np.broadcast_to(heatmap_available, (7, HOURS)))
+
+    department_ids, department_rates, department_weighted, department_occupied = group_rates(
+        np.array([room['department_id'] for room in rooms], dtype=np.int64), occupied, available, capacity
+    )
+    department_names = {room['department_id']: room['department_name'] for room in rooms}
+    buildings, building_rates, building_weighted, building_occupied = group_rates(
+        np.array([room['building'] for room in rooms], dtype=object).astype(str), occupied, available, capacity
+    )
+
+    slot_hours = SLOT_MINUTES / 60
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'day_start_hour': DAY_START_HOUR,
+        'day_end_hour': DAY_END_HOUR,
+        'slot_minutes': SLOT_MINUTES,
+        'rooms_count': len(rooms),
+        'overall': {
+            'occupancy_rate': round(float(safe_ratio(occupied.sum(), available.sum())), 4),
+            'capacity_weighted_utilization': round(float(safe_ratio((occupied * capacity).sum(), (available * capacity).sum())), 4),
+            'booked_hours': float(occupied.sum() * slot_hours),
+        },
+        'weekdays': [round(float(rate), 4) for rate in safe_ratio(counts.sum(axis=(0, 2)), weekday_days * SLOTS_PER_DAY * len(rooms))],
+        'hours': {
+            str(DAY_START_HOUR + hour): round(float(rate), 4)
+            for hour, rate in enumerate(safe_ratio(counts.sum(axis=(0, 1)), np.full(HOURS, weekday_days.sum() * SLOTS_PER_HOUR * len(rooms))))
+        },
+        'heatmap': np.round(heatmap, 4).tolist(),
+        'departments': [
+            {
+                'department': int(department_id),
+                'name': department_names[int(department_id)],
+                'occupancy_rate': round(float(rate), 4),
+                'capacity_weighted_utilization': round(float(weighted), 4),
+                'booked_hours': float(booked * slot_hours),
+            }
+            for department_id, rate, weighted, booked in zip(department_ids, department_rates, department_weighted, department_occupied)
+        ],
+        'buildings': [
+            {
+                'building': str(name),
+                'occupancy_rate': round(float(rate), 4),
+                'capacity_weighted_utilization': round(float(weighted), 4),
+                'booked_hours': float(booked * slot_hours),
+            }
+            for name, rate, weighted, booked in zip(buildings, building_rates, building_weighted, building_occupied)
+        ],
+        'rooms': [
+            {
+                'room': room['id'],
+                'name': room['name'],
+                'number': room['number'],
+                'occupancy_rate': round(float(rate), 4),
+                'booked_hours': float(booked * slot_hours),
+            }
+            for room, rate, booked in zip(rooms, room_rates, occupied)
+        ],
+    }
@@ -0,0 +1,55 @@
+from django.db import connections, router, transaction
+from django.utils import timezone
+from .models import ArchivedSchedule, Schedule
+
+ARCHIVABLE_STATUSES = ['completed', 'cancelled']
+ARCHIVE_CHUNK_SIZE = 1000
+
+
+def live_and_archived(build):
+    """Rows of `build(queryset)` from both the live and the archive table, as one UNION ALL.
+
+    Anything counting completed bookings must read through this: once
+    archive_schedules has run, past weeks live only in the archive.
+    `build` must return the same values_list columns for both models.
+    """
+    # Meta.ordering would put ORDER BY inside the compound statement
+    return build(Schedule.objects.order_by()).union(build(ArchivedSchedule.objects.order_by()), all=True)
+
+
+def archive_schedules(before, chunk_size=ARCHIVE_CHUNK_SIZE, statuses=ARCHIVABLE_STATUSES):
+    """Move finished schedules dated before `before` into the archive table.
+
+    Each chunk is copied with one INSERT ... SELECT and removed from the
+    live table in the same transaction, so a row is always in exactly
+    one of the two tables. Returns the number of rows moved.
+    """
+    using = router.db_for_write(Schedule)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = [
+        field.column for field in ArchivedSchedule._meta.concrete_fields
+        if field.name != 'archived_at'
+    ]
+    column_list = ', '.join(quote(column) for column in columns)
+
+    candidates = Schedule.objects.using(using).filter(
+        date__lt=before, status__in=statuses
+    ).order_by('pk').values_list('pk', flat=True)
+
+    moved = 0
+    while True:
+        with transaction.atomic(using=using):
+            chunk = list(candidates[:chunk_size])
+            if not chunk:
+                return moved
+            placeholders = ', '.join(['%s'] * len(chunk))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {quote(ArchivedSchedule._meta.db_table)} ({column_list}, {quote('archived_at')}) "
+                    f"SELECT {column_list}, %s FROM {quote(Schedule._meta.db_table)} "
+                    f"WHERE {quote('id')} IN ({placeholders})",
+                    [timezone.now(), *chunk]
+                )
+            Schedule.objects.using(using).filter(pk__in=chunk).delete()
+        moved += len(chunk)
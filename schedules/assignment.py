@@ -0,0 +1,162 @@
+import bisect
+from collections import defaultdict
+
+from rooms.models import Room
+from .models import Schedule
+
+# Occupancy is tracked as one Python int per room and day, one bit per slot
+SLOT_MINUTES = 5
+ACTIVE_STATUSES = ['scheduled', 'in_progress']
+
+
+def slot_mask(start_time, end_time):
+    """Bitmask of the slots a [start_time, end_time) interval touches"""
+    start = (start_time.hour * 60 + start_time.minute) // SLOT_MINUTES
+    end = -(-(end_time.hour * 60 + end_time.minute) // SLOT_MINUTES)
+    return ((1 << (end - start)) - 1) << start
+
+
+class RoomAssigner:
+    """Assign sessions to rooms, greedily with a one-move repair step.
+
+    Sessions are dicts with `enrollment`, `date`, `start_time` and
+    `end_time`, and optionally `room_type`, `equipment` (list of terms
+    the room's equipment must mention), `department` and `building`.
+    Rooms must be active and large enough and must not overlap existing
+    bookings or each other's assignments. Among fitting rooms the
+    preferred department/building wins, then the fewest wasted seats.
+    """
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.rooms = {
+            room['id']: dict(room, equipment_text=room['equipment'].lower())
+            for room in Room.objects.filter(is_active=True).values(
+                'id', 'name', 'number', 'capacity', 'room_type', 'equipment', 'building', 'department_id'
+            )
+        }
+        # Rooms by type, sorted by capacity, so candidates are a bisect away
+        self.by_type = defaultdict(list)
+        for room in sorted(self.rooms.values(), key=lambda room: (room['capacity'], room['id'])):
+            self.by_type[room['room_type']].append(room)
+            self.by_type[None].append(room)
+        self.capacities = {key: [room['capacity'] for room in rooms] for key, rooms in self.by_type.items()}
+
+        self.occupied = defaultdict(int)
+        self.placed = defaultdict(list)
+        self.assignment = {}
+        self.masks = [slot_mask(session['start_time'], session['end_time']) for session in sessions]
+        self.load_existing()
+
+    def load_existing(self):
+        dates = {session['date'] for session in self.sessions}
+        if not dates:
+            return
+        existing = Schedule.objects.filter(
+            date__range=[min(dates), max(dates)],
+            status__in=ACTIVE_STATUSES
+        ).values_list('room_id', 'date', 'start_time', 'end_time')
+        for room_id, day, start_time, end_time in existing.iterator(chunk_size=2000):
+            if day in dates:
+                self.occupied[(room_id, day)] |= slot_mask(start_time, end_time)
+
+    def candidates(self, index):
+        """Rooms that could ever host the session, best first"""
+        session = self.sessions[index]
+        rooms = self.by_type.get(session.get('room_type') or None, [])
+        first = bisect.bisect_left(self.capacities.get(session.get('room_type') or None, []), session['enrollment'])
+        terms = [term.lower() for term in session.get('equipment') or []]
+        department = session.get('department')
+        building = session.get('building')
+
+        def score(room):
+            preferred = (
+                (department is not None and room['department_id'] == department)
+                or (bool(building) and room['building'] == building)
+            )
+            return (not preferred, room['capacity'] - session['enrollment'], room['id'])
+
+        fitting = [
+            room for room in rooms[first:]
+            if all(term in room['equipment_text'] for term in terms)
+        ]
+        return [room['id'] for room in sorted(fitting, key=score)]
+
+    def is_free(self, room_id, index):
+        return not self.occupied[(room_id, self.sessions[index]['date'])] & self.masks[index]
+
+    def place(self, room_id, index):
+        key = (room_id, self.sessions[index]['date'])
+        self.occupied[key] |= self.masks[index]
+        self.placed[key].append(index)
+        self.assignment[index] = room_id
+
+    def unplace(self, index):
+        room_id = self.assignment.pop(index)
+        key = (room_id, self.sessions[index]['date'])
+        self.occupied[key] &= ~self.masks[index]
+        self.placed[key].remove(index)
+
+    def repair(self, index, candidates, candidate_lists):
+        """Free a candidate room by moving the single assigned session blocking it"""
+        day = self.sessions[index]['date']
+        for room_id in candidates:
+            blockers = [other for other in self.placed[(room_id, day)] if self.masks[other] & self.masks[index]]
+            if len(blockers) != 1:
+                continue
+            blocker = blockers[0]
+            self.unplace(blocker)
+            # Existing bookings may still be in the way once the blocker is gone
+            if self.is_free(room_id, index):
+                for alternative in candidate_lists[blocker]:
+                    if alternative != room_id and self.is_free(alternative, blocker):
+                        self.place(alternative, blocker)
+                        self.place(room_id, index)
+                        return True
+            self.place(room_id, blocker)
+        return False
+
+    def solve(self):
+        candidate_lists = [self.candidates(index) for index in range(len(self.sessions))]
+        # Most constrained sessions first, then the largest
+        order = sorted(
+            range(len(self.sessions)),
+            key=lambda index: (len(candidate_lists[index]), -self.sessions[index]['enrollment'])
+        )
+        unplaced = []
+        for index in order:
+            candidates = candidate_lists[index]
+            room_id = next((room_id for room_id in candidates if self.is_free(room_id, index)), None)
+            if room_id is not None:
+                self.place(room_id, index)
+            elif not (candidates and self.repair(index, candidates, candidate_lists)):
+                unplaced.append(index)
+
+        return {
+            'assigned': [
+                {
+                    'session': index,
+                    'room': self.assignment[index],
+                    'room_name': self.rooms[self.assignment[index]]['name'],
+                    'room_number': self.rooms[self.assignment[index]]['number'],
+                    'wasted_seats': self.rooms[self.assignment[index]]['capacity'] - self.sessions[index]['enrollment'],
+                }
+                for index in sorted(self.assignment)
+            ],
+            'unplaced': [
+                {
+                    'session': index,
+                    'reason': 'no room fits' if not candidate_lists[index] else 'all fitting rooms are busy',
+                }
+                for index in sorted(unplaced)
+            ],
+            'wasted_seats': sum(
+                self.rooms[room_id]['capacity'] - self.sessions[index]['enrollment']
+                for index, room_id in self.assignment.items()
+            ),
+        }
+
+
+def assign_rooms(sessions):
+    """Assign each session to a room; see RoomAssigner for the rules"""
+    return RoomAssigner(sessions).solve()
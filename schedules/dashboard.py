@@ -0,0 +1,88 @@
+from django.db.models import Count, Q, Sum
+from rooms.models import Department
+from rooms.response_cache import data_version
+from rooms.tiered_cache import TieredCache
+from .kiosk import ACTIVE_STATUSES, board_minute
+from .models import Schedule
+from .serializers import ScheduleSerializer
+
+DASHBOARD_CACHE_TIMEOUT = 60
+dashboard_cache = TieredCache('dashboard', DASHBOARD_CACHE_TIMEOUT)
+
+
+def build_dashboard(now):
+    """Everything the landing page shows, from two queries.
+
+    Today's bookings come with their rooms and departments, so the rooms
+    busy right now and the per-department booking counts are worked out
+    from them; room and capacity totals are aggregated per department.
+    """
+    schedules = list(Schedule.objects.filter(
+        date=now.date(),
+        status__in=ACTIVE_STATUSES
+    ).select_related('room', 'room__department').order_by('start_time'))
+    departments = list(Department.objects.annotate(
+        room_count=Count('rooms'),
+        active_room_count=Count('rooms', filter=Q(rooms__is_active=True)),
+        capacity=Sum('rooms__capacity', filter=Q(rooms__is_active=True), default=0),
+    ).order_by('name').values('id', 'name', 'code', 'room_count', 'active_room_count', 'capacity'))
+
+    current_time = now.time()
+    busy = {}
+    bookings = {}
+    for schedule in schedules:
+        department_id = schedule.room.department_id
+        bookings[department_id] = bookings.get(department_id, 0) + 1
+        if schedule.room.is_active and schedule.start_time <= current_time < schedule.end_time:
+            busy.setdefault(schedule.room_id, schedule)
+
+    busy_by_department = {}
+    for schedule in busy.values():
+        department_id = schedule.room.department_id
+        busy_by_department[department_id] = busy_by_department.get(department_id, 0) + 1
+
+    total = sum(department['room_count'] for department in departments)
+    active = sum(department['active_room_count'] for department in departments)
+    return {
+        'date': now.date().isoformat(),
+        'generated_at': now.isoformat(),
+        'rooms': {
+            'total': total,
+            'active': active,
+            'inactive': total - active,
+            'busy': len(busy),
+            'available': active - len(busy),
+        },
+        'departments': [
+            dict(
+                department,
+                busy_room_count=busy_by_department.get(department['id'], 0),
+                todays_schedule_count=bookings.get(department['id'], 0),
+            )
+            for department in departments
+        ],
+        'busy_rooms': [
+            {
+                'id': schedule.room_id,
+                'name': schedule.room.name,
+                'number': schedule.room.number,
+                'building': schedule.room.building,
+                'department_name': schedule.room.department.name,
+                'schedule': {
+                    'id': schedule.id,
+                    'title': schedule.title,
+                    'instructor': schedule.instructor,
+                    'start_time': schedule.start_time.strftime('%H:%M'),
+                    'end_time': schedule.end_time.strftime('%H:%M'),
+                },
+            }
+            for schedule in sorted(busy.values(), key=lambda schedule: (schedule.room.building, schedule.room.number))
+        ],
+        'schedules': ScheduleSerializer(schedules, many=True).data,
+    }
+
+
+def get_dashboard(now=None):
+    """The dashboard for the current minute, rebuilt at most once a minute or after a change"""
+    minute = board_minute(now)
+    return dashboard_cache.get_or_set(f'{minute:%Y-%m-%dT%H:%M}:{data_version()}', lambda: build_dashboard(minute))
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+# Events older than this are left out of feeds; calendar clients keep
+# their own copy of past events
+FEED_PAST_DAYS = 30
+FEED_CHUNK_SIZE = 500
+
+EVENT_FIELDS = [
+    'id', 'title', 'description', 'instructor', 'course_code', 'date',
+    'start_time', 'end_time', 'status', 'updated_at',
+    'room__name', 'room__number', 'room__building',
+]
+
+ICAL_STATUS = {
+    'scheduled': 'CONFIRMED',
+    'in_progress': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+}
+
+
+def feed_queryset(queryset, today):
+    """Restrict a schedule queryset to the window published in feeds"""
+    return queryset.filter(date__gte=today - timedelta(days=FEED_PAST_DAYS))
+
+
+def feed_state(queryset):
+    """Return (etag, last_modified) for a feed from one aggregate query.
+
+    The row count is part of the ETag so deletions, which leave no
+    updated_at behind, still change it. Events carry their room's name
+    and building, so room edits change it too. The ETag keeps full
+    precision: two changes within a second must not share a tag.
+    """
+    state = queryset.aggregate(
+        last_modified=Max('updated_at'), room_modified=Max('room__updated_at'), count=Count('id')
+    )
+    stamps = [stamp for stamp in (state['last_modified'], state['room_modified']) if stamp]
+    etag = '"{}-{}"'.format(state['count'], '-'.join(f'{stamp.timestamp():.6f}' for stamp in stamps) or 0)
+    return etag, max(stamps, default=None)
+
+
+def escape_text(value):
+    return (
+        value.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Fold a content line at 75 octets as required by RFC 5545"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_local(day, moment):
+    return datetime.combine(day, moment).strftime('%Y%m%dT%H%M%S')
+
+
+def event_lines(event):
+    summary = event['title']
+    if event['course_code']:
+        summary = f"{event['course_code']} - {summary}"
+    location = f"{event['room__name']} ({event['room__number']})"
+    if event['room__building']:
+        location = f"{location}, {event['room__building']}"
+    description = event['description']
+    if event['instructor']:
+        description = f"Instructor: {event['instructor']}\n{description}".strip()
+
+    yield 'BEGIN:VEVENT'
+    yield f"UID:schedule-{event['id']}@room-scheduler"
+    yield f"DTSTAMP:{format_utc(event['updated_at'])}"
+    yield f"LAST-MODIFIED:{format_utc(event['updated_at'])}"
+    yield f"DTSTART:{format_local(event['date'], event['start_time'])}"
+    yield f"DTEND:{format_local(event['date'], event['end_time'])}"
+    yield f"SUMMARY:{escape_text(summary)}"
+    yield f"LOCATION:{escape_text(location)}"
+    if description:
+        yield f"DESCRIPTION:{escape_text(description)}"
+    yield f"STATUS:{ICAL_STATUS.get(event['status'], 'CONFIRMED')}"
+    yield 'END:VEVENT'
+
+
+def iter_calendar(queryset, name):
+    """Yield an iCalendar document chunk by chunk without loading all events"""
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Room Scheduler//Schedules//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+        # Schedule times are stored as wall-clock times in the server time zone
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ]
+    yield ''.join(fold_line(line) for line in header)
+
+    events = queryset.order_by('date', 'start_time').values(*EVENT_FIELDS)
+    for event in events.iterator(chunk_size=FEED_CHUNK_SIZE):
+        yield ''.join(fold_line(line) for line in event_lines(event))
+
+    yield fold_line('END:VCALENDAR')
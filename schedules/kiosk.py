@@ -0,0 +1,142 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rooms.models import Room
+from .models import Schedule
+
+# Boards are rebuilt once per minute; the stored copy outlives that so
+# screens keep getting a slightly stale board while one request rebuilds it
+BOARD_CACHE_TIMEOUT = 60 * 60
+REFRESH_LOCK_TIMEOUT = 30
+VERSION_KEY = 'kiosk:boards:version'
+ACTIVE_STATUSES = ['scheduled', 'in_progress']
+
+
+def boards_version():
+    return cache.get_or_set(VERSION_KEY, 0, None)
+
+
+def invalidate_boards():
+    """Mark every board stale after a change to today's bookings or to a room.
+
+    Costs no queries, so it is safe to call once per row in bulk deletes;
+    the next request for each board rebuilds it.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def board_cache_key(building):
+    digest = hashlib.md5(building.encode('utf-8')).hexdigest()
+    return f'kiosk:board:{digest}'
+
+
+def event_data(schedule):
+    return {
+        'title': schedule['title'],
+        'course_code': schedule['course_code'],
+        'instructor': schedule['instructor'],
+        'start_time': schedule['start_time'].strftime('%H:%M'),
+        'end_time': schedule['end_time'].strftime('%H:%M'),
+    }
+
+
+def build_board(building, now):
+    """Now/next for every active room in a building, from two queries.
+
+    Returns None when the building has no active rooms.
+    """
+    rooms = list(Room.objects.filter(building=building, is_active=True).order_by('floor', 'number').values(
+        'id', 'name', 'number', 'floor', 'capacity'
+    ))
+    if not rooms:
+        return None
+
+    current_time = now.time()
+    current = {}
+    upcoming = {}
+    schedules = Schedule.objects.filter(
+        room__building=building,
+        room__is_active=True,
+        date=now.date(),
+        status__in=ACTIVE_STATUSES,
+        end_time__gt=current_time
+    ).order_by('room_id', 'start_time').values(
+        'room_id', 'title', 'course_code', 'instructor', 'start_time', 'end_time'
+    )
+    for schedule in schedules:
+        if schedule['start_time'] <= current_time:
+            current.setdefault(schedule['room_id'], schedule)
+        else:
+            upcoming.setdefault(schedule['room_id'], schedule)
+
+    return {
+        'building': building,
+        'date': now.date().isoformat(),
+        'generated_at': now.isoformat(),
+        'refresh_after': (now + timedelta(minutes=1)).isoformat(),
+        'rooms': [
+            dict(
+                room,
+                is_available=room['id'] not in current,
+                now=event_data(current[room['id']]) if room['id'] in current else None,
+                next=event_data(upcoming[room['id']]) if room['id'] in upcoming else None,
+            )
+            for room in rooms
+        ],
+    }
+
+
+def board_minute(now=None):
+    return (now or timezone.localtime()).replace(second=0, microsecond=0)
+
+
+def refresh_board(building, now=None):
+    """Rebuild a building's board and store it, rendered, in the cache"""
+    minute = board_minute(now)
+    # Read before building, so a change made meanwhile leaves the board stale
+    version = boards_version()
+    board = build_board(building, minute)
+    key = board_cache_key(building)
+    if board is None:
+        cache.delete(key)
+        body = None
+    else:
+        body = json.dumps(board, cls=DjangoJSONEncoder).encode('utf-8')
+        cache.set(key, {'minute': minute.isoformat(), 'version': version, 'body': body}, BOARD_CACHE_TIMEOUT)
+    cache.delete(f'{key}:lock')
+    return body
+
+
+def refresh_all_boards(now=None):
+    """Rebuild the board of every building with active rooms; returns how many"""
+    buildings = Room.objects.filter(is_active=True).values_list('building', flat=True).distinct()
+    count = 0
+    for building in buildings:
+        if refresh_board(building, now) is not None:
+            count += 1
+    return count
+
+
+def get_board(building, now=None):
+    """Return a building's board as JSON bytes, or None for an unknown building.
+
+    A board from an earlier minute, or built before the last change, is
+    rebuilt by the one caller that wins the refresh lock; everyone else
+    is served the previous copy in the meantime.
+    """
+    minute = board_minute(now)
+    key = board_cache_key(building)
+    cached = cache.get(key)
+    if cached is not None:
+        if cached['minute'] == minute.isoformat() and cached.get('version') == boards_version():
+            return cached['body']
+        if not cache.add(f'{key}:lock', True, REFRESH_LOCK_TIMEOUT):
+            return cached['body']
+    return refresh_board(building, minute)
@@ -0,0 +1,122 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, router, transaction
+from rooms.models import Room
+
+
+# SQLite has no row or advisory locks and admits a single writer per file,
+# so bookings in one process are serialized on one lock. Striping it per
+# room/day would buy no write parallelism and would let deferred
+# transactions deadlock each other upgrading to the write lock.
+_sqlite_lock = threading.RLock()
+
+
+def _advisory_key(room_id):
+    """Fold a room id into the signed 32-bit key space of pg_advisory_xact_lock"""
+    return int(room_id) % (2 ** 31)
+
+
+@contextmanager
+def room_day_lock(room_id, day, using=None):
+    """Hold an exclusive booking lock for one room on one day.
+
+    The lock lives for the duration of a transaction opened here, so the
+    overlap check and the write that follows it are atomic. On PostgreSQL
+    bookings for other rooms or other days never wait on each other.
+    """
+    if using is None:
+        using = router.db_for_write(Room)
+    connection = connections[using]
+
+    if connection.vendor == 'sqlite':
+        with _sqlite_lock:
+            with transaction.atomic(using=using):
+                yield
+        return
+
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_advisory_xact_lock(%s, %s)',
+                    [_advisory_key(room_id), day.toordinal()]
+                )
+        else:
+            # No advisory locks: fall back to locking the room row itself
+            list(Room.objects.using(using).select_for_update().filter(pk=room_id).values_list('pk', flat=True))
+        yield
+
+
+def _instructor_advisory_key(instructor_key, day):
+    """Hash an instructor key and day into the signed 64-bit key space of pg_advisory_xact_lock.
+
+    The one-argument form has its own key space, apart from the
+    (room, day) pairs of room locks.
+    """
+    digest = hashlib.blake2b(f'{instructor_key}|{day.isoformat()}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+@contextmanager
+def instructor_day_lock(instructor_key, day, using=None):
+    """Hold an exclusive booking lock for one instructor on one day.
+
+    Taken after the room lock, so bookings of one instructor in two rooms
+    cannot both pass the instructor overlap check. Always the last lock
+    taken, and only one per transaction, so it cannot close a cycle.
+    """
+    if using is None:
+        using = router.db_for_write(Room)
+    connection = connections[using]
+
+    if connection.vendor == 'sqlite':
+        with _sqlite_lock:
+            with transaction.atomic(using=using, savepoint=False):
+                yield
+        return
+
+    with transaction.atomic(using=using, savepoint=False):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_advisory_xact_lock(%s)', [_instructor_advisory_key(instructor_key, day)]
+                )
+        # Other backends have no advisory locks and no instructor row to
+        # lock; there only the room lock applies
+        yield
+
+
+@contextmanager
+def room_days_lock(pairs, using=None):
+    """Hold the booking locks of many (room id, day) pairs at once.
+
+    Taken in sorted order in one statement, so two bulk operations
+    cannot deadlock each other, and single bookings of any of the pairs
+    wait until the transaction opened here ends.
+    """
+    if using is None:
+        using = router.db_for_write(Room)
+    connection = connections[using]
+    pairs = sorted(set(pairs))
+
+    if connection.vendor == 'sqlite':
+        with _sqlite_lock:
+            # Usually nested in the caller's transaction; no savepoint needed for a lock
+            with transaction.atomic(using=using, savepoint=False):
+                yield
+        return
+
+    with transaction.atomic(using=using, savepoint=False):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # unnest keeps the arrays' (sorted) order
+                cursor.execute(
+                    'SELECT pg_advisory_xact_lock(room_key, day) FROM unnest(%s::int[], %s::int[]) AS pairs(room_key, day)',
+                    [[_advisory_key(room_id) for room_id, _ in pairs], [day.toordinal() for _, day in pairs]]
+                )
+        else:
+            room_ids = sorted({room_id for room_id, _ in pairs})
+            list(Room.objects.using(using).select_for_update().filter(pk__in=room_ids).values_list('pk', flat=True))
+        yield
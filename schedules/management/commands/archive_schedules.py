@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from schedules.archive import ARCHIVABLE_STATUSES, ARCHIVE_CHUNK_SIZE, archive_schedules
+
+
+class Command(BaseCommand):
+    help = 'Move completed and cancelled schedules before a date into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True, help='Archive schedules dated before this day (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE, help='Rows moved per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            before = datetime.strptime(options['before'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('--before must be a date in YYYY-MM-DD format')
+
+        moved = archive_schedules(before, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} {'/'.join(ARCHIVABLE_STATUSES)} schedules dated before {before}"
+        ))
@@ -0,0 +1,82 @@
+import csv
+import json
+import time as timer
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from schedules.assignment import assign_rooms
+from schedules.models import Schedule
+from schedules.serializers import AssignmentSessionSerializer
+
+
+class Command(BaseCommand):
+    help = 'Assign rooms to unplaced course sessions from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (one session per row) or JSON (list of sessions) file')
+        parser.add_argument('--commit', action='store_true', help='Book the assigned rooms instead of only reporting them')
+
+    def read_sessions(self, path):
+        with open(path, newline='', encoding='utf-8') as source:
+            if path.endswith('.json'):
+                return json.load(source)
+            rows = list(csv.DictReader(source))
+        for row in rows:
+            # Equipment terms are separated by semicolons inside one CSV column
+            row['equipment'] = [term.strip() for term in row.get('equipment', '').split(';') if term.strip()]
+            for key in ['department', 'room_type', 'building', 'course_code', 'instructor']:
+                if not row.get(key):
+                    row.pop(key, None)
+        return rows
+
+    def handle(self, *args, **options):
+        try:
+            data = self.read_sessions(options['path'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read sessions: {e}')
+
+        serializer = AssignmentSessionSerializer(data=data, many=True)
+        if not serializer.is_valid():
+            errors = [(line, error) for line, error in enumerate(serializer.errors, start=1) if error]
+            raise CommandError(f'Invalid sessions (first 10): {errors[:10]}')
+        sessions = serializer.validated_data
+
+        started = timer.perf_counter()
+        result = assign_rooms(sessions)
+        elapsed = timer.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS('=== ROOM ASSIGNMENT ==='))
+        self.stdout.write(f"Sessions: {len(sessions)}, assigned: {len(result['assigned'])}, unplaced: {len(result['unplaced'])}")
+        self.stdout.write(f"Wasted seats: {result['wasted_seats']}")
+        self.stdout.write(f"Solved in {elapsed:.2f}s")
+        for item in result['unplaced']:
+            session = sessions[item['session']]
+            self.stdout.write(self.style.WARNING(
+                f"  Unplaced: {session['title']} on {session['date']} {session['start_time']}-{session['end_time']} ({item['reason']})"
+            ))
+
+        if not options['commit']:
+            self.stdout.write('Dry run: nothing was booked (use --commit to book)')
+            return
+
+        booked = 0
+        with transaction.atomic():
+            for item in result['assigned']:
+                session = sessions[item['session']]
+                schedule = Schedule(
+                    room_id=item['room'],
+                    title=session['title'],
+                    course_code=session['course_code'],
+                    instructor=session['instructor'],
+                    date=session['date'],
+                    start_time=session['start_time'],
+                    end_time=session['end_time'],
+                )
+                try:
+                    # save() re-checks the slot under the room/day lock
+                    schedule.save()
+                    booked += 1
+                except ValidationError as e:
+                    self.stdout.write(self.style.WARNING(f"  Not booked: {session['title']} ({e.messages[0]})"))
+        self.stdout.write(self.style.SUCCESS(f'Booked {booked} sessions'))
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from schedules.models import Schedule
+
+AUDIT_CHUNK_SIZE = 5000
+
+
+def sweep(rows):
+    """Yield (earlier_id, later_id, key, date) for overlapping rows.
+
+    Rows must be sorted by (key, date, start_time). Each row is compared
+    only with the row reaching furthest so far in its (key, date) group,
+    so one linear pass reports every booking that collides with another,
+    at least once, but not every overlapping pair among them.
+    """
+    group = None
+    reach_id, reach_end = None, None
+    for pk, key, day, start_time, end_time in rows:
+        if (key, day) != group:
+            group = (key, day)
+            reach_id, reach_end = pk, end_time
+            continue
+        if start_time < reach_end:
+            yield reach_id, pk, key, day
+        if end_time > reach_end:
+            reach_id, reach_end = pk, end_time
+
+
+class Command(BaseCommand):
+    help = 'Find instructors and course codes booked at overlapping times, across all rooms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-date', help='Only audit schedules on or after this day (YYYY-MM-DD)')
+        parser.add_argument('--limit', type=int, default=50, help='Maximum collisions listed per kind')
+
+    def handle(self, *args, **options):
+        schedules = Schedule.objects.filter(status__in=['scheduled', 'in_progress'])
+        if options['from_date']:
+            try:
+                from_date = datetime.strptime(options['from_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--from-date must be a date in YYYY-MM-DD format')
+            schedules = schedules.filter(date__gte=from_date)
+
+        self.stdout.write(self.style.SUCCESS('=== COLLISION AUDIT ==='))
+        for label, field in [('Instructor', 'instructor_key'), ('Course code', 'course_code')]:
+            rows = schedules.exclude(**{field: ''}).order_by(field, 'date', 'start_time').values_list(
+                'id', field, 'date', 'start_time', 'end_time'
+            )
+            collisions = 0
+            for earlier_id, later_id, key, day in sweep(rows.iterator(chunk_size=AUDIT_CHUNK_SIZE)):
+                collisions += 1
+                if collisions <= options['limit']:
+                    self.stdout.write(f'  {label} {key!r} on {day}: schedules #{earlier_id} and #{later_id} overlap')
+            style = self.style.ERROR if collisions else self.style.SUCCESS
+            self.stdout.write(style(f'{label} collisions: {collisions}'))
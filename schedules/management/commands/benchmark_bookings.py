@@ -0,0 +1,107 @@
+import random
+import threading
+import time as timer
+from datetime import date, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, DatabaseError
+from rooms.models import Department, Room
+from schedules.models import Schedule
+from schedules.serializers import ScheduleCreateSerializer
+from rest_framework import serializers
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent bookings and verify that no room is ever double-booked'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Number of concurrent booking threads')
+        parser.add_argument('--rooms', type=int, default=8, help='Number of rooms to book into')
+        parser.add_argument('--attempts', type=int, default=50, help='Booking attempts per thread')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark data afterwards')
+
+    def handle(self, *args, **options):
+        department, _ = Department.objects.get_or_create(
+            code='BENCH',
+            defaults={'name': 'Booking Benchmark', 'description': 'Created by benchmark_bookings'}
+        )
+        # bulk_create skips Room.save(), so no QR codes are rendered for benchmark rooms
+        Room.objects.bulk_create([
+            Room(name=f'Benchmark Room {i}', number=f'BENCH{i}', department=department, capacity=30)
+            for i in range(options['rooms'])
+        ], ignore_conflicts=True)
+        room_ids = list(department.rooms.values_list('id', flat=True)[:options['rooms']])
+        target_date = date.today() + timedelta(days=3650)
+        Schedule.objects.filter(room_id__in=room_ids, date=target_date).delete()
+
+        counters = {'booked': 0, 'conflicts': 0, 'errors': 0}
+        counters_lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(options['attempts']):
+                    # Half-hour starts with one-hour slots, so attempts partially overlap
+                    start_minutes = 8 * 60 + 30 * rng.randrange(20)
+                    serializer = ScheduleCreateSerializer(data={
+                        'room': rng.choice(room_ids),
+                        'title': 'Benchmark booking',
+                        'date': target_date.isoformat(),
+                        'start_time': time(start_minutes // 60, start_minutes % 60).isoformat(),
+                        'end_time': time(start_minutes // 60 + 1, start_minutes % 60).isoformat(),
+                    })
+                    outcome = 'conflicts'
+                    try:
+                        if serializer.is_valid():
+                            serializer.save()
+                            outcome = 'booked'
+                    except serializers.ValidationError:
+                        # Passed the pre-check but lost the slot under the lock
+                        pass
+                    except DatabaseError:
+                        outcome = 'errors'
+                    with counters_lock:
+                        counters[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        started = timer.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = timer.perf_counter() - started
+
+        double_bookings = self.count_double_bookings(room_ids, target_date)
+        attempts = options['threads'] * options['attempts']
+
+        self.stdout.write(self.style.SUCCESS('=== BOOKING BENCHMARK ==='))
+        self.stdout.write(f"Database vendor: {connection.vendor}")
+        self.stdout.write(f"Threads: {options['threads']}, rooms: {len(room_ids)}, attempts: {attempts}")
+        self.stdout.write(f"Elapsed: {elapsed:.2f}s")
+        self.stdout.write(f"Attempts/s: {attempts / elapsed:.1f}")
+        self.stdout.write(f"Bookings/s: {counters['booked'] / elapsed:.1f}")
+        self.stdout.write(f"Booked: {counters['booked']}, conflicts: {counters['conflicts']}, errors: {counters['errors']}")
+        if double_bookings:
+            self.stdout.write(self.style.ERROR(f'Double bookings: {double_bookings}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Double bookings: 0'))
+
+        if not options['keep']:
+            department.delete()
+
+    def count_double_bookings(self, room_ids, target_date):
+        """Count adjacent overlapping pairs per room in start-time order"""
+        double_bookings = 0
+        last_end = {}
+        schedules = Schedule.objects.filter(
+            room_id__in=room_ids,
+            date=target_date,
+            status__in=['scheduled', 'in_progress']
+        ).order_by('room_id', 'start_time').values_list('room_id', 'start_time', 'end_time')
+        for room_id, start_time, end_time in schedules:
+            if room_id in last_end and start_time < last_end[room_id]:
+                double_bookings += 1
+            last_end[room_id] = max(end_time, last_end.get(room_id, end_time))
+        return double_bookings
@@ -0,0 +1,69 @@
+import random
+import statistics
+import time as timer
+from datetime import date, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from schedules.occupancy import FUTURE_DAYS, MINUTES_PER_DAY, PAST_DAYS, OccupancyIndex, build_rooms
+
+LOOKUPS = 100000
+
+
+class Command(BaseCommand):
+    help = 'Measure the occupancy index\'s memory and lookup time on a synthetic campus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=1000, help='Rooms in the synthetic campus')
+        parser.add_argument('--bookings-per-day', type=int, default=8, help='Bookings per room and day')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== OCCUPANCY INDEX BENCHMARK ==='))
+        per_day = options['bookings_per_day']
+        if options['rooms'] < 1 or not 1 <= per_day <= 15:
+            raise CommandError('--rooms must be positive and --bookings-per-day between 1 and 15')
+
+        # Hour-long bookings from 7:00, the way a full teaching day looks
+        index = OccupancyIndex()
+        index.first_day, index.last_day = index.window(date.today())
+        days = PAST_DAYS + FUTURE_DAYS + 1
+        rows = (
+            (schedule_id, room_id, index.first_day + timedelta(days=day), time(7 + slot), time(8 + slot))
+            for schedule_id, (room_id, day, slot) in enumerate(
+                (room_id, day, slot)
+                for room_id in range(1, options['rooms'] + 1)
+                for day in range(days)
+                for slot in range(per_day)
+            )
+        )
+        started = timer.perf_counter()
+        index.rooms = build_rooms(rows, index.first_day)
+        built_in = timer.perf_counter() - started
+
+        report = index.memory_report()
+        self.stdout.write(
+            f"{report['rooms']} rooms, {report['bookings']} bookings over {report['days']} days, "
+            f"built in {built_in:.2f}s"
+        )
+        self.stdout.write(
+            f"Memory: {report['bytes'] / 1024:.0f} KiB, {report['bytes_per_1000_rooms'] / 1024:.0f} KiB "
+            f"per 1,000 rooms, {report['bytes_per_booking']} bytes per booking"
+        )
+
+        # The lookups an availability request makes, without the refresh check
+        room_ids = list(index.rooms)
+        minutes = [
+            (random.choice(room_ids), PAST_DAYS * MINUTES_PER_DAY + random.randrange(7 * 60, 22 * 60))
+            for _ in range(LOOKUPS)
+        ]
+        timings = []
+        for batch in range(0, LOOKUPS, 1000):
+            started = timer.perf_counter()
+            for room_id, minute in minutes[batch:batch + 1000]:
+                intervals = index.rooms[room_id]
+                intervals.current(minute)
+                intervals.next(minute, minute - minute % MINUTES_PER_DAY + MINUTES_PER_DAY)
+            timings.append((timer.perf_counter() - started) / 1000 * 1e6)
+        self.stdout.write(self.style.SUCCESS(
+            f'Lookup: {statistics.mean(timings):.2f}µs mean, {max(timings):.2f}µs worst batch average '
+            f'({LOOKUPS} lookups)'
+        ))
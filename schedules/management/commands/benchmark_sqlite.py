@@ -0,0 +1,142 @@
+import random
+import statistics
+import tempfile
+import threading
+import time as timer
+from datetime import date, time, timedelta
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+from room_scheduler.sqlite import sqlite_database
+from rooms.models import Department, Room
+from schedules.models import Schedule
+
+CONFIGURATIONS = [
+    ('default', False),
+    ('tuned', True),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark a mixed read/write load on SQLite with default and tuned settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent request threads')
+        parser.add_argument('--seconds', type=float, default=10, help='Duration of each run')
+        parser.add_argument('--write-ratio', type=float, default=0.1, help='Share of requests that write')
+        parser.add_argument('--rooms', type=int, default=200, help='Rooms in the benchmark database')
+        parser.add_argument('--weeks', type=int, default=16, help='Weeks of bookings in the benchmark database')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== SQLITE BENCHMARK ==='))
+        self.stdout.write(
+            f"Threads: {options['threads']}, seconds: {options['seconds']}, "
+            f"write ratio: {options['write_ratio']}, rooms: {options['rooms']}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for label, tuned in CONFIGURATIONS:
+                alias = f'benchmark_{label}'
+                self.add_database(alias, sqlite_database(Path(directory) / f'{label}.sqlite3', tuned=tuned))
+                try:
+                    call_command('migrate', database=alias, verbosity=0)
+                    self.seed(alias, options)
+                    results = self.run(alias, options)
+                finally:
+                    connections[alias].close()
+                self.report(label, results, options['seconds'])
+
+    def add_database(self, alias, config):
+        databases = dict(connections.settings)
+        databases[alias] = config
+        connections.settings = connections.configure_settings(databases)
+
+    def seed(self, alias, options):
+        department = Department.objects.using(alias).create(name='Benchmark', code='BENCH')
+        Room.objects.using(alias).bulk_create([
+            Room(name=f'Room {i}', number=f'R{i}', department=department, capacity=30, building=f'Building {i % 10}')
+            for i in range(options['rooms'])
+        ])
+        room_ids = list(Room.objects.using(alias).values_list('id', flat=True))
+        monday = date.today() - timedelta(days=date.today().weekday())
+        schedules = [
+            Schedule(
+                room_id=room_id, title='Lecture', instructor=f'Instructor {room_id % 50}',
+                date=monday + timedelta(days=day), start_time=time(hour), end_time=time(hour + 1)
+            )
+            for room_id in room_ids
+            for day in range(options['weeks'] * 7) if day % 7 < 5
+            for hour in (9, 11, 14)
+        ]
+        Schedule.objects.using(alias).bulk_create(schedules, batch_size=2000)
+
+    def run(self, alias, options):
+        """Each thread issues requests until time runs out, closing the
+        connection after each one as Django does at the end of a request"""
+        room_ids = list(Room.objects.using(alias).values_list('id', flat=True))
+        schedule_ids = list(Schedule.objects.using(alias).values_list('id', flat=True))
+        monday = date.today() - timedelta(days=date.today().weekday())
+        deadline = timer.perf_counter() + options['seconds']
+        results = {'read': [], 'write': [], 'errors': 0}
+        results_lock = threading.Lock()
+
+        def read(rng):
+            # The room week view: one room's bookings for a week
+            list(Schedule.objects.using(alias).filter(
+                room_id=rng.choice(room_ids),
+                date__range=[monday, monday + timedelta(days=6)]
+            ).order_by('date', 'start_time').values())
+
+        def write(rng):
+            # Read, then write in one transaction, like a status change
+            with transaction.atomic(using=alias):
+                schedule = Schedule.objects.using(alias).get(pk=rng.choice(schedule_ids))
+                Schedule.objects.using(alias).filter(pk=schedule.pk).update(
+                    status='completed' if schedule.status == 'scheduled' else 'scheduled',
+                    updated_at=timezone.now()
+                )
+
+        def worker(seed):
+            rng = random.Random(seed)
+            timings = {'read': [], 'write': []}
+            errors = 0
+            try:
+                while timer.perf_counter() < deadline:
+                    kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                    started = timer.perf_counter()
+                    try:
+                        (write if kind == 'write' else read)(rng)
+                        timings[kind].append(timer.perf_counter() - started)
+                    except DatabaseError:
+                        errors += 1
+                    connections[alias].close_if_unusable_or_obsolete()
+            finally:
+                connections[alias].close()
+                with results_lock:
+                    results['read'].extend(timings['read'])
+                    results['write'].extend(timings['write'])
+                    results['errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, label, results, seconds):
+        def percentile(values, share):
+            return sorted(values)[min(len(values) - 1, int(len(values) * share))] * 1000 if values else 0
+
+        requests = len(results['read']) + len(results['write'])
+        self.stdout.write(self.style.SUCCESS(f'--- {label} ---'))
+        self.stdout.write(f'Requests/s: {requests / seconds:.0f} (writes/s: {len(results["write"]) / seconds:.0f})')
+        for kind in ('read', 'write'):
+            values = results[kind]
+            self.stdout.write(
+                f'{kind.capitalize()}s: p50 {percentile(values, 0.5):.2f} ms, p95 {percentile(values, 0.95):.2f} ms, '
+                f'p99 {percentile(values, 0.99):.2f} ms, mean {statistics.fmean(values) * 1000 if values else 0:.2f} ms'
+            )
+        self.stdout.write(f'Errors (database is locked): {results["errors"]}')
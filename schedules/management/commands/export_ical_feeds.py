@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rooms.models import Room
+from schedules.models import Schedule
+from schedules.ical import feed_queryset, iter_calendar
+
+
+class Command(BaseCommand):
+    help = "Write every active room's iCalendar feed to a directory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Directory to write room-<id>.ics files into')
+        parser.add_argument('--workers', type=int, default=4, help='Number of feeds written in parallel')
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        today = date.today()
+        rooms = list(Room.objects.filter(is_active=True).values_list('id', 'name', 'number'))
+
+        def export(room):
+            room_id, name, number = room
+            try:
+                path = output / f'room-{room_id}.ics'
+                queryset = feed_queryset(Schedule.objects.filter(room_id=room_id), today)
+                # Write next to the target and rename, so readers never see a partial feed
+                partial = path.with_suffix('.ics.tmp')
+                with open(partial, 'w', encoding='utf-8', newline='') as feed:
+                    for chunk in iter_calendar(queryset, f'{name} ({number})'):
+                        feed.write(chunk)
+                partial.replace(path)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            list(executor.map(export, rooms))
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {len(rooms)} room feeds to {output}'))
@@ -0,0 +1,80 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from schedules.snapshots import (
+    MANIFEST_NAME, SNAPSHOT_WEEKS, content_hash, render_room_snapshots, room_fingerprints, snapshot_weeks,
+    write_atomic
+)
+
+
+class Command(BaseCommand):
+    help = 'Write static per-room week schedule snapshots, re-exporting only rooms that changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Directory served by the CDN or web server')
+        parser.add_argument('--weeks', type=int, default=SNAPSHOT_WEEKS, help='Weeks published, from the current one')
+        parser.add_argument('--html', action='store_true', help='Also write an HTML page per room and week')
+        parser.add_argument('--workers', type=int, default=4, help='Number of rooms rendered in parallel')
+        parser.add_argument('--force', action='store_true', help='Re-render every room')
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        manifest_path = output / MANIFEST_NAME
+        settings = {'weeks': options['weeks'], 'html': options['html']}
+
+        previous = {}
+        if manifest_path.exists() and not options['force']:
+            manifest = json.loads(manifest_path.read_text())
+            # Snapshots written with other options cannot be reused
+            if manifest.get('settings') == settings:
+                previous = manifest['rooms']
+
+        mondays = snapshot_weeks(date.today(), options['weeks'])
+        fingerprints = room_fingerprints(mondays)
+        changed = [
+            room_id for room_id, fingerprint in fingerprints.items()
+            if previous.get(str(room_id), {}).get('fingerprint') != fingerprint
+        ]
+
+        def export(room_id):
+            try:
+                return room_id, render_room_snapshots(room_id, mondays, html=options['html'])
+            finally:
+                connection.close()
+
+        rooms = {key: value for key, value in previous.items() if int(key) in fingerprints}
+        written = unchanged = removed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for room_id, files in executor.map(export, changed):
+                old_files = previous.get(str(room_id), {}).get('files', {})
+                hashes = {}
+                for relative, content in files.items():
+                    hashes[relative] = content_hash(content)
+                    path = output / relative
+                    if old_files.get(relative) == hashes[relative] and path.exists():
+                        unchanged += 1
+                        continue
+                    write_atomic(path, content)
+                    written += 1
+                # Weeks that rolled out of the window
+                for relative in old_files.keys() - files.keys():
+                    (output / relative).unlink(missing_ok=True)
+                    removed += 1
+                rooms[str(room_id)] = {'fingerprint': fingerprints[room_id], 'files': hashes}
+
+        # Rooms deactivated or deleted since the last run
+        for key in previous.keys() - rooms.keys():
+            for relative in previous[key]['files']:
+                (output / relative).unlink(missing_ok=True)
+                removed += 1
+
+        write_atomic(manifest_path, json.dumps({'settings': settings, 'rooms': rooms}, indent=1).encode('utf-8'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {len(changed)} of {len(fingerprints)} rooms: '
+            f'{written} files written, {unchanged} unchanged, {removed} removed'
+        ))
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import random
+import ssl
+import time as timer
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+OPERATIONS = ['scan', 'rooms', 'week', 'create', 'edit', 'status']
+# A class change: mostly students scanning door QR codes, a few staff edits
+DEFAULT_MIX = 'scan=75,rooms=5,week=10,create=4,edit=3,status=3'
+TITLE = 'Load test booking'
+
+
+def parse_mix(value):
+    """'scan=70,rooms=10' -> {'scan': 70, 'rooms': 10}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(f"Unknown operation '{name}' in --mix (choose from {', '.join(OPERATIONS)})")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f"--mix weight for '{name}' must be a number")
+    if sum(mix.values()) <= 0:
+        raise CommandError('--mix needs at least one positive weight')
+    return mix
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0
+    return values[min(len(values) - 1, max(0, round(share * len(values)) - 1))]
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b'null')
+
+
+class LoadTest:
+    """Simulated clients against a running server, recording every request.
+
+    Speaks plain HTTP/1.1 over asyncio streams with one connection per
+    request, the way phones scanning a door code arrive, so the harness
+    needs nothing beyond the standard library.
+    """
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise CommandError('--url must look like http://127.0.0.1:8000')
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.rooms = []
+        self.created = []
+        self.results = defaultdict(list)
+
+    async def request(self, method, path, data=None, client=0):
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        # A distinct address per simulated client, so a server behind
+        # THROTTLE_NUM_PROXIES=1 throttles each one separately
+        lines = [
+            f'{method} {self.prefix}{path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Accept: application/json',
+            'Connection: close',
+            f'X-Forwarded-For: 10.{client >> 16 & 255}.{client >> 8 & 255}.{client & 255}',
+            f'Content-Length: {len(body)}',
+        ]
+        if body:
+            lines.append('Content-Type: application/json')
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        try:
+            writer.write('\r\n'.join(lines).encode('latin-1') + b'\r\n\r\n' + body)
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        head, _, content = raw.partition(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return Response(int(status_line.split()[1]), headers, content)
+
+    async def discover(self):
+        try:
+            response = await asyncio.wait_for(self.request('GET', '/api/rooms/'), self.timeout)
+        except (OSError, asyncio.TimeoutError) as error:
+            raise CommandError(f'Cannot reach {self.host}:{self.port} ({error}); is the server running?')
+        if response.status != 200:
+            raise CommandError(f'GET /api/rooms/ answered {response.status}; is the server running?')
+        self.rooms = [room['id'] for room in response.json()]
+        if not self.rooms:
+            raise CommandError('The server has no active rooms to test against')
+
+    def operation(self, name):
+        """(name, method, path, data) of one request; edits need a booking this run created"""
+        room_id = random.choice(self.rooms)
+        if name in ('edit', 'status') and not self.created:
+            name = 'create'
+        if name == 'scan':
+            return name, 'GET', f'/api/rooms/{room_id}/availability/', None
+        if name == 'rooms':
+            return name, 'GET', '/api/rooms/', None
+        if name == 'week':
+            today = date.today()
+            monday = today - timedelta(days=today.weekday()) + timedelta(weeks=random.randint(-2, 4))
+            return name, 'GET', f'/api/rooms/{room_id}/schedule/?start_date={monday.isoformat()}', None
+        if name == 'create':
+            # Far enough ahead not to collide with real bookings; collisions
+            # between test bookings are answered 400 and counted as rejected
+            day = date.today() + timedelta(days=random.randint(60, 240))
+            hour = random.randint(7, 20)
+            return name, 'POST', '/api/schedules/', {
+                'room': room_id, 'title': TITLE, 'instructor': 'Load Test',
+                'date': day.isoformat(), 'start_time': f'{hour:02d}:00', 'end_time': f'{hour:02d}:50',
+            }
+        schedule_id = random.choice(self.created)
+        if name == 'edit':
+            return name, 'PATCH', f'/api/schedules/{schedule_id}/', {'description': f'Edited at {timer.time():.0f}'}
+        return name, 'POST', f'/api/schedules/{schedule_id}/status/', {
+            'status': random.choice(['scheduled', 'in_progress'])
+        }
+
+    async def run_one(self, name, client, started=None):
+        """Send one request, timing it from `started` (its arrival) when given"""
+        name, method, path, data = self.operation(name)
+        started = started or timer.perf_counter()
+        try:
+            response = await asyncio.wait_for(self.request(method, path, data, client), self.timeout)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError) as error:
+            self.results[name].append((timer.perf_counter() - started, type(error).__name__, None, False))
+            return
+        latency = timer.perf_counter() - started
+        if name == 'create' and response.status == 201:
+            await self.remember(data, client)
+        queries = response.headers.get('x-query-count')
+        stale = 'stale' in response.headers
+        self.results[name].append((latency, response.status, int(queries) if queries else None, stale))
+
+    async def remember(self, booking, client):
+        """Find a created booking's id (the create response leaves it out); not timed"""
+        try:
+            response = await asyncio.wait_for(self.request(
+                'GET', f"/api/schedules/?room={booking['room']}&date={booking['date']}", client=client
+            ), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return
+        if response.status == 200:
+            self.created.extend(
+                schedule['id'] for schedule in response.json()
+                if schedule['title'] == TITLE and schedule['start_time'].startswith(booking['start_time'])
+            )
+
+    async def closed_loop(self, mix, clients, seconds, think):
+        """`clients` users, each sending its next request `think` seconds after the last answer"""
+        names, weights = zip(*mix.items())
+        deadline = timer.monotonic() + seconds
+
+        async def user(client):
+            while timer.monotonic() < deadline:
+                await self.run_one(random.choices(names, weights)[0], client)
+                if think:
+                    await asyncio.sleep(random.expovariate(1 / think))
+
+        await asyncio.gather(*(user(client) for client in range(clients)))
+
+    async def open_loop(self, mix, clients, seconds, rate):
+        """Requests arriving at `rate` per second, whether or not earlier ones were answered.
+
+        Each arrival is a new client; at most `clients` requests are in flight.
+        """
+        names, weights = zip(*mix.items())
+        limit = asyncio.Semaphore(clients)
+        tasks = []
+        deadline = timer.monotonic() + seconds
+
+        async def arrival(client):
+            # Latency counts from arrival, so time spent waiting for a free
+            # slot is not hidden from the percentiles
+            arrived = timer.perf_counter()
+            async with limit:
+                await self.run_one(random.choices(names, weights)[0], client, arrived)
+
+        client = 0
+        while timer.monotonic() < deadline:
+            tasks.append(asyncio.ensure_future(arrival(client)))
+            client += 1
+            await asyncio.sleep(random.expovariate(rate))
+        await asyncio.gather(*tasks)
+
+    async def clean_up(self):
+        for schedule_id in self.created:
+            try:
+                await asyncio.wait_for(self.request('DELETE', f'/api/schedules/{schedule_id}/'), self.timeout)
+            except (OSError, asyncio.TimeoutError):
+                pass
+
+
+class Command(BaseCommand):
+    help = 'Replay a mix of scans, list reads and staff edits against a running server and report latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Operation weights (default: {DEFAULT_MIX})')
+        parser.add_argument('--clients', type=int, default=50, help='Concurrent clients (open loop: max in flight)')
+        parser.add_argument('--seconds', type=float, default=30, help='Duration of the run')
+        parser.add_argument('--rate', type=float, help='Arrivals per second; without it clients send back to back')
+        parser.add_argument('--think', type=float, default=0, help='Mean pause between a client\'s requests')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+        parser.add_argument('--keep', action='store_true', help='Keep the bookings the run created')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== LOAD TEST ==='))
+        mix = parse_mix(options['mix'])
+        if options['clients'] < 1 or options['seconds'] <= 0 or (options['rate'] is not None and options['rate'] <= 0):
+            raise CommandError('--clients, --seconds and --rate must be positive')
+
+        load_test = LoadTest(options['url'], options['timeout'])
+        mode = f"{options['rate']}/s arriving" if options['rate'] else f"{options['clients']} clients back to back"
+        self.stdout.write(f"{options['url']}: {mode} for {options['seconds']}s, mix {options['mix']}")
+        started = timer.monotonic()
+        elapsed = asyncio.run(self.run(load_test, mix, options))
+        self.report(load_test.results, elapsed)
+        if load_test.created and not options['keep']:
+            self.stdout.write(f'Deleting {len(load_test.created)} test bookings')
+            asyncio.run(load_test.clean_up())
+        self.stdout.write(f'Finished in {timer.monotonic() - started:.1f}s')
+
+    async def run(self, load_test, mix, options):
+        await load_test.discover()
+        started = timer.monotonic()
+        if options['rate']:
+            await load_test.open_loop(mix=mix, clients=options['clients'],
+                                      seconds=options['seconds'], rate=options['rate'])
+        else:
+            await load_test.closed_loop(mix=mix, clients=options['clients'],
+                                        seconds=options['seconds'], think=options['think'])
+        return timer.monotonic() - started
+
+    def report(self, results, elapsed):
+        self.stdout.write(
+            f"\n{'operation':<10}{'requests':>9}{'ok':>7}{'rejected':>9}{'429':>6}{'shed':>6}{'errors':>7}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        everything = []
+        totals = Counter()
+        for name in OPERATIONS + sorted(set(results) - set(OPERATIONS)):
+            rows = results.get(name)
+            if not rows:
+                continue
+            everything.extend(rows)
+            counts = self.classify(rows)
+            totals.update(counts)
+            latencies = sorted(latency for latency, *_ in rows)
+            queries = [count for _, _, count, _ in rows if count is not None]
+            mean_queries = f'{sum(queries) / len(queries):.1f}' if queries else '-'
+            self.stdout.write(
+                f"{name:<10}{len(rows):>9}{counts['ok']:>7}{counts['rejected']:>9}{counts['throttled']:>6}"
+                f"{counts['shed']:>6}{counts['errors']:>7}"
+                f"{percentile(latencies, 0.5) * 1000:>9.1f}{percentile(latencies, 0.95) * 1000:>9.1f}"
+                f"{percentile(latencies, 0.99) * 1000:>9.1f}{mean_queries:>9}"
+            )
+
+        if not everything:
+            self.stdout.write(self.style.WARNING('No requests completed'))
+            return
+        latencies = sorted(latency for latency, *_ in everything)
+        queries = [count for _, _, count, _ in everything if count is not None]
+        self.stdout.write(
+            f"\nThroughput: {len(everything) / elapsed:.1f} requests/s over {elapsed:.1f}s; "
+            f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms"
+        )
+        self.stdout.write(
+            f"Error rate: {totals['errors'] / len(everything):.2%} "
+            f"({totals['throttled']} throttled, {totals['shed']} shed or stale)"
+        )
+        if queries:
+            self.stdout.write(
+                f'Database queries: {sum(queries)} total, {sum(queries) / elapsed:.0f}/s '
+                f'(cached responses report none)'
+            )
+        else:
+            self.stdout.write('Database queries: not reported (run the server with DEBUG=True for X-Query-Count)')
+        if totals['throttled'] > len(everything) / 10:
+            self.stdout.write(self.style.WARNING(
+                'Many requests were throttled: unless the server trusts X-Forwarded-For '
+                '(THROTTLE_NUM_PROXIES=1), every simulated client shares one address'
+            ))
+        failures = Counter(status for _, status, _, _ in everything if isinstance(status, str))
+        for failure, count in failures.most_common():
+            self.stdout.write(self.style.WARNING(f'  {count} x {failure}'))
+
+    def classify(self, rows):
+        counts = Counter(ok=0, rejected=0, throttled=0, shed=0, errors=0)
+        for _, status, _, stale in rows:
+            if isinstance(status, str) or status >= 500 and status != 503:
+                counts['errors'] += 1
+            elif status == 429:
+                counts['throttled'] += 1
+            elif status == 503 or stale:
+                counts['shed'] += 1
+            elif status >= 400:
+                counts['rejected'] += 1
+            else:
+                counts['ok'] += 1
+        return counts
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from schedules.kiosk import refresh_all_boards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached kiosk board of every building, once or at the start of every minute'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and refresh every minute')
+
+    def handle(self, *args, **options):
+        while True:
+            count = refresh_all_boards()
+            self.stdout.write(self.style.SUCCESS(f'Refreshed {count} kiosk boards at {timezone.localtime():%H:%M:%S}'))
+            if not options['loop']:
+                return
+            time.sleep(60 - timezone.localtime().second + 0.5)
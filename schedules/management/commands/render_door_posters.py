@@ -0,0 +1,93 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from schedules.posters import (
+    POSTER_FORMATS, poster_content, poster_hash, poster_rooms, poster_week, render_poster, room_qr_png,
+    week_bookings
+)
+from schedules.snapshots import MANIFEST_NAME, write_atomic
+
+
+def render_file(path, content, qr_png, image_format):
+    """Process pool task: render one poster straight to disk"""
+    write_atomic(Path(path), render_poster(content, qr_png, image_format))
+    return path
+
+
+class Command(BaseCommand):
+    help = 'Render printable door posters (week timetable and QR code) for every active room'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Directory the posters are written to')
+        parser.add_argument('--format', choices=sorted(POSTER_FORMATS), default='pdf', help='Poster file format')
+        parser.add_argument('--week', help='Any date in the week to print (YYYY-MM-DD, default: this week)')
+        parser.add_argument('--room', type=int, action='append', dest='rooms', help='Only this room (repeatable)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Rendering processes')
+        parser.add_argument('--force', action='store_true', help='Re-render posters whose content is unchanged')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== RENDER DOOR POSTERS ==='))
+        try:
+            day = datetime.strptime(options['week'], '%Y-%m-%d').date() if options['week'] else None
+        except ValueError:
+            raise CommandError('--week must be in YYYY-MM-DD format')
+        monday = poster_week(day)
+        image_format = options['format']
+
+        output = Path(options['output'])
+        week_dir = f'week-{monday.isoformat()}'
+        output.mkdir(parents=True, exist_ok=True)
+        manifest_path = output / MANIFEST_NAME
+        manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+        # Two queries for the whole campus, whatever the number of rooms
+        rooms = poster_rooms(options['rooms'])
+        bookings = week_bookings(monday, options['rooms'])
+
+        jobs = []
+        hashes = {}
+        skipped = 0
+        for room in rooms:
+            content = poster_content(room, monday, bookings.get(room['id'], []))
+            relative = f"{week_dir}/room-{room['id']}.{image_format}"
+            hashes[relative] = poster_hash(content)
+            if not options['force'] and manifest.get(relative) == hashes[relative] and (output / relative).exists():
+                skipped += 1
+                continue
+            jobs.append((str(output / relative), content, room_qr_png(room), image_format))
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        rendered = 0
+        if jobs:
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+                chunksize = max(1, len(jobs) // (options['workers'] * 8))
+                for _ in executor.map(render_file, *zip(*jobs), chunksize=chunksize):
+                    rendered += 1
+                    if rendered % 500 == 0:
+                        self.stdout.write(f'Rendered {rendered} of {len(jobs)} posters')
+
+        # Posters of rooms in this week's folder that are no longer active
+        removed = 0
+        if not options['rooms']:
+            stale = [
+                key for key in manifest
+                if key.startswith(f'{week_dir}/') and key.endswith(f'.{image_format}') and key not in hashes
+            ]
+            for relative in stale:
+                (output / relative).unlink(missing_ok=True)
+                del manifest[relative]
+                removed += 1
+
+        manifest.update(hashes)
+        write_atomic(manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Week of {monday.isoformat()}: {rendered} posters rendered, '
+            f'{skipped} unchanged, {removed} removed ({output / week_dir})'
+        ))
@@ -0,0 +1,64 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from schedules.rollover import ROLLOVER_CHUNK_SIZE, rollover_schedules
+
+
+def parse_date(value, option):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'{option} must be a date in YYYY-MM-DD format, not {value!r}')
+
+
+def parse_range(value, option):
+    start, _, end = value.partition(':')
+    if not end:
+        raise CommandError(f'{option} must be START:END, e.g. 2024-09-02:2024-12-20')
+    return parse_date(start, option), parse_date(end, option)
+
+
+class Command(BaseCommand):
+    help = "Copy a term's bookings into another term on the same weekdays"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-range', required=True, help='Term to copy, START:END (YYYY-MM-DD)')
+        parser.add_argument('--to-range', required=True, help='Term to fill, START:END (YYYY-MM-DD)')
+        parser.add_argument('--skip-date', action='append', default=[], help='Holiday in the new term (repeatable)')
+        parser.add_argument('--room', type=int, action='append', help='Only copy this room (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=ROLLOVER_CHUNK_SIZE, help='Bookings per INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Check for conflicts and count only')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== ROLLOVER SCHEDULES ==='))
+        from_start, from_end = parse_range(options['from_range'], '--from-range')
+        to_start, to_end = parse_range(options['to_range'], '--to-range')
+        skip_dates = [parse_date(value, '--skip-date') for value in options['skip_date']]
+
+        started = time.monotonic()
+        try:
+            result = rollover_schedules(
+                from_start, from_end, to_start, to_end, skip_dates=skip_dates, room_ids=options['room'],
+                dry_run=options['dry_run'], chunk_size=options['chunk_size']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for conflict in result['conflicts']:
+            self.stderr.write(
+                f"Schedule {conflict['id']} conflicts ({conflict['reason']}) with {conflict['title']!r} "
+                f"on {conflict['date']} {conflict['start_time']:%H:%M}-{conflict['end_time']:%H:%M}"
+            )
+        if result['conflicted'] > len(result['conflicts']):
+            self.stderr.write(f"... and {result['conflicted'] - len(result['conflicts'])} more")
+
+        created = 'to create' if options['dry_run'] else 'created'
+        summary = (
+            f"{result['created']} {created}, {result['skipped']} skipped, {result['conflicted']} conflicted "
+            f"of {result['matched']} bookings, {result['offset_days']:+d} days"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: {summary}'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'{summary} in {time.monotonic() - started:.2f}s'))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0001_initial'),
+        ('schedules', '0002_schedule_room_date_start_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['date', 'start_time'], name='schedule_date_start_idx'),
+        ),
+    ]
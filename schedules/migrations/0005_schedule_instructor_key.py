@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:44
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalize_instructor(name):
+    # Frozen copy of schedules.models.normalize_instructor
+    name = unicodedata.normalize('NFKD', name.casefold())
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', name))[:100].rstrip()
+
+
+def backfill_instructor_key(apps, schema_editor):
+    Schedule = apps.get_model('schedules', 'Schedule')
+    # One UPDATE per distinct spelling instead of one per row
+    names = Schedule.objects.exclude(instructor='').values_list('instructor', flat=True).distinct()
+    for name in list(names):
+        Schedule.objects.filter(instructor=name).update(instructor_key=normalize_instructor(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0001_initial'),
+        ('schedules', '0004_archivedschedule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='instructor_key',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_instructor_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['instructor_key', 'date', 'start_time'], name='schedule_instructor_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+def normalize_instructor(name):
+    # Frozen copy of schedules.models.normalize_instructor
+    name = unicodedata.normalize('NFKD', name.casefold())
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', name))[:100].rstrip()
+
+
+def recompute_instructor_key(apps, schema_editor):
+    Schedule = apps.get_model('schedules', 'Schedule')
+    # Keys from 0005 dropped non-Latin letters and could outgrow the
+    # column; one UPDATE per distinct spelling
+    names = Schedule.objects.exclude(instructor='').values_list('instructor', flat=True).distinct()
+    for name in list(names):
+        Schedule.objects.filter(instructor=name).update(instructor_key=normalize_instructor(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0005_schedule_instructor_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_instructor_key, migrations.RunPython.noop),
+    ]
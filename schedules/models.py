@@ -3,6 +3,20 @@ from django.contrib.auth.models import User
 from rooms.models import Room
 from datetime import datetime, time
 from django.core.exceptions import ValidationError
+from .locking import instructor_day_lock, room_day_lock
+import re
+import unicodedata
+
+INSTRUCTOR_KEY_LENGTH = 100
+
+
+def normalize_instructor(name):
+    """Key under which spellings like 'Dr. Smith' and 'dr smith' are one instructor"""
+    name = unicodedata.normalize('NFKD', name.casefold())
+    # Drop accents only; letters of every script stay, so distinct non-Latin names stay distinct
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    # Casefolding and NFKD can lengthen a name ('ß' -> 'ss', ligatures), past the column
+    return ' '.join(re.findall(r'\w+', name))[:INSTRUCTOR_KEY_LENGTH].rstrip()
 
 
 class Schedule(models.Model):
@@ -17,6 +31,7 @@ class Schedule(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     instructor = models.CharField(max_length=100, blank=True)
+    instructor_key = models.CharField(max_length=INSTRUCTOR_KEY_LENGTH, blank=True, editable=False)
     course_code = models.CharField(max_length=20, blank=True)
     date = models.DateField()
     start_time = models.TimeField()
@@ -29,25 +44,82 @@ class Schedule(models.Model):
     def __str__(self):
         return f"{self.title} - {self.room} ({self.date} {self.start_time}-{self.end_time})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The date as stored, so a save that moves the booking can also refresh what it left
+        instance.stored_date = instance.__dict__.get('date')
+        return instance
+
+    @classmethod
+    def find_instructor_overlap(cls, instructor, date, start_time, end_time, exclude_pk=None):
+        """Return the first active schedule of the instructor, in any room, overlapping the given slot"""
+        key = normalize_instructor(instructor)
+        if not key:
+            return None
+        overlapping = cls.objects.filter(
+            instructor_key=key,
+            date=date,
+            status__in=['scheduled', 'in_progress'],
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        )
+        if exclude_pk is not None:
+            overlapping = overlapping.exclude(pk=exclude_pk)
+        return overlapping.select_related('room').order_by('start_time').first()
+
+    @classmethod
+    def find_overlap(cls, room_id, date, start_time, end_time, exclude_pk=None):
+        """Return the first active schedule in the room overlapping the given slot, if any"""
+        overlapping = cls.objects.filter(
+            room_id=room_id,
+            date=date,
+            status__in=['scheduled', 'in_progress'],
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        )
+        if exclude_pk is not None:
+            overlapping = overlapping.exclude(pk=exclude_pk)
+        return overlapping.order_by('start_time').first()
+
     def clean(self):
         """Validate that end time is after start time and no overlapping schedules"""
         if self.end_time <= self.start_time:
             raise ValidationError("End time must be after start time.")
         
         # Check for overlapping schedules
-        overlapping = Schedule.objects.filter(
-            room=self.room,
-            date=self.date,
-            status__in=['scheduled', 'in_progress']
-        ).exclude(pk=self.pk)
-        
-        for schedule in overlapping:
-            if (self.start_time < schedule.end_time and self.end_time > schedule.start_time):
+        if self.status in ['scheduled', 'in_progress']:
+            schedule = Schedule.find_overlap(
+                self.room_id, self.date, self.start_time, self.end_time, exclude_pk=self.pk
+            )
+            if schedule:
                 raise ValidationError(f"This time slot overlaps with: {schedule.title}")
+            
+            schedule = Schedule.find_instructor_overlap(
+                self.instructor, self.date, self.start_time, self.end_time, exclude_pk=self.pk
+            )
+            if schedule:
+                raise ValidationError(
+                    f"{self.instructor} is already teaching {schedule.title} in {schedule.room} at this time"
+                )
 
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        self.instructor_key = normalize_instructor(self.instructor)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'instructor' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'instructor_key'}
+        # Re-check overlaps under the room/day lock, and the instructor/day
+        # lock, so concurrent bookings of the same slot, or of the same
+        # instructor in two rooms, cannot both pass validation
+        with room_day_lock(self.room_id, self.date):
+            if self.instructor_key and self.status in ['scheduled', 'in_progress']:
+                with instructor_day_lock(self.instructor_key, self.date):
+                    self.clean()
+                    super().save(*args, **kwargs)
+            else:
+                self.clean()
+                super().save(*args, **kwargs)
+        self.stored_date = self.date
 
     @property
     def is_current(self):
@@ -69,3 +141,36 @@ class Schedule(models.Model):
 
     class Meta:
         ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['room', 'date', 'start_time'], name='schedule_room_date_start_idx'),
+            models.Index(fields=['date', 'start_time'], name='schedule_date_start_idx'),
+            models.Index(fields=['instructor_key', 'date', 'start_time'], name='schedule_instructor_idx'),
+        ]
+
+
+class ArchivedSchedule(models.Model):
+    """Completed or cancelled schedule moved out of the live table by archive_schedules"""
+    id = models.BigIntegerField(primary_key=True)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='archived_schedules')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    instructor = models.CharField(max_length=100, blank=True)
+    course_code = models.CharField(max_length=20, blank=True)
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    status = models.CharField(max_length=20, choices=Schedule.STATUS_CHOICES)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.title} - {self.room} ({self.date} {self.start_time}-{self.end_time})"
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['room', 'date'], name='archived_room_date_idx'),
+            models.Index(fields=['date'], name='archived_date_idx'),
+        ]
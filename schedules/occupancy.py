@@ -0,0 +1,305 @@
+import bisect
+import logging
+import sys
+import threading
+import time
+from array import array
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import Schedule
+
+logger = logging.getLogger(__name__)
+
+# Days kept in memory around today; lookups outside fall back to the database
+PAST_DAYS = 1
+FUTURE_DAYS = 14
+ACTIVE_STATUSES = ['scheduled', 'in_progress']
+MINUTES_PER_DAY = 24 * 60
+
+SEQUENCE_KEY = 'occupancy:sequence'
+CHANGE_TIMEOUT = 60 * 10
+# How often a worker checks the shared sequence for other workers' changes
+CHECK_INTERVAL = 1.0
+# Further behind than this, reloading is cheaper than replaying
+MAX_REPLAY = 500
+RELOAD = 'reload'
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+class RoomIntervals:
+    """One room's bookings in the window as three parallel arrays sorted by start.
+
+    Times are minutes since the window's first midnight, so a single
+    bisect finds bookings across days.
+    """
+    __slots__ = ('starts', 'ends', 'ids')
+
+    def __init__(self):
+        self.starts = array('I')
+        self.ends = array('I')
+        self.ids = array('q')
+
+    def append(self, schedule_id, start, end):
+        """Add a booking that starts no earlier than every booking already held"""
+        self.starts.append(start)
+        self.ends.append(end)
+        self.ids.append(schedule_id)
+
+    def add(self, schedule_id, start, end):
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, schedule_id)
+
+    def remove(self, schedule_id):
+        try:
+            position = self.ids.index(schedule_id)
+        except ValueError:
+            return False
+        del self.starts[position]
+        del self.ends[position]
+        del self.ids[position]
+        return True
+
+    def current(self, minute):
+        """Id of the booking running at `minute`, or None"""
+        position = bisect.bisect_right(self.starts, minute)
+        # Bookings never span midnight, so only the last day's starts can still be running
+        while position > 0 and self.starts[position - 1] > minute - MINUTES_PER_DAY:
+            position -= 1
+            if self.ends[position] > minute:
+                return self.ids[position]
+        return None
+
+    def next(self, minute, until):
+        """Id of the first booking starting after `minute` and before `until`, or None"""
+        position = bisect.bisect_right(self.starts, minute)
+        if position < len(self.starts) and self.starts[position] < until:
+            return self.ids[position]
+        return None
+
+    def between(self, first, last):
+        """(start, end, id) of the bookings starting in [first, last)"""
+        low = bisect.bisect_left(self.starts, first)
+        high = bisect.bisect_left(self.starts, last)
+        return list(zip(self.starts[low:high], self.ends[low:high], self.ids[low:high]))
+
+    def size(self):
+        return sys.getsizeof(self) + sum(sys.getsizeof(values) for values in (self.starts, self.ends, self.ids))
+
+
+def build_rooms(rows, first_day):
+    """RoomIntervals per room id from (id, room id, date, start, end) rows sorted by room, date and start"""
+    rooms = {}
+    for schedule_id, room_id, day, start_time, end_time in rows:
+        intervals = rooms.get(room_id)
+        if intervals is None:
+            intervals = rooms[room_id] = RoomIntervals()
+        offset = (day - first_day).days * MINUTES_PER_DAY
+        intervals.append(schedule_id, offset + to_minutes(start_time), offset + to_minutes(end_time))
+    return rooms
+
+
+def enabled():
+    return getattr(settings, 'OCCUPANCY_INDEX_ENABLED', True)
+
+
+def current_sequence():
+    sequence = cache.get(SEQUENCE_KEY)
+    if sequence is None:
+        # Start above any value an evicted counter may have reached, so
+        # workers notice the gap and reload
+        cache.add(SEQUENCE_KEY, int(time.time() * 1000), None)
+        sequence = cache.get(SEQUENCE_KEY, 0)
+    return sequence
+
+
+def change_key(sequence):
+    return f'occupancy:change:{sequence}'
+
+
+class OccupancyIndex:
+    """Which bookings occupy each room, for a rolling window of days.
+
+    Loaded with one query on first use, then kept current by replaying
+    the changes every worker publishes (see publish_change) under a shared
+    sequence number. Lookups return None for days outside the window, or
+    before the index could be loaded; callers then ask the database.
+    """
+
+    def __init__(self):
+        self.rooms = {}
+        self.first_day = None
+        self.last_day = None
+        self.sequence = None
+        self.checked_at = 0
+        self.loaded_in = None
+        self.lock = threading.RLock()
+
+    def window(self, today):
+        return today - timedelta(days=PAST_DAYS), today + timedelta(days=FUTURE_DAYS)
+
+    def load(self, today=None):
+        """Replace the index with the window around `today`, from one query"""
+        started = time.monotonic()
+        sequence = current_sequence()
+        first_day, last_day = self.window(today or date.today())
+        rows = Schedule.objects.filter(
+            date__range=[first_day, last_day],
+            status__in=ACTIVE_STATUSES
+        ).order_by('room_id', 'date', 'start_time').values_list('id', 'room_id', 'date', 'start_time', 'end_time')
+
+        rooms = build_rooms(rows.iterator(chunk_size=5000), first_day)
+
+        with self.lock:
+            self.rooms = rooms
+            self.first_day = first_day
+            self.last_day = last_day
+            self.sequence = sequence
+            self.checked_at = time.monotonic()
+            self.loaded_in = time.monotonic() - started
+
+    def refresh(self):
+        """Load on first use and on a new day, and replay other workers' changes"""
+        today = date.today()
+        if self.first_day == self.window(today)[0] and time.monotonic() - self.checked_at < CHECK_INTERVAL:
+            return
+        with self.lock:
+            if self.first_day != self.window(today)[0]:
+                self.load(today)
+                return
+            self.checked_at = time.monotonic()
+            sequence = current_sequence()
+            if sequence == self.sequence:
+                return
+            # A re-seeded sequence (evicted key) jumps far ahead or back: reload without building keys
+            if not 0 < sequence - self.sequence <= MAX_REPLAY:
+                self.load(today)
+                return
+            keys = [change_key(number) for number in range(self.sequence + 1, sequence + 1)]
+            changes = cache.get_many(keys)
+            if len(changes) != len(keys) or RELOAD in changes.values():
+                self.load(today)
+                return
+            for key in keys:
+                self.apply(changes[key])
+            self.sequence = sequence
+
+    def apply(self, change):
+        schedule_id, room_id, day, start, end = change
+        # The booking may have moved room: look in its new room first
+        intervals = self.rooms.get(room_id)
+        if intervals is None or not intervals.remove(schedule_id):
+            for intervals in self.rooms.values():
+                if intervals.remove(schedule_id):
+                    break
+        if day is None:
+            return
+        day = date.fromordinal(day)
+        if self.first_day <= day <= self.last_day:
+            offset = (day - self.first_day).days * MINUTES_PER_DAY
+            self.rooms.setdefault(room_id, RoomIntervals()).add(schedule_id, offset + start, offset + end)
+
+    def ready(self, day):
+        """Bring the index up to date; False if `day` cannot be answered from it"""
+        if not enabled():
+            return False
+        try:
+            self.refresh()
+        # Cache backends share no error base (redis.exceptions.ConnectionError,
+        # OSError, ...); any failure falls back to the database
+        except Exception:
+            logger.exception('Loading the occupancy index failed')
+            return False
+        return self.first_day <= day <= self.last_day
+
+    def minute_of(self, moment):
+        return (moment.date() - self.first_day).days * MINUTES_PER_DAY + to_minutes(moment)
+
+    def room_status(self, room_id, moment):
+        """(current booking id, next booking id later that day) for a room at a datetime"""
+        if not self.ready(moment.date()):
+            return None
+        minute = self.minute_of(moment)
+        end_of_day = minute - minute % MINUTES_PER_DAY + MINUTES_PER_DAY
+        with self.lock:
+            intervals = self.rooms.get(room_id)
+            if intervals is None:
+                return None, None
+            return intervals.current(minute), intervals.next(minute, end_of_day)
+
+    def day_bookings(self, room_id, day):
+        """(start minute, end minute, id) of a room's bookings on a day, in start order"""
+        if not self.ready(day):
+            return None
+        offset = (day - self.first_day).days * MINUTES_PER_DAY
+        with self.lock:
+            intervals = self.rooms.get(room_id)
+            if intervals is None:
+                return []
+            return [
+                (start - offset, end - offset, schedule_id)
+                for start, end, schedule_id in intervals.between(offset, offset + MINUTES_PER_DAY)
+            ]
+
+    def memory_report(self):
+        """Bytes held by the index, in total and projected per 1,000 rooms"""
+        with self.lock:
+            rooms = len(self.rooms)
+            bookings = sum(len(intervals.ids) for intervals in self.rooms.values())
+            total = sys.getsizeof(self.rooms) + sum(intervals.size() for intervals in self.rooms.values())
+        return {
+            'first_day': self.first_day.isoformat() if self.first_day else None,
+            'days': PAST_DAYS + FUTURE_DAYS + 1,
+            'rooms': rooms,
+            'bookings': bookings,
+            'bytes': total,
+            'bytes_per_1000_rooms': round(total / rooms * 1000) if rooms else 0,
+            'bytes_per_booking': round(total / bookings, 1) if bookings else 0,
+            'sequence': self.sequence,
+            'load_seconds': round(self.loaded_in, 4) if self.loaded_in is not None else None,
+        }
+
+
+index = OccupancyIndex()
+
+
+def booking_change(schedule, deleted=False):
+    """The change record workers replay for a saved or deleted booking"""
+    if deleted or schedule.status not in ACTIVE_STATUSES:
+        return (schedule.pk, schedule.room_id, None, None, None)
+    return (
+        schedule.pk, schedule.room_id, schedule.date.toordinal(),
+        to_minutes(schedule.start_time), to_minutes(schedule.end_time)
+    )
+
+
+def publish_change(change=RELOAD):
+    """Announce a booking change, or with no argument a bulk change, to every worker.
+
+    Runs after the booking committed, so a cache outage is logged rather
+    than raised; workers that cannot reach the cache ask the database.
+    """
+    # Numbering needs an atomic incr (Redis, Memcached); production settings
+    # keep the index off on caches without one
+    if not enabled():
+        return
+    try:
+        try:
+            sequence = cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            current_sequence()
+            sequence = cache.incr(SEQUENCE_KEY)
+        cache.set(change_key(sequence), change, CHANGE_TIMEOUT)
+    except Exception:
+        logger.exception('Publishing an occupancy change failed')
+        # At least this worker reloads on its next lookup
+        index.first_day = None
+        return
+    # This worker sees its own change on its next lookup
+    index.checked_at = 0
@@ -0,0 +1,207 @@
+import hashlib
+import json
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import lru_cache
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from PIL import Image, ImageDraw, ImageFont
+from rooms.models import Room, qr_code_png
+from .alternatives import DAY_END, DAY_START
+from .models import Schedule
+
+POSTER_FORMATS = {
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+}
+# A4 portrait at 150 dpi
+PAGE_SIZE = (1240, 1754)
+DPI = 150
+MARGIN = 70
+QR_SIZE = 280
+GRID_TOP = 470
+TIME_COLUMN = 90
+# Cancelled bookings are left off the door
+POSTER_STATUSES = ['scheduled', 'in_progress', 'completed']
+WEEKDAYS = 5
+
+
+def poster_week(day=None):
+    """Monday of the week a poster covers"""
+    day = day or date.today()
+    return day - timedelta(days=day.weekday())
+
+
+def poster_rooms(room_ids=None):
+    """Active rooms as the plain dicts poster_content reads, from one query"""
+    rooms = Room.objects.filter(is_active=True)
+    if room_ids is not None:
+        rooms = rooms.filter(pk__in=room_ids)
+    return list(rooms.order_by('building', 'floor', 'number').values(
+        'id', 'name', 'number', 'building', 'floor', 'capacity', 'qr_code', 'department__name'
+    ))
+
+
+def week_bookings(monday, room_ids=None):
+    """Every room's bookings for a week from one query, grouped by room id"""
+    schedules = Schedule.objects.filter(
+        date__range=[monday, monday + timedelta(days=6)],
+        status__in=POSTER_STATUSES,
+        room__is_active=True
+    )
+    if room_ids is not None:
+        schedules = schedules.filter(room_id__in=room_ids)
+    bookings = defaultdict(list)
+    for row in schedules.order_by('room_id', 'date', 'start_time').values(
+        'room_id', 'title', 'course_code', 'instructor', 'date', 'start_time', 'end_time'
+    ):
+        bookings[row.pop('room_id')].append(row)
+    return bookings
+
+
+def poster_content(room, monday, bookings):
+    """Everything drawn on a room's poster, as JSON-ready data"""
+    return {
+        'room': {
+            'id': room['id'],
+            'name': room['name'],
+            'number': room['number'],
+            'building': room['building'],
+            'floor': room['floor'],
+            'capacity': room['capacity'],
+            'department': room['department__name'],
+        },
+        'qr_code': room['qr_code'],
+        'week': monday.isoformat(),
+        'bookings': [
+            {
+                'title': booking['title'],
+                'course_code': booking['course_code'],
+                'instructor': booking['instructor'],
+                'weekday': booking['date'].weekday(),
+                'start_time': booking['start_time'].strftime('%H:%M'),
+                'end_time': booking['end_time'].strftime('%H:%M'),
+            }
+            for booking in bookings
+        ],
+    }
+
+
+def poster_hash(content):
+    """Posters are only re-rendered when this changes"""
+    source = json.dumps(content, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def room_qr_png(room):
+    """The room's stored QR image, rendered in memory if it has none yet"""
+    if room['qr_code']:
+        try:
+            with default_storage.open(room['qr_code']) as qr_file:
+                return qr_file.read()
+        except OSError:
+            pass
+    return qr_code_png(room['id'])
+
+
+@lru_cache(maxsize=None)
+def font(size):
+    return ImageFont.load_default(size)
+
+
+def fit_text(draw, text, size, width):
+    """Shorten text with an ellipsis until it fits in `width` pixels"""
+    if draw.textlength(text, font=font(size)) <= width:
+        return text
+    while text and draw.textlength(text + '…', font=font(size)) > width:
+        text = text[:-1]
+    return text + '…' if text else ''
+
+
+def minutes(value):
+    hours, mins = value.split(':')
+    return int(hours) * 60 + int(mins)
+
+
+def render_poster(content, qr_png, image_format):
+    """Draw a poster and return it as PDF or PNG bytes.
+
+    Touches neither the database nor Django settings, so it can run in a
+    process pool.
+    """
+    image = Image.new('RGB', PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(image)
+    width, height = PAGE_SIZE
+    room = content['room']
+    monday = date.fromisoformat(content['week'])
+
+    # Header: room details on the left, QR code on the right
+    text_width = width - 2 * MARGIN - QR_SIZE - 30
+    draw.text((MARGIN, MARGIN), fit_text(draw, room['name'], 64, text_width), font=font(64), fill='black')
+    draw.text((MARGIN, MARGIN + 90), fit_text(draw, f"Room {room['number']}", 40, text_width), font=font(40), fill='black')
+    location = f"{room['building']}, floor {room['floor']}" if room['building'] else f"Floor {room['floor']}"
+    details = [location, room['department'], f"{room['capacity']} seats"]
+    for line, text in enumerate(details):
+        draw.text((MARGIN, MARGIN + 160 + 40 * line), fit_text(draw, text, 28, text_width), font=font(28), fill='#444444')
+    qr = Image.open(BytesIO(qr_png)).convert('RGB').resize((QR_SIZE, QR_SIZE), Image.NEAREST)
+    image.paste(qr, (width - MARGIN - QR_SIZE, MARGIN - 20))
+    draw.text((width - MARGIN - QR_SIZE // 2, MARGIN + QR_SIZE - 10), 'Scan for the live schedule',
+              font=font(20), fill='black', anchor='ma')
+
+    sunday = monday + timedelta(days=6)
+    draw.text((MARGIN, GRID_TOP - 70), f"Week of {monday:%d %b} - {sunday:%d %b %Y}", font=font(32), fill='black')
+
+    # Weekly grid: weekdays always, weekend days only when booked
+    days = list(range(WEEKDAYS)) + sorted({
+        booking['weekday'] for booking in content['bookings'] if booking['weekday'] >= WEEKDAYS
+    })
+    first, last = DAY_START.hour * 60, DAY_END.hour * 60
+    grid_left, grid_right, grid_bottom = MARGIN + TIME_COLUMN, width - MARGIN, height - MARGIN - 40
+    column = (grid_right - grid_left) / len(days)
+    per_minute = (grid_bottom - GRID_TOP - 40) / (last - first)
+
+    def y_at(value):
+        return GRID_TOP + 40 + (min(max(value, first), last) - first) * per_minute
+
+    for index, weekday in enumerate(days):
+        x = grid_left + index * column
+        draw.text((x + column / 2, GRID_TOP), f"{monday + timedelta(days=weekday):%a %d}",
+                  font=font(24), fill='black', anchor='ma')
+        draw.line([(x, GRID_TOP + 40), (x, grid_bottom)], fill='#bbbbbb')
+    for hour in range(DAY_START.hour, DAY_END.hour + 1):
+        y = y_at(hour * 60)
+        draw.line([(grid_left, y), (grid_right, y)], fill='#dddddd')
+        draw.text((grid_left - 12, y), f'{hour:02d}:00', font=font(20), fill='#444444', anchor='rm')
+    draw.rectangle([grid_left, GRID_TOP + 40, grid_right, grid_bottom], outline='black', width=2)
+
+    for booking in content['bookings']:
+        index = days.index(booking['weekday'])
+        top, bottom = y_at(minutes(booking['start_time'])), y_at(minutes(booking['end_time']))
+        if bottom <= top:
+            continue
+        left, right = grid_left + index * column + 4, grid_left + (index + 1) * column - 4
+        draw.rectangle([left, top + 1, right, bottom - 1], fill='#e6eef8', outline='#3366aa', width=2)
+        lines = [
+            (f"{booking['start_time']}-{booking['end_time']}", 18),
+            (booking['course_code'] or booking['title'], 20),
+            (booking['title'] if booking['course_code'] else booking['instructor'], 18),
+            (booking['instructor'] if booking['course_code'] else '', 18),
+        ]
+        y = top + 6
+        for text, size in lines:
+            if not text or y + size > bottom - 4:
+                continue
+            draw.text((left + 6, y), fit_text(draw, text, size, right - left - 12), font=font(size), fill='black')
+            y += size + 4
+
+    draw.text((MARGIN, height - MARGIN), 'Bookings can change during the week; the QR code always shows the current schedule.',
+              font=font(20), fill='#444444')
+
+    buffer = BytesIO()
+    if image_format == 'pdf':
+        image.save(buffer, format='PDF', resolution=DPI)
+    else:
+        image.save(buffer, format='PNG', dpi=(DPI, DPI))
+    return buffer.getvalue()
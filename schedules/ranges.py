@@ -0,0 +1,190 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, DateField, F, TimeField, Value, When
+from django.utils import timezone
+from rooms.response_cache import bump_data_version
+from .analytics import invalidate_week
+from .kiosk import invalidate_boards
+from .locking import room_days_lock
+from .models import Schedule
+from .occupancy import publish_change, to_minutes
+
+ACTIVE_STATUSES = ['scheduled', 'in_progress']
+MINUTES_PER_DAY = 24 * 60
+MAX_CONFLICTS = 50
+# A year either way; far larger shifts overflow the date type
+MAX_SHIFT_DAYS = 366
+FIELDS = ['id', 'title', 'instructor_key', 'room_id', 'date', 'start_time', 'end_time', 'status']
+# Reported in the diff, under their API names
+DIFF_FIELDS = {'room_id': 'room', 'date': 'date', 'start_time': 'start_time', 'end_time': 'end_time', 'status': 'status'}
+
+
+class RangeConflict(Exception):
+    """The changed bookings would overlap others; nothing was changed"""
+
+    def __init__(self, conflicts):
+        super().__init__(f'{len(conflicts)} conflicts')
+        self.conflicts = conflicts
+
+
+def select_range(room_ids, start_date, end_date, start_time=None, end_time=None):
+    """Active bookings in the rooms between two dates, optionally only those overlapping a time window"""
+    schedules = Schedule.objects.filter(
+        room_id__in=room_ids,
+        date__range=[start_date, end_date],
+        status__in=ACTIVE_STATUSES
+    )
+    if start_time is not None:
+        schedules = schedules.filter(end_time__gt=start_time)
+    if end_time is not None:
+        schedules = schedules.filter(start_time__lt=end_time)
+    return schedules
+
+
+def bookings_changed(days):
+    """Drop what Schedule's signals would have, after a set-based UPDATE of bookings on `days`"""
+    for monday in {day - timedelta(days=day.weekday()) for day in days}:
+        invalidate_week(monday)
+    if timezone.localdate() in days:
+        invalidate_boards()
+    bump_data_version()
+    # Other workers reload their occupancy index rather than replay each row
+    publish_change()
+
+
+def shifted_time(value, minutes):
+    """`value` moved by `minutes`, or None if that leaves the day"""
+    total = to_minutes(value) + minutes
+    if not 0 <= total < MINUTES_PER_DAY:
+        return None
+    return value.replace(hour=total // 60, minute=total % 60)
+
+
+def find_conflicts(targets):
+    """Overlaps of the bookings' new slots with other bookings, from one query.
+
+    `targets` maps booking id to its row with the new room, date and
+    times. Overlaps are found by sorting each room's (and instructor's)
+    day once, so checking a thousand moved bookings costs one SELECT.
+    """
+    rooms = {target['room_id'] for target in targets.values()}
+    days = {target['date'] for target in targets.values()}
+    keys = {target['instructor_key'] for target in targets.values() if target['instructor_key']}
+    others = Schedule.objects.filter(date__in=days, status__in=ACTIVE_STATUSES)
+    others = others.filter(room_id__in=rooms) | others.filter(instructor_key__in=keys)
+    # The changed bookings are checked at their new slots, not their old ones
+    rows = [row for row in others.values(*FIELDS) if row['id'] not in targets]
+    rows.extend(target for target in targets.values() if target['status'] in ACTIVE_STATUSES)
+
+    conflicts = []
+    for reason, group_key in [('room', 'room_id'), ('instructor', 'instructor_key')]:
+        groups = defaultdict(list)
+        for row in rows:
+            if row[group_key] and (reason == 'room' or row['instructor_key'] in keys):
+                groups[(row[group_key], row['date'])].append(row)
+        for day_rows in groups.values():
+            day_rows.sort(key=lambda row: (row['start_time'], row['end_time']))
+            # The booking ending last so far: anything starting before it ends overlaps it
+            latest = None
+            for row in day_rows:
+                if latest is not None and row['start_time'] < latest['end_time']:
+                    if row['id'] in targets or latest['id'] in targets:
+                        target, other = (row, latest) if row['id'] in targets else (latest, row)
+                        conflicts.append({
+                            'id': target['id'], 'conflicts_with': other['id'], 'reason': reason,
+                            'title': other['title'], 'date': other['date'],
+                            'start_time': other['start_time'], 'end_time': other['end_time'],
+                        })
+                if latest is None or row['end_time'] > latest['end_time']:
+                    latest = row
+    return conflicts
+
+
+def change_range(selection, status=None, room_id=None, days=0, minutes=0, dry_run=False):
+    """Cancel, move or shift every booking in `selection` with one UPDATE.
+
+    New slots are checked against every other booking of the target
+    rooms and instructors in one query, under the booking locks of all
+    source and target room/days, and the UPDATE runs in the same
+    transaction. Returns a summary with each booking's changed fields;
+    raises RangeConflict or ValueError without changing anything.
+    """
+    with transaction.atomic():
+        rows = list(selection.order_by('date', 'start_time', 'id').values(*FIELDS))
+        targets = {}
+        for row in rows:
+            target = dict(row, date=row['date'] + timedelta(days=days))
+            if status is not None:
+                target['status'] = status
+            if room_id is not None:
+                target['room_id'] = room_id
+            if minutes:
+                target['start_time'] = shifted_time(row['start_time'], minutes)
+                target['end_time'] = shifted_time(row['end_time'], minutes)
+                if target['start_time'] is None or target['end_time'] is None:
+                    raise ValueError(f"Shifting '{row['title']}' on {row['date']} by {minutes} minutes leaves its day")
+            targets[row['id']] = target
+
+        pairs = {(row['room_id'], row['date']) for row in rows}
+        pairs |= {(target['room_id'], target['date']) for target in targets.values()}
+        with room_days_lock(pairs):
+            # Cancelling frees slots, so it cannot conflict
+            if status is None and targets:
+                conflicts = find_conflicts(targets)
+                if conflicts:
+                    raise RangeConflict(conflicts[:MAX_CONFLICTS])
+
+            updated = 0
+            if targets and not dry_run:
+                # Only the rows checked above: a booking added to the selection meanwhile was not
+                updated = Schedule.objects.filter(pk__in=targets).update(
+                    **range_updates(rows, status, room_id, days, minutes)
+                )
+                touched = {day for _, day in pairs}
+                transaction.on_commit(lambda: bookings_changed(touched))
+
+    changes = []
+    for row in rows:
+        target = targets[row['id']]
+        changed = {
+            name: {'before': row[field], 'after': target[field]}
+            for field, name in DIFF_FIELDS.items() if row[field] != target[field]
+        }
+        changes.append({'id': row['id'], 'title': row['title'], 'changes': changed})
+    return {
+        'matched': len(rows),
+        'updated': updated,
+        'dry_run': dry_run,
+        'rooms': sorted({row['room_id'] for row in rows}),
+        'first_date': rows[0]['date'] if rows else None,
+        'last_date': rows[-1]['date'] if rows else None,
+        'schedules': changes,
+    }
+
+
+def range_updates(rows, status, room_id, days, minutes):
+    """UPDATE assignments for the change; shifts map each distinct old value to its new one.
+
+    SQLite cannot add intervals to times, so instead of `F() + timedelta`
+    the statement carries a CASE over the distinct dates and times, which
+    stays small however many rows it updates.
+    """
+    updates = {'updated_at': timezone.now()}
+    if status is not None:
+        updates['status'] = status
+    if room_id is not None:
+        updates['room_id'] = room_id
+    if days:
+        updates['date'] = Case(
+            *[When(date=day, then=Value(day + timedelta(days=days))) for day in {row['date'] for row in rows}],
+            default=F('date'), output_field=DateField()
+        )
+    if minutes:
+        for field in ['start_time', 'end_time']:
+            updates[field] = Case(
+                *[When(**{field: value}, then=Value(shifted_time(value, minutes))) for value in {row[field] for row in rows}],
+                default=F(field), output_field=TimeField()
+            )
+    return updates
@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from .locking import room_days_lock
+from .models import ArchivedSchedule, Schedule, normalize_instructor
+from .ranges import FIELDS, MAX_CONFLICTS, bookings_changed, find_conflicts
+
+ROLLOVER_CHUNK_SIZE = 1000
+# Cancelled bookings are not part of the timetable to repeat
+ROLLOVER_STATUSES = ['scheduled', 'in_progress', 'completed']
+COPIED_COLUMNS = ['room_id', 'title', 'description', 'instructor', 'instructor_key', 'course_code',
+                  'start_time', 'end_time', 'created_by_id']
+# The archive has no instructor_key; it is worked out from the name
+ARCHIVED_FIELDS = [field for field in FIELDS if field != 'instructor_key'] + [
+    'instructor', 'description', 'course_code', 'created_by_id'
+]
+
+
+def term_offset(from_start, to_start):
+    """Days between the weeks of the two term starts, so copies keep their weekday"""
+    from_monday = from_start - timedelta(days=from_start.weekday())
+    to_monday = to_start - timedelta(days=to_start.weekday())
+    return (to_monday - from_monday).days
+
+
+def is_duplicate(target, conflict):
+    """Whether the booking in the way is the copy itself, from an earlier rollover"""
+    return conflict['reason'] == 'room' and (conflict['title'], conflict['start_time'], conflict['end_time']) == (
+        target['title'], target['start_time'], target['end_time']
+    )
+
+
+def rollover_schedules(from_start, from_end, to_start, to_end, skip_dates=(), room_ids=None,
+                       dry_run=False, chunk_size=ROLLOVER_CHUNK_SIZE):
+    """Copy a term's bookings into another term, week by week.
+
+    Each booking lands on the same weekday in the same week of the new
+    term. Copies falling outside the new term or on `skip_dates` (e.g.
+    holidays) are skipped, and so are copies already made by an earlier
+    run. The rest are checked against the new term's bookings in one
+    query and sorted sweep; conflicting copies are left out and reported.
+    The others are written with one INSERT ... SELECT per chunk, as new
+    'scheduled' bookings. A term already moved out by archive_schedules
+    is read from the archive, and its copies are bulk-inserted instead.
+    Returns counts and the first conflicts.
+    """
+    if from_end < from_start or to_end < to_start:
+        raise ValueError('Each range must end on or after its start')
+    if from_start <= to_end and to_start <= from_end:
+        raise ValueError('The source and target ranges must not overlap')
+    offset = term_offset(from_start, to_start)
+    skip_dates = set(skip_dates)
+
+    sources = Schedule.objects.filter(date__range=[from_start, from_end], status__in=ROLLOVER_STATUSES)
+    archived_sources = ArchivedSchedule.objects.filter(date__range=[from_start, from_end], status__in=ROLLOVER_STATUSES)
+    if room_ids is not None:
+        sources = sources.filter(room_id__in=room_ids)
+        archived_sources = archived_sources.filter(room_id__in=room_ids)
+
+    using = router.db_for_write(Schedule)
+    with transaction.atomic(using=using):
+        rows = list(sources.values(*FIELDS))
+        # Archived rows keep their live ids, so they cannot clash with live ones
+        archived = {row['id']: row for row in archived_sources.values(*ARCHIVED_FIELDS)}
+        for row in archived.values():
+            row['instructor_key'] = normalize_instructor(row['instructor'])
+        rows.extend(archived.values())
+        rows.sort(key=lambda row: (row['date'], row['start_time'], row['id']))
+        # Keyed by source id: the ranges do not overlap, so no target-range row shares one
+        targets = {}
+        for row in rows:
+            day = row['date'] + timedelta(days=offset)
+            if to_start <= day <= to_end and day not in skip_dates:
+                targets[row['id']] = dict(row, date=day, status='scheduled')
+        skipped = len(rows) - len(targets)
+
+        with room_days_lock({(target['room_id'], target['date']) for target in targets.values()}, using=using):
+            conflicts = []
+            duplicates = set()
+            for conflict in find_conflicts(targets) if targets else []:
+                if is_duplicate(targets[conflict['id']], conflict):
+                    duplicates.add(conflict['id'])
+                else:
+                    conflicts.append(conflict)
+            conflicted = {conflict['id'] for conflict in conflicts} - duplicates
+            skipped += len(duplicates)
+            copies = [source_id for source_id in targets if source_id not in duplicates | conflicted]
+
+            if copies and not dry_run:
+                new_days = {row['date']: row['date'] + timedelta(days=offset) for row in rows}
+                live_copies = [source_id for source_id in copies if source_id not in archived]
+                if live_copies:
+                    copy_schedules(live_copies, new_days, using, chunk_size)
+                Schedule.objects.using(using).bulk_create([
+                    Schedule(
+                        **{field: archived[source_id][field] for field in COPIED_COLUMNS},
+                        date=targets[source_id]['date'], status='scheduled'
+                    )
+                    for source_id in copies if source_id in archived
+                ], batch_size=chunk_size)
+                days = {targets[source_id]['date'] for source_id in copies}
+                transaction.on_commit(lambda: bookings_changed(days), using=using)
+
+    return {
+        'matched': len(rows),
+        'created': len(copies),
+        'skipped': skipped,
+        'conflicted': len(conflicted),
+        'dry_run': dry_run,
+        'offset_days': offset,
+        'conflicts': [conflict for conflict in conflicts if conflict['id'] in conflicted][:MAX_CONFLICTS],
+    }
+
+
+def copy_schedules(source_ids, new_days, using, chunk_size=ROLLOVER_CHUNK_SIZE):
+    """INSERT ... SELECT copies of the bookings, moved to `new_days[date]`, in chunks.
+
+    SQLite and PostgreSQL add days to dates differently, so the new date
+    is a CASE over the distinct old dates, as in range updates.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    column_list = ', '.join(quote(column) for column in COPIED_COLUMNS)
+    day_cases = ' '.join(['WHEN %s THEN %s'] * len(new_days))
+    day_params = [
+        connection.ops.adapt_datefield_value(day) for old, new in new_days.items() for day in (old, new)
+    ]
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        for start in range(0, len(source_ids), chunk_size):
+            chunk = source_ids[start:start + chunk_size]
+            cursor.execute(
+                f"INSERT INTO {quote(Schedule._meta.db_table)} "
+                f"({column_list}, {quote('date')}, {quote('status')}, {quote('created_at')}, {quote('updated_at')}) "
+                f"SELECT {column_list}, CASE {quote('date')} {day_cases} END, %s, %s, %s "
+                f"FROM {quote(Schedule._meta.db_table)} WHERE {quote('id')} IN ({', '.join(['%s'] * len(chunk))})",
+                [*day_params, 'scheduled', now, now, *chunk]
+            )
@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import Schedule
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .models import ArchivedSchedule, Schedule
+from .alternatives import suggest_alternatives
+from .ranges import MAX_SHIFT_DAYS
 from rooms.models import Room
 
 
@@ -28,7 +31,25 @@ class ScheduleSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class ArchivedScheduleSerializer(serializers.ModelSerializer):
+    room_name = serializers.CharField(source='room.name', read_only=True)
+    room_number = serializers.CharField(source='room.number', read_only=True)
+
+    class Meta:
+        model = ArchivedSchedule
+        fields = [
+            'id', 'room', 'room_name', 'room_number', 'title', 'description',
+            'instructor', 'course_code', 'date', 'start_time', 'end_time',
+            'status', 'created_at', 'updated_at', 'archived_at'
+        ]
+        read_only_fields = fields
+
+
 class ScheduleCreateSerializer(serializers.ModelSerializer):
+    # Free slots and rooms offered when the requested room is taken; the
+    # view adds them to the error response
+    conflict_alternatives = None
+
     class Meta:
         model = Schedule
         fields = [
@@ -38,30 +59,119 @@ class ScheduleCreateSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         """Validate schedule data"""
-        if data['end_time'] <= data['start_time']:
+        # Partial updates (PATCH) are checked against the booking's saved values
+        values = dict(data)
+        if self.instance is not None:
+            for field in ['room', 'date', 'start_time', 'end_time', 'status', 'instructor']:
+                values.setdefault(field, getattr(self.instance, field))
+
+        if values['end_time'] <= values['start_time']:
             raise serializers.ValidationError("End time must be after start time.")
         
-        # Check for overlapping schedules
-        room = data['room']
-        date = data['date']
-        start_time = data['start_time']
-        end_time = data['end_time']
-        
-        overlapping = Schedule.objects.filter(
-            room=room,
-            date=date,
-            status__in=['scheduled', 'in_progress']
-        )
-        
-        # If updating, exclude current instance
-        if self.instance:
-            overlapping = overlapping.exclude(pk=self.instance.pk)
-        
-        for schedule in overlapping:
-            if (start_time < schedule.end_time and end_time > schedule.start_time):
+        # Check for overlapping schedules. This is a fast pre-check; the
+        # authoritative check runs again under the room/day lock in Schedule.save()
+        if values.get('status', 'scheduled') in ['scheduled', 'in_progress']:
+            schedule = Schedule.find_overlap(
+                values['room'].pk, values['date'], values['start_time'], values['end_time'],
+                exclude_pk=self.instance.pk if self.instance else None
+            )
+            if schedule:
+                self.conflict_alternatives = suggest_alternatives(
+                    values['room'], values['date'], values['start_time'], values['end_time'],
+                    exclude_pk=self.instance.pk if self.instance else None
+                )
                 raise serializers.ValidationError(
                     f"This time slot overlaps with: {schedule.title} "
                     f"({schedule.start_time}-{schedule.end_time})"
                 )
+            
+            schedule = Schedule.find_instructor_overlap(
+                values.get('instructor', ''), values['date'], values['start_time'], values['end_time'],
+                exclude_pk=self.instance.pk if self.instance else None
+            )
+            if schedule:
+                raise serializers.ValidationError(
+                    f"{values['instructor']} is already teaching {schedule.title} in {schedule.room} "
+                    f"({schedule.start_time}-{schedule.end_time})"
+                )
         
         return data
+
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as e:
+            # Lost the race for this slot to a concurrent booking
+            raise serializers.ValidationError(e.messages)
+
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+
+
+class AssignmentSessionSerializer(serializers.Serializer):
+    """A course session waiting for a room, as accepted by the room assignment solver"""
+    title = serializers.CharField(max_length=200)
+    course_code = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
+    instructor = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    enrollment = serializers.IntegerField(min_value=1)
+    room_type = serializers.ChoiceField(choices=Room.ROOM_TYPES, required=False, allow_blank=True, default='')
+    equipment = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    # Preferred department id; a plain integer so large batches need no lookups
+    department = serializers.IntegerField(required=False, allow_null=True, default=None)
+    building = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+    def validate(self, data):
+        if data['end_time'] <= data['start_time']:
+            raise serializers.ValidationError("End time must be after start time.")
+        return data
+
+
+class RangeSelectionSerializer(serializers.Serializer):
+    """The active bookings a range operation changes: in the rooms, between two dates"""
+    rooms = serializers.ListField(child=serializers.IntegerField(), min_length=1)
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    # Only bookings overlapping this time of day, e.g. for an afternoon closure
+    start_time = serializers.TimeField(required=False, allow_null=True, default=None)
+    end_time = serializers.TimeField(required=False, allow_null=True, default=None)
+    dry_run = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("End date must not be before start date.")
+        if data['start_time'] and data['end_time'] and data['end_time'] <= data['start_time']:
+            raise serializers.ValidationError("End time must be after start time.")
+        return data
+
+
+class RangeShiftSerializer(RangeSelectionSerializer):
+    days = serializers.IntegerField(required=False, default=0, min_value=-MAX_SHIFT_DAYS, max_value=MAX_SHIFT_DAYS)
+    # Bookings stay on their (shifted) day, so less than a day either way
+    minutes = serializers.IntegerField(required=False, default=0, min_value=-24 * 60 + 1, max_value=24 * 60 - 1)
+
+    def validate(self, data):
+        data = super().validate(data)
+        if not data['days'] and not data['minutes']:
+            raise serializers.ValidationError("Shift by at least one day or minute.")
+        return data
+
+
+class RangeMoveSerializer(RangeSelectionSerializer):
+    target_room = serializers.PrimaryKeyRelatedField(queryset=Room.objects.filter(is_active=True))
+
+
+class RolloverSerializer(serializers.Serializer):
+    """A term to copy and the term to copy it into"""
+    from_start = serializers.DateField()
+    from_end = serializers.DateField()
+    to_start = serializers.DateField()
+    to_end = serializers.DateField()
+    skip_dates = serializers.ListField(child=serializers.DateField(), required=False, default=list)
+    rooms = serializers.ListField(child=serializers.IntegerField(), required=False, allow_null=True, default=None)
+    dry_run = serializers.BooleanField(required=False, default=False)
@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rooms.models import Department, Room
+from rooms.response_cache import bump_data_version
+from .analytics import invalidate_week
+from .kiosk import invalidate_boards
+from .models import Schedule
+from .occupancy import booking_change, enabled, publish_change
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def invalidate_utilization(sender, instance, **kwargs):
+    """Edits to past weeks must not be hidden by their cached utilization counts"""
+    invalidate_week(instance.date)
+    # A booking moved to another week also changes the week it left
+    stored_date = getattr(instance, 'stored_date', None)
+    if stored_date is not None and stored_date != instance.date:
+        invalidate_week(stored_date)
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def invalidate_kiosk_boards(sender, instance, **kwargs):
+    """Kiosk boards only show today, so only today's changes make them stale"""
+    if timezone.localdate() in (instance.date, getattr(instance, 'stored_date', None)):
+        invalidate_boards()
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def update_occupancy_index(sender, instance, **kwargs):
+    """Other workers replay the change; published after commit so they read what was saved"""
+    if not enabled():
+        return
+    change = booking_change(instance, deleted=kwargs['signal'] is post_delete)
+    transaction.on_commit(lambda: publish_change(change))
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def invalidate_room_kiosk_boards(sender, instance, **kwargs):
+    invalidate_boards()
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_response_cache(sender, **kwargs):
+    bump_data_version()
@@ -0,0 +1,125 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils.html import escape
+from rooms.models import Room
+from .models import Schedule
+from .serializers import ScheduleSerializer
+
+SNAPSHOT_WEEKS = 2
+MANIFEST_NAME = 'manifest.json'
+
+
+class SnapshotScheduleSerializer(ScheduleSerializer):
+    """ScheduleSerializer without is_current, which would go stale in a file"""
+
+    class Meta(ScheduleSerializer.Meta):
+        fields = [field for field in ScheduleSerializer.Meta.fields if field != 'is_current']
+
+
+def snapshot_weeks(today, weeks=SNAPSHOT_WEEKS):
+    """Mondays of the weeks published, starting with the current one"""
+    monday = today - timedelta(days=today.weekday())
+    return [monday + timedelta(days=7 * week) for week in range(weeks)]
+
+
+def week_path(room_id, monday, extension='json'):
+    return f'rooms/{room_id}/week-{monday.isoformat()}.{extension}'
+
+
+def room_fingerprints(mondays):
+    """One cheap fingerprint per active room, from two aggregate queries.
+
+    Rooms whose fingerprint matches the last run's are not rendered again.
+    The booking count is included so deletions change it too.
+    """
+    first, last = mondays[0], mondays[-1] + timedelta(days=6)
+    state = {
+        row['room_id']: (row['count'], row['last_modified'])
+        for row in Schedule.objects.filter(date__range=[first, last]).values('room_id').annotate(
+            count=Count('id'), last_modified=Max('updated_at')
+        ).order_by()
+    }
+    rooms = Room.objects.filter(is_active=True).values_list(
+        'id', 'name', 'number', 'capacity', 'room_type', 'department__name'
+    )
+    fingerprints = {}
+    for room in rooms:
+        count, last_modified = state.get(room[0], (0, None))
+        source = json.dumps([first, last, list(room), count, last_modified], cls=DjangoJSONEncoder)
+        fingerprints[room[0]] = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    return fingerprints
+
+
+def room_week_document(room, monday):
+    """The room_schedule API response for one week, minus per-request state"""
+    sunday = monday + timedelta(days=6)
+    schedules = Schedule.objects.filter(
+        room=room,
+        date__range=[monday, sunday]
+    ).select_related('room__department').order_by('date', 'start_time')
+
+    schedule_data = {}
+    for schedule in schedules:
+        schedule_data.setdefault(schedule.date.isoformat(), []).append(SnapshotScheduleSerializer(schedule).data)
+
+    return {
+        'room': {
+            'id': room.id,
+            'name': room.name,
+            'number': room.number,
+            'department': room.department.name,
+            'capacity': room.capacity,
+            'room_type': room.room_type
+        },
+        'start_date': monday.isoformat(),
+        'end_date': sunday.isoformat(),
+        'schedules': schedule_data
+    }
+
+
+def room_week_html(document):
+    room = document['room']
+    rows = []
+    for day, schedules in document['schedules'].items():
+        for schedule in schedules:
+            rows.append(
+                f"<tr><td>{escape(day)}</td><td>{escape(schedule['start_time'][:5])}-{escape(schedule['end_time'][:5])}</td>"
+                f"<td>{escape(schedule['title'])}</td><td>{escape(schedule['instructor'])}</td>"
+                f"<td>{escape(schedule['status'])}</td></tr>"
+            )
+    title = f"{room['name']} ({room['number']}) {document['start_date']} - {document['end_date']}"
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+        f'<meta name="viewport" content="width=device-width, initial-scale=1"><title>{escape(title)}</title></head>'
+        f'<body><h1>{escape(title)}</h1><p>{escape(room["department"])}, {room["capacity"]} seats</p>'
+        '<table><thead><tr><th>Day</th><th>Time</th><th>Title</th><th>Instructor</th><th>Status</th></tr></thead>'
+        f'<tbody>{"".join(rows) or "<tr><td colspan=5>No bookings</td></tr>"}</tbody></table></body></html>\n'
+    )
+
+
+def render_room_snapshots(room_id, mondays, html=False):
+    """Render a room's snapshot files; returns {relative path: content bytes}"""
+    room = Room.objects.select_related('department').get(pk=room_id)
+    files = {}
+    for monday in mondays:
+        document = room_week_document(room, monday)
+        files[week_path(room_id, monday)] = json.dumps(document, cls=DjangoJSONEncoder, sort_keys=True).encode('utf-8')
+        if html:
+            files[week_path(room_id, monday, 'html')] = room_week_html(document).encode('utf-8')
+    return files
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def write_atomic(path, content):
+    """Write next to the target and rename, so readers never see a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.tmp')
+    partial.write_bytes(content)
+    partial.replace(path)
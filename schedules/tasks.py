@@ -0,0 +1,13 @@
+from django.utils import timezone
+from jobs.queue import task
+from .models import Schedule
+from .ranges import bookings_changed
+
+
+@task(priority=150)
+def set_schedule_status(schedule_ids, status):
+    """Set the status of a chunk of schedules with one UPDATE"""
+    # Set-based updates skip the post_save signals that keep caches fresh
+    days = set(Schedule.objects.filter(pk__in=schedule_ids).dates('date', 'day'))
+    Schedule.objects.filter(pk__in=schedule_ids).update(status=status, updated_at=timezone.now())
+    bookings_changed(days)
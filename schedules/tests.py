@@ -1,3 +1,517 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rooms.models import Department, Room
+from rooms.query_budget import view_attribute
+from rooms.tests import BUDGET_SETTINGS, create_rooms
+from rooms.views import load_availability
+from . import urls
+from .alternatives import free_slots
+from .analytics import invalidate_week, utilization_report
+from .archive import archive_schedules
+from .assignment import assign_rooms, slot_mask
+from .dashboard import build_dashboard
+from .models import ArchivedSchedule, Schedule, normalize_instructor
+from .occupancy import SEQUENCE_KEY, index
+from .ranges import FIELDS, range_updates
+from .rollover import rollover_schedules
+from .views import MAX_ASSIGNMENT_SESSIONS
+
+
+@override_settings(**BUDGET_SETTINGS)
+class ScheduleEndpointBudgetTests(TestCase):
+    """Every schedules endpoint stays within its query budget without N+1 queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Physics', code='PHY')
+        cls.rooms = create_rooms(cls.department, 4, 3)
+        cls.room = cls.rooms[0]
+        cls.schedule = Schedule.objects.filter(room=cls.room).order_by('start_time').first()
+        ArchivedSchedule.objects.bulk_create([
+            ArchivedSchedule(
+                id=1000 + room.id, room=room, title='Old lecture', date=date.today() - timedelta(days=400),
+                start_time=time(9), end_time=time(10), status='completed',
+                created_at=cls.schedule.created_at, updated_at=cls.schedule.updated_at,
+                archived_at=cls.schedule.created_at
+            )
+            for room in cls.rooms
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def booking(self, **extra):
+        return dict({
+            'room': self.room.id, 'title': 'Seminar', 'instructor': 'Dr. Booker',
+            'date': (date.today() + timedelta(days=1)).isoformat(),
+            'start_time': '09:00', 'end_time': '10:00',
+        }, **extra)
+
+    def test_schedule_list(self):
+        self.assertEqual(self.client.get(reverse('schedules:schedule-list')).status_code, 200)
+        response = self.client.post(reverse('schedules:schedule-list'), self.booking(), format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_schedule_conflict(self):
+        response = self.client.post(reverse('schedules:schedule-list'), self.booking(
+            date=self.schedule.date.isoformat(),
+            start_time=self.schedule.start_time.strftime('%H:%M'),
+            end_time=self.schedule.end_time.strftime('%H:%M')
+        ), format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_schedule_detail(self):
+        url = reverse('schedules:schedule-detail', args=[self.schedule.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.put(url, self.booking(), format='json').status_code, 200)
+        self.assertEqual(self.client.patch(url, {'description': 'Moved'}, format='json').status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+
+    def test_today_schedule(self):
+        response = self.client.get(reverse('schedules:today-schedule'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['schedules']), 12)
+
+    def test_dashboard(self):
+        response = self.client.get(reverse('schedules:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['schedules']), 12)
+        self.assertEqual(response.data['rooms']['active'], len(self.rooms))
+
+        dashboard = build_dashboard(datetime.combine(date.today(), time(7, 30)))
+        self.assertEqual((dashboard['rooms']['busy'], dashboard['rooms']['available']), (4, 0))
+        self.assertEqual(dashboard['departments'][0]['todays_schedule_count'], 12)
+        self.assertEqual(build_dashboard(datetime.combine(date.today(), time(7, 55)))['busy_rooms'], [])
+
+    def test_update_status(self):
+        url = reverse('schedules:update-status', args=[self.schedule.id])
+        self.assertEqual(self.client.post(url, {'status': 'completed'}, format='json').status_code, 200)
+
+    def test_archived_schedule_list(self):
+        response = self.client.get(reverse('schedules:archived-schedule-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], len(self.rooms))
+
+    def test_room_assignment(self):
+        session = {
+            'title': 'Tutorial', 'enrollment': 10, 'date': date.today().isoformat(),
+            'start_time': '18:00', 'end_time': '19:00',
+        }
+        response = self.client.post(reverse('schedules:room-assignment'), {'sessions': [session] * 5}, format='json')
+        self.assertEqual(response.status_code, 200)
+        for body in [[session], {'sessions': [session] * (MAX_ASSIGNMENT_SESSIONS + 1)}]:
+            response = self.client.post(reverse('schedules:room-assignment'), body, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_room_schedule(self):
+        response = self.client.get(reverse('schedules:room-schedule', args=[self.room.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_utilization_analytics(self):
+        response = self.client.get(reverse('schedules:utilization-analytics'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_kiosk_board(self):
+        response = self.client.get(reverse('schedules:kiosk-board', args=['Main Hall']))
+        self.assertEqual(response.status_code, 200)
+
+    def test_room_poster(self):
+        for image_format, magic in [('pdf', b'%PDF'), ('png', b'\x89PNG')]:
+            with self.subTest(image_format):
+                response = self.client.get(reverse('schedules:room-poster', args=[self.room.id, image_format]))
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.content.startswith(magic))
+                response = self.client.get(
+                    reverse('schedules:room-poster', args=[self.room.id, image_format]),
+                    HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_ical_feeds(self):
+        for url in [
+            reverse('schedules:room-ical', args=[self.room.id]),
+            reverse('schedules:department-ical', args=[self.department.id]),
+            reverse('schedules:instructor-ical', args=[self.schedule.instructor]),
+        ]:
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                b''.join(response.streaming_content)
+
+    def test_ical_etag_follows_rooms(self):
+        url = reverse('schedules:room-ical', args=[self.room.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # LOCATION comes from the room, so renaming it must change the tag
+        self.room.name = 'Renamed'
+        self.room.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Renamed', b''.join(response.streaming_content))
+
+    def test_range_operations(self):
+        selection = {
+            'rooms': [room.id for room in self.rooms], 'start_date': date.today().isoformat(),
+            'end_date': (date.today() + timedelta(days=7)).isoformat(),
+        }
+        # In order: the shift keeps every booking in the selection, and
+        # every room's bookings share their times, so the move conflicts
+        for name, extra, status_code in [
+            ('schedules:range-shift', {'days': 1, 'minutes': 15}, 200),
+            ('schedules:range-move', {'target_room': self.room.id, 'dry_run': True}, 400),
+            ('schedules:range-cancel', {}, 200),
+        ]:
+            with self.subTest(name):
+                response = self.client.post(reverse(name), dict(selection, **extra), format='json')
+                self.assertEqual(response.status_code, status_code)
+                if status_code == 200:
+                    self.assertEqual((response.data['matched'], response.data['updated']), (len(self.rooms) * 3,) * 2)
+                else:
+                    self.assertTrue(response.data['conflicts'])
+
+    def test_rollover(self):
+        today, next_week = date.today(), date.today() + timedelta(days=7)
+        response = self.client.post(reverse('schedules:rollover'), {
+            'from_start': today.isoformat(), 'from_end': today.isoformat(),
+            'to_start': next_week.isoformat(), 'to_end': next_week.isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], len(self.rooms) * 3)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        paths = [reverse('schedules:schedule-list'), reverse('schedules:room-schedule', args=[self.room.id])]
+        for i, url in enumerate(paths):
+            with self.subTest(url):
+                before = self.client.get(url)['X-Query-Count']
+                create_rooms(Department.objects.create(name=f'Geology {i}', code=f'GEO{i}'), 1, 5)
+                Schedule.objects.create(
+                    room=self.room, title='Evening class', instructor='Dr. Late',
+                    date=date.today(), start_time=time(20), end_time=time(21)
+                )
+                self.assertEqual(self.client.get(url)['X-Query-Count'], before)
+                Schedule.objects.filter(title='Evening class').delete()
+
+    def test_every_endpoint_has_a_budget(self):
+        for pattern in urls.urlpatterns:
+            with self.subTest(pattern.name):
+                self.assertIsNotNone(view_attribute(pattern.callback, 'query_budget'))
+
+
+class UtilizationCacheTests(TestCase):
+    """Cached counts of closed weeks follow edits to their bookings"""
+
+    def test_booking_moved_between_closed_weeks(self):
+        room = create_rooms(Department.objects.create(name='Physics', code='PHY'), 1, 0)[0]
+        # Weeks no other test caches
+        first, second = date(2001, 1, 1), date(2001, 1, 8)
+        Schedule.objects.create(room=room, title='Lecture', date=first, start_time=time(9), end_time=time(10))
+
+        def booked_hours(monday):
+            return utilization_report(monday, monday + timedelta(days=6))['overall']['booked_hours']
+
+        self.assertEqual((booked_hours(first), booked_hours(second)), (1.0, 0.0))
+        schedule = Schedule.objects.get(room=room)
+        schedule.date = second
+        schedule.save()
+        self.assertEqual((booked_hours(first), booked_hours(second)), (0.0, 1.0))
+
+
+class ArchiveTests(TestCase):
+    """Archiving moves finished bookings out of the live table without losing them from reports"""
+
+    def test_archived_week_keeps_its_utilization(self):
+        room = create_rooms(Department.objects.create(name='Physics', code='PHY'), 1, 0)[0]
+        # A week no other test caches
+        monday = date(2002, 1, 7)
+        for hour, status in [(9, 'completed'), (11, 'cancelled'), (13, 'completed')]:
+            Schedule.objects.create(
+                room=room, title='Lecture', date=monday, start_time=time(hour), end_time=time(hour + 1), status=status
+            )
+        Schedule.objects.create(room=room, title='Next week', date=monday + timedelta(days=7), start_time=time(9), end_time=time(10))
+
+        def booked_hours():
+            invalidate_week(monday)
+            return utilization_report(monday, monday + timedelta(days=6))['overall']['booked_hours']
+
+        self.assertEqual(booked_hours(), 2.0)
+        self.assertEqual(archive_schedules(monday + timedelta(days=7), chunk_size=2), 3)
+        self.assertEqual(list(Schedule.objects.values_list('title', flat=True)), ['Next week'])
+        self.assertEqual(ArchivedSchedule.objects.filter(date=monday).count(), 3)
+        self.assertEqual(booked_hours(), 2.0)
+
+
+class InstructorKeyTests(TestCase):
+    """Instructor keys match spellings of one name, and only of one name, in any script"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rooms = create_rooms(Department.objects.create(name='Physics', code='PHY'), 2, 0)
+
+    def book(self, room, instructor):
+        return Schedule.objects.create(
+            room=room, title='Seminar', instructor=instructor,
+            date=date.today(), start_time=time(10), end_time=time(11)
+        )
+
+    def test_distinct_cjk_names(self):
+        first = self.book(self.rooms[0], 'Dr. 王伟')
+        second = self.book(self.rooms[1], 'Dr. 李娜')
+        self.assertNotEqual(first.instructor_key, second.instructor_key)
+        self.assertEqual(normalize_instructor('DR  王伟'), first.instructor_key)
+
+    def test_same_name_across_rooms(self):
+        self.book(self.rooms[0], 'Dr. José Müller')
+        with self.assertRaises(ValidationError):
+            self.book(self.rooms[1], 'dr jose muller')
+
+    def test_key_fits_the_column(self):
+        # Casefolding doubles every 'ß'
+        schedule = self.book(self.rooms[0], 'ß' * 100)
+        self.assertEqual(schedule.instructor_key, 's' * 100)
+
+
+class RoomAssignmentTests(TestCase):
+    """Proposed rooms fit each session and never hold two sessions at once"""
+
+    def test_assignment_respects_rooms(self):
+        department = Department.objects.create(name='Physics', code='PHY')
+        rooms = {
+            (room_type, capacity): Room.objects.create(
+                name=f'{room_type} {capacity}', number=f'PHY-{room_type}-{capacity}', department=department,
+                room_type=room_type, capacity=capacity
+            )
+            for room_type in ['classroom', 'laboratory'] for capacity in [20, 60]
+        }
+        day = date.today() + timedelta(days=1)
+        # Overlapping sessions of every size and type, more than fit at 10:00
+        sessions = [
+            {'enrollment': enrollment, 'room_type': room_type, 'date': day,
+             'start_time': time(9 + hour, 30 * half), 'end_time': time(10 + hour, 30 * half)}
+            for enrollment in [15, 40] for room_type in ['classroom', 'laboratory', '']
+            for hour in range(2) for half in range(2)
+        ]
+        result = assign_rooms(sessions)
+
+        self.assertEqual(len(result['assigned']) + len(result['unplaced']), len(sessions))
+        self.assertTrue(result['assigned'] and result['unplaced'])
+        by_room = {room.id: room for room in rooms.values()}
+        for assigned in result['assigned']:
+            session, room = sessions[assigned['session']], by_room[assigned['room']]
+            self.assertGreaterEqual(room.capacity, session['enrollment'])
+            if session['room_type']:
+                self.assertEqual(room.room_type, session['room_type'])
+        for first in result['assigned']:
+            for second in result['assigned']:
+                if first['session'] < second['session'] and first['room'] == second['room']:
+                    one, other = sessions[first['session']], sessions[second['session']]
+                    self.assertFalse(
+                        slot_mask(one['start_time'], one['end_time']) & slot_mask(other['start_time'], other['end_time'])
+                    )
+
+
+@override_settings(**dict(BUDGET_SETTINGS, OCCUPANCY_INDEX_ENABLED=True))
+class OccupancyIndexTests(TestCase):
+    """The occupancy index answers like the database and follows booking changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = create_rooms(Department.objects.create(name='Physics', code='PHY'), 1, 3)[0]
+
+    def setUp(self):
+        # Tests roll back their bookings, so each starts from a fresh load
+        index.load()
+        self.client = APIClient()
+
+    def at(self, hour, minute=0):
+        return datetime.combine(date.today(), time(hour, minute))
+
+    def test_room_status(self):
+        first, second, third = Schedule.objects.filter(room=self.room).order_by('start_time')
+        self.assertEqual(index.room_status(self.room.id, self.at(6)), (None, first.id))
+        self.assertEqual(index.room_status(self.room.id, self.at(7, 30)), (first.id, second.id))
+        self.assertEqual(index.room_status(self.room.id, self.at(7, 50)), (None, second.id))
+        self.assertEqual(index.room_status(self.room.id, self.at(9, 10)), (third.id, None))
+        self.assertIsNone(index.room_status(self.room.id, self.at(9) + timedelta(days=60)))
+
+    def test_follows_saves_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = Schedule.objects.create(
+                room=self.room, title='Evening class', date=date.today(), start_time=time(20), end_time=time(21)
+            )
+        self.assertEqual(index.room_status(self.room.id, self.at(20, 30)), (schedule.id, None))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.start_time, schedule.end_time = time(18), time(19)
+            schedule.save()
+        self.assertEqual(index.room_status(self.room.id, self.at(20, 30)), (None, None))
+        self.assertEqual(index.room_status(self.room.id, self.at(18, 30)), (schedule.id, None))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.delete()
+        self.assertEqual(index.room_status(self.room.id, self.at(18, 30)), (None, None))
+
+    def test_sequence_gap_reloads(self):
+        # An evicted sequence key is re-seeded from the clock, far ahead of every worker
+        cache.set(SEQUENCE_KEY, index.sequence + 3_600_000)
+        index.checked_at = 0
+        with self.assertNumQueries(1):
+            index.refresh()
+        self.assertEqual(index.sequence, cache.get(SEQUENCE_KEY))
+
+    def test_cache_outage_falls_back_to_the_database(self):
+        index.checked_at = 0
+        down = mock.Mock(**{name + '.side_effect': ConnectionError('cache down') for name in ['get', 'incr', 'add']})
+        with mock.patch('schedules.occupancy.cache', down):
+            with self.assertLogs('schedules.occupancy', 'ERROR'):
+                self.assertFalse(index.ready(date.today()))
+            # The booking is committed; only publishing its change fails
+            with self.assertLogs('schedules.occupancy', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                Schedule.objects.create(
+                    room=self.room, title='Evening class', date=date.today(), start_time=time(20), end_time=time(21)
+                )
+        self.assertTrue(Schedule.objects.filter(title='Evening class').exists())
+
+    def test_free_slots_match_the_database(self):
+        day = date.today()
+        from_index = free_slots(self.room.id, day, time(8), time(9))
+        with self.settings(OCCUPANCY_INDEX_ENABLED=False):
+            self.assertEqual(free_slots(self.room.id, day, time(8), time(9)), from_index)
+
+    def test_availability_matches_the_database(self):
+        for moment in [self.at(6), self.at(7, 30), self.at(9, 10), self.at(12)]:
+            with self.subTest(moment.time()):
+                with self.assertNumQueries(2 if moment.hour < 10 else 1):
+                    from_index = load_availability(self.room.id, moment)
+                with self.settings(OCCUPANCY_INDEX_ENABLED=False):
+                    self.assertEqual(load_availability(self.room.id, moment), from_index)
+
+
+@override_settings(**BUDGET_SETTINGS)
+class RangeOperationTests(TestCase):
+    """Range operations change every selected booking at once, or none of them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Physics', code='PHY')
+        cls.rooms = create_rooms(cls.department, 2, 3)
+        cls.empty_room = create_rooms(Department.objects.create(name='Geology', code='GEO'), 1, 0)[0]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, name, **data):
+        data = dict({
+            'rooms': [self.rooms[0].id], 'start_date': date.today().isoformat(),
+            'end_date': date.today().isoformat(),
+        }, **data)
+        return self.client.post(reverse(f'schedules:{name}'), data, format='json')
+
+    def test_cancel_time_window(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post('range-cancel', rooms=[room.id for room in self.rooms], start_time='08:00')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(Schedule.objects.filter(status='cancelled').count(), 4)
+        self.assertFalse(Schedule.objects.filter(start_time__gte=time(8)).exclude(status='cancelled').exists())
+
+    def test_shift(self):
+        response = self.post('range-shift', days=2, minutes=-30)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(response.data['schedules'][0]['changes']['start_time'], {'before': time(7), 'after': time(6, 30)})
+        shifted = Schedule.objects.filter(room=self.rooms[0]).order_by('start_time')
+        self.assertEqual({schedule.date for schedule in shifted}, {date.today() + timedelta(days=2)})
+        self.assertEqual([schedule.start_time for schedule in shifted], [time(6, 30), time(7, 30), time(8, 30)])
+
+        response = self.post('range-shift', start_date=shifted[0].date.isoformat(), end_date=shifted[0].date.isoformat(), minutes=-400)
+        self.assertEqual(response.status_code, 400)
+
+    def test_shift_is_bounded(self):
+        response = self.post('range-shift', days=10 ** 9)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('days', response.data)
+
+    def test_update_leaves_rows_outside_the_checked_set(self):
+        # A booking on a date and time the checked rows do not have keeps both, instead of NULLs
+        rows = list(Schedule.objects.filter(room=self.rooms[0]).values(*FIELDS))
+        late = Schedule.objects.create(
+            room=self.rooms[0], title='Late', date=date.today() + timedelta(days=3), start_time=time(18), end_time=time(19)
+        )
+        Schedule.objects.filter(pk=late.pk).update(**range_updates(rows, None, None, 1, 30))
+        late.refresh_from_db()
+        self.assertEqual((late.date, late.start_time), (date.today() + timedelta(days=3), time(18)))
+
+    def test_move_conflict_changes_nothing(self):
+        response = self.post('range-move', target_room=self.rooms[1].id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['conflicts']), 3)
+        self.assertEqual(Schedule.objects.filter(room=self.rooms[0]).count(), 3)
+
+    def test_move_dry_run(self):
+        response = self.post('range-move', target_room=self.empty_room.id, dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['matched'], response.data['updated']), (3, 0))
+        self.assertEqual(response.data['schedules'][0]['changes'], {'room': {'before': self.rooms[0].id, 'after': self.empty_room.id}})
+        self.assertFalse(Schedule.objects.filter(room=self.empty_room).exists())
+
+        response = self.post('range-move', target_room=self.empty_room.id)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Schedule.objects.filter(room=self.empty_room).count(), 3)
+
+
+class RolloverTests(TestCase):
+    """Rollover copies a term onto the same weekdays, once, around holidays and conflicts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = create_rooms(Department.objects.create(name='Physics', code='PHY'), 1, 3)[0]
+        # A week of Mondays to Fridays, two terms apart
+        cls.monday = date.today() - timedelta(days=date.today().weekday())
+        Schedule.objects.filter(room=cls.room).update(date=cls.monday + timedelta(days=2), status='completed')
+
+    def rollover(self, **options):
+        target = self.monday + timedelta(days=7 * 20)
+        return rollover_schedules(
+            self.monday, self.monday + timedelta(days=4), target + timedelta(days=1), target + timedelta(days=4),
+            **options
+        )
+
+    def test_copies_on_the_same_weekday_once(self):
+        result = self.rollover()
+        self.assertEqual((result['created'], result['skipped'], result['conflicted']), (3, 0, 0))
+        copies = Schedule.objects.filter(date__gt=self.monday + timedelta(days=7))
+        self.assertEqual({(copy.date.weekday(), copy.status) for copy in copies}, {(2, 'scheduled')})
+        self.assertEqual(copies.filter(instructor_key='').count(), 0)
+
+        result = self.rollover()
+        self.assertEqual((result['created'], result['skipped']), (0, 3))
+
+    def test_holidays_and_conflicts(self):
+        wednesday = self.monday + timedelta(days=7 * 20 + 2)
+        self.assertEqual(self.rollover(skip_dates=[wednesday], dry_run=True)['skipped'], 3)
+
+        Schedule.objects.create(room=self.room, title='Exam', date=wednesday, start_time=time(7, 30), end_time=time(8, 30))
+        result = self.rollover()
+        self.assertEqual((result['created'], result['conflicted']), (1, 2))
+        self.assertEqual({conflict['title'] for conflict in result['conflicts']}, {'Exam'})
+
+    def test_archived_term(self):
+        archive_schedules(self.monday + timedelta(days=7))
+        self.assertFalse(Schedule.objects.exists())
+        result = self.rollover()
+        self.assertEqual((result['matched'], result['created']), (3, 3))
+        copy = Schedule.objects.order_by('start_time').first()
+        self.assertEqual((copy.date.weekday(), copy.status, copy.start_time), (2, 'scheduled', time(7)))
+        self.assertNotEqual(copy.instructor_key, '')
+        self.assertEqual(self.rollover()['skipped'], 3)
+
+    def test_overlapping_ranges(self):
+        with self.assertRaises(ValueError):
+            rollover_schedules(self.monday, self.monday + timedelta(days=10), self.monday + timedelta(days=7),
+                               self.monday + timedelta(days=14))
@@ -8,8 +8,31 @@ urlpatterns = [
     path('schedules/', views.ScheduleListCreateView.as_view(), name='schedule-list'),
     path('schedules/<int:pk>/', views.ScheduleDetailView.as_view(), name='schedule-detail'),
     path('schedules/today/', views.today_schedule, name='today-schedule'),
+    path('dashboard/', views.dashboard, name='dashboard'),
     path('schedules/<int:schedule_id>/status/', views.update_schedule_status, name='update-status'),
+    path('schedules/archive/', views.ArchivedScheduleListView.as_view(), name='archived-schedule-list'),
+    path('schedules/assign/', views.room_assignment_dry_run, name='room-assignment'),
+    
+    # Range operation URLs: one UPDATE for every booking in rooms over a date range
+    path('schedules/range/cancel/', views.cancel_schedule_range, name='range-cancel'),
+    path('schedules/range/shift/', views.shift_schedule_range, name='range-shift'),
+    path('schedules/range/move/', views.move_schedule_range, name='range-move'),
+    path('schedules/rollover/', views.rollover_schedule_range, name='rollover'),
     
     # Room schedule URLs
     path('rooms/<int:room_id>/schedule/', views.room_schedule, name='room-schedule'),
+    
+    # Analytics URLs
+    path('analytics/utilization/', views.utilization_analytics, name='utilization-analytics'),
+    
+    # Kiosk board URLs
+    path('buildings/<str:building>/board/', views.kiosk_board, name='kiosk-board'),
+    
+    # Door poster URLs
+    path('rooms/<int:room_id>/poster.<str:image_format>', views.room_poster, name='room-poster'),
+    
+    # iCalendar feed URLs
+    path('rooms/<int:room_id>/schedule.ics', views.room_ical_feed, name='room-ical'),
+    path('departments/<int:department_id>/schedule.ics', views.department_ical_feed, name='department-ical'),
+    path('instructors/<str:instructor>/schedule.ics', views.instructor_ical_feed, name='instructor-ical'),
 ]
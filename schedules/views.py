@@ -1,19 +1,67 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from .models import Schedule
-from .serializers import ScheduleSerializer, ScheduleCreateSerializer
-from rooms.models import Room
+from django.http import HttpResponse, StreamingHttpResponse, Http404
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+from .models import ArchivedSchedule, Schedule, normalize_instructor
+from .serializers import (
+    ArchivedScheduleSerializer, AssignmentSessionSerializer, RangeMoveSerializer, RangeSelectionSerializer,
+    RangeShiftSerializer, RolloverSerializer, ScheduleSerializer, ScheduleCreateSerializer
+)
+from .ical import feed_queryset, feed_state, iter_calendar
+from .analytics import utilization_report
+from .assignment import assign_rooms
+from .dashboard import get_dashboard
+from .kiosk import get_board
+from .ranges import RangeConflict, change_range, select_range
+from .rollover import rollover_schedules
+from .posters import (
+    POSTER_FORMATS, poster_content, poster_hash, poster_rooms, poster_week, render_poster, room_qr_png,
+    week_bookings
+)
+from rooms.query_budget import query_budget
+from rooms.response_cache import data_version
+from rooms.throttling import throttle_scope
+from rooms.tiered_cache import TieredCache
+from rooms.models import Department, Room
 from datetime import date, datetime, timedelta
 
+TODAY_CACHE_TIMEOUT = 60
+# Larger batches belong to manage.py assign_rooms, not an open endpoint
+MAX_ASSIGNMENT_SESSIONS = 500
 
-class ScheduleListCreateView(generics.ListCreateAPIView):
+
+class ConflictAlternativesMixin:
+    """Add suggested free slots and rooms to a rejected booking's error response"""
+    booking_serializer = None
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        self.booking_serializer = serializer
+        return serializer
+
+    def handle_exception(self, exc):
+        response = super().handle_exception(exc)
+        alternatives = getattr(self.booking_serializer, 'conflict_alternatives', None)
+        if response.status_code == status.HTTP_400_BAD_REQUEST and alternatives and isinstance(response.data, dict):
+            response.data['alternatives'] = alternatives
+        return response
+
+
+# Booking with an instructor checks their calendar twice: on validation and under the lock
+@query_budget(8)
+class ScheduleListCreateView(ConflictAlternativesMixin, generics.ListCreateAPIView):
     serializer_class = ScheduleSerializer
 
     def get_queryset(self):
-        queryset = Schedule.objects.all()
+        queryset = Schedule.objects.select_related('room__department')
         room_id = self.request.query_params.get('room', None)
         date_param = self.request.query_params.get('date', None)
         status_param = self.request.query_params.get('status', None)
@@ -39,8 +87,9 @@ class ScheduleListCreateView(generics.ListCreateAPIView):
         return ScheduleSerializer
 
 
-class ScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Schedule.objects.all()
+@query_budget(9)
+class ScheduleDetailView(ConflictAlternativesMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Schedule.objects.select_related('room__department')
 
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -48,10 +97,44 @@ class ScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
         return ScheduleSerializer
 
 
+class ArchivePagination(PageNumberPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+@query_budget(2)
+class ArchivedScheduleListView(generics.ListAPIView):
+    """Read path for schedules moved out of the live table by archive_schedules"""
+    serializer_class = ArchivedScheduleSerializer
+    pagination_class = ArchivePagination
+
+    def get_queryset(self):
+        queryset = ArchivedSchedule.objects.select_related('room')
+        room_id = self.request.query_params.get('room', None)
+        start_date_param = self.request.query_params.get('start_date', None)
+        end_date_param = self.request.query_params.get('end_date', None)
+        
+        if room_id:
+            queryset = queryset.filter(room_id=room_id)
+        
+        try:
+            if start_date_param:
+                queryset = queryset.filter(date__gte=datetime.strptime(start_date_param, '%Y-%m-%d').date())
+            if end_date_param:
+                queryset = queryset.filter(date__lte=datetime.strptime(end_date_param, '%Y-%m-%d').date())
+        except ValueError:
+            pass  # Invalid date format, ignore filter
+        
+        return queryset.order_by('date', 'start_time')
+
+
+@throttle_scope('scan')
+@query_budget(2)
 @api_view(['GET'])
 def room_schedule(request, room_id):
     """Get schedule for a specific room with date range"""
-    room = get_object_or_404(Room, id=room_id, is_active=True)
+    room = get_object_or_404(Room.objects.select_related('department'), id=room_id, is_active=True)
     
     # Get date parameters
     start_date_param = request.query_params.get('start_date', None)
@@ -80,7 +163,7 @@ def room_schedule(request, room_id):
     schedules = Schedule.objects.filter(
         room=room,
         date__range=[start_date, end_date]
-    ).order_by('date', 'start_time')
+    ).select_related('room__department').order_by('date', 'start_time')
     
     # Group schedules by date
     schedule_data = {}
@@ -105,25 +188,112 @@ def room_schedule(request, room_id):
     })
 
 
+# One slot-count query per week not yet cached, up to a year of weeks
+@query_budget(56, allow_repeats=True)
 @api_view(['GET'])
-def today_schedule(request):
-    """Get all schedules for today across all rooms"""
+def utilization_analytics(request):
+    """Room utilization over a date range (defaults to the current week)"""
     today = date.today()
-    schedules = Schedule.objects.filter(
+    try:
+        start_date_param = request.query_params.get('start_date', None)
+        end_date_param = request.query_params.get('end_date', None)
+        start_date = (
+            datetime.strptime(start_date_param, '%Y-%m-%d').date() if start_date_param
+            else today - timedelta(days=today.weekday())
+        )
+        end_date = (
+            datetime.strptime(end_date_param, '%Y-%m-%d').date() if end_date_param
+            else start_date + timedelta(days=6)
+        )
+    except ValueError:
+        return Response(
+            {'error': 'Dates must be in YYYY-MM-DD format'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if end_date < start_date or (end_date - start_date).days > 366:
+        return Response(
+            {'error': 'end_date must be on or after start_date and at most a year later'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response(utilization_report(
+        start_date,
+        end_date,
+        department=request.query_params.get('department', None),
+        building=request.query_params.get('building', None),
+        today=today
+    ))
+
+
+@query_budget(2)
+@api_view(['POST'])
+def room_assignment_dry_run(request):
+    """Propose rooms for a list of sessions without booking anything"""
+    if not isinstance(request.data, dict):
+        return Response({'error': 'Expected an object with a sessions list'}, status=400)
+    sessions = request.data.get('sessions', [])
+    if isinstance(sessions, list) and len(sessions) > MAX_ASSIGNMENT_SESSIONS:
+        return Response(
+            {'error': f'At most {MAX_ASSIGNMENT_SESSIONS} sessions per request; use manage.py assign_rooms'},
+            status=400
+        )
+    serializer = AssignmentSessionSerializer(data=sessions, many=True)
+    serializer.is_valid(raise_exception=True)
+    return Response(assign_rooms(serializer.validated_data))
+
+
+# Cached until the next booking today starts or ends, when is_current changes
+today_cache = TieredCache('today', TODAY_CACHE_TIMEOUT)
+
+
+def load_today_schedule(now):
+    """Today's bookings, and for how many seconds the list holds"""
+    today = now.date()
+    schedules = list(Schedule.objects.filter(
         date=today,
         status__in=['scheduled', 'in_progress']
-    ).select_related('room', 'room__department').order_by('start_time')
-    
-    return Response({
+    ).select_related('room', 'room__department').order_by('start_time'))
+
+    current_time = now.time()
+    changes = [
+        moment for schedule in schedules for moment in (schedule.start_time, schedule.end_time)
+        if moment > current_time
+    ]
+    valid_for = TODAY_CACHE_TIMEOUT
+    if changes:
+        valid_for = min(valid_for, (datetime.combine(today, min(changes)) - now).total_seconds())
+    return {
         'date': today.isoformat(),
         'schedules': ScheduleSerializer(schedules, many=True).data
-    })
+    }, valid_for
+
 
+@query_budget(1)
+@api_view(['GET'])
+def today_schedule(request):
+    """Get all schedules for today across all rooms"""
+    now = datetime.now()
+    data, _ = today_cache.get_or_set(
+        f'{now.date().isoformat()}:{data_version()}',
+        lambda: load_today_schedule(now),
+        timeout=lambda result: result[1]
+    )
+    return Response(data)
 
+
+@query_budget(2)
+@api_view(['GET'])
+def dashboard(request):
+    """Today's schedules, room counts, department summaries and busy rooms for the landing page"""
+    return Response(get_dashboard())
+
+
+@query_budget(5)
 @api_view(['POST'])
 def update_schedule_status(request, schedule_id):
     """Update the status of a schedule"""
-    schedule = get_object_or_404(Schedule, id=schedule_id)
+    schedule = get_object_or_404(Schedule.objects.select_related('room__department'), id=schedule_id)
     new_status = request.data.get('status')
     
     if new_status not in dict(Schedule.STATUS_CHOICES):
@@ -139,3 +309,173 @@ def update_schedule_status(request, schedule_id):
         'message': f'Schedule status updated to {new_status}',
         'schedule': ScheduleSerializer(schedule).data
     })
+
+
+def range_response(serializer, **change):
+    """Apply a range operation to the bookings the serializer selected, or explain why not"""
+    data = serializer.validated_data
+    selection = select_range(data['rooms'], data['start_date'], data['end_date'], data['start_time'], data['end_time'])
+    try:
+        summary = change_range(selection, dry_run=data['dry_run'], **change)
+    except RangeConflict as e:
+        return Response(
+            {'error': 'The changed bookings would overlap others; nothing was changed', 'conflicts': e.conflicts},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(summary)
+
+
+@query_budget(5)
+@api_view(['POST'])
+def cancel_schedule_range(request):
+    """Cancel every active booking in rooms over a date range, e.g. for a closure or holiday"""
+    serializer = RangeSelectionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return range_response(serializer, status='cancelled')
+
+
+@query_budget(6)
+@api_view(['POST'])
+def shift_schedule_range(request):
+    """Move every active booking in rooms over a date range by days and/or minutes"""
+    serializer = RangeShiftSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return range_response(serializer, days=serializer.validated_data['days'], minutes=serializer.validated_data['minutes'])
+
+
+@query_budget(7)
+@api_view(['POST'])
+def move_schedule_range(request):
+    """Move every active booking in rooms over a date range to another room"""
+    serializer = RangeMoveSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return range_response(serializer, room_id=serializer.validated_data['target_room'].pk)
+
+
+@query_budget(6)
+@api_view(['POST'])
+def rollover_schedule_range(request):
+    """Copy a term's timetable into another term, weekday by weekday"""
+    serializer = RolloverSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    try:
+        result = rollover_schedules(
+            data['from_start'], data['from_end'], data['to_start'], data['to_end'],
+            skip_dates=data['skip_dates'], room_ids=data['rooms'], dry_run=data['dry_run']
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result, status=status.HTTP_200_OK if data['dry_run'] else status.HTTP_201_CREATED)
+
+
+def ical_feed_response(request, queryset, name, filename):
+    """Stream an iCalendar feed, answering 304 when the client's copy is current"""
+    queryset = feed_queryset(queryset, date.today())
+    etag, last_modified = feed_state(queryset)
+    # Last-Modified has whole seconds only; the ETag tells changes within a second apart
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = StreamingHttpResponse(
+            iter_calendar(queryset, name),
+            content_type='text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+# Feeds are plain Django views: calendar clients send Accept: text/calendar,
+# which DRF's JSON-only content negotiation would reject
+@throttle_scope('feed')
+@query_budget(2)
+@require_GET
+def room_ical_feed(request, room_id):
+    """iCalendar feed of a room's schedules"""
+    room = get_object_or_404(Room, id=room_id, is_active=True)
+    return ical_feed_response(
+        request,
+        Schedule.objects.filter(room=room),
+        f"{room.name} ({room.number})",
+        f"room-{room.id}.ics"
+    )
+
+
+@throttle_scope('feed')
+@query_budget(2)
+@require_GET
+def department_ical_feed(request, department_id):
+    """iCalendar feed of all schedules in a department's rooms"""
+    department = get_object_or_404(Department, id=department_id)
+    return ical_feed_response(
+        request,
+        Schedule.objects.filter(room__department=department, room__is_active=True),
+        department.name,
+        f"department-{department.code}.ics"
+    )
+
+
+@throttle_scope('feed')
+@query_budget(2)
+@require_GET
+def instructor_ical_feed(request, instructor):
+    """iCalendar feed of an instructor's schedules across all rooms"""
+    key = normalize_instructor(instructor)
+    schedules = Schedule.objects.filter(instructor_key=key)
+    if not key or not schedules.exists():
+        raise Http404("No schedules found for this instructor")
+    return ical_feed_response(request, schedules, instructor, "instructor.ics")
+
+
+@throttle_scope('kiosk')
+@query_budget(2)
+@require_GET
+def kiosk_board(request, building):
+    """Now/next board for every room in a building, as shown on entrance screens"""
+    now = timezone.localtime()
+    body = get_board(building, now)
+    if body is None:
+        raise Http404("No active rooms in this building")
+    response = HttpResponse(body, content_type='application/json')
+    # Screens can reuse the board until the next minute starts
+    response['Cache-Control'] = f'public, max-age={60 - now.second}'
+    return response
+
+
+@throttle_scope('feed')
+@query_budget(2)
+@require_GET
+def room_poster(request, room_id, image_format):
+    """Printable door poster for a room: its week timetable and QR code"""
+    if image_format not in POSTER_FORMATS:
+        raise Http404("Posters are available as PDF or PNG")
+    try:
+        day = datetime.strptime(request.GET['week'], '%Y-%m-%d').date() if 'week' in request.GET else None
+    except ValueError:
+        day = None
+    monday = poster_week(day)
+    rooms = poster_rooms([room_id])
+    if not rooms:
+        raise Http404("No active room with this id")
+    content = poster_content(rooms[0], monday, week_bookings(monday, [room_id]).get(room_id, []))
+    digest = poster_hash(content)
+    etag = f'"{digest}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        # Keyed by content, so any change to the week or room renders afresh
+        key = f'poster:{digest}:{image_format}'
+        body = cache.get(key)
+        if body is None:
+            body = render_poster(content, room_qr_png(rooms[0]), image_format)
+            cache.set(key, body, 60 * 60 * 24)
+        response = HttpResponse(body, content_type=POSTER_FORMATS[image_format])
+        response['Content-Disposition'] = f'inline; filename="room-{room_id}-{monday.isoformat()}.{image_format}"'
+    response['ETag'] = etag
+    return response